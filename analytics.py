@@ -0,0 +1,384 @@
+"""Vectorized analytics over stored matches.
+
+`flatten` turns stored match rows into NumPy columns: one row per
+player-round and one per kill and per damage event, with puuids and
+catalog uuids replaced by indexes into tables shared by every match. The
+metrics are group-bys over those columns, so they cost a few array passes
+however many matches are loaded, and never build `Match` objects.
+
+Nothing in the web app calls this yet; it is an offline tool:
+
+    python analytics.py headshots --puuid <puuid> [--limit 100]
+    python analytics.py damage [--puuid <puuid>]
+    python analytics.py economy [--limit 1000]
+    python analytics.py first-kills [--puuid <puuid>]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+
+import numpy as np
+
+from matchstore import (
+    decode_match,
+    fetch_match_data,
+    is_compact,
+    load_compact,
+    to_compact,
+)
+
+
+class _Index:
+    """Assigns a stable integer to every distinct value, across matches."""
+
+    def __init__(self):
+        self.values = []
+        self.indexes = {}
+
+    def lookup(self, values):
+        """Map a match-local value table onto global indexes; -1 stays -1."""
+        mapping = np.empty(len(values) + 1, dtype=np.int64)
+        for i, value in enumerate(values):
+            index = self.indexes.get(value)
+            if index is None:
+                index = len(self.values)
+                self.indexes[value] = index
+                self.values.append(value)
+            mapping[i] = index
+        mapping[-1] = -1
+        return mapping
+
+
+class RoundData:
+    """Column arrays for a set of matches.
+
+    `player_rounds`, `kills` and `damage` are dicts of equal-length arrays.
+    `match` columns index `match_ids`/`start_times`, player columns index
+    `puuids`, and weapon and armor columns index `uuids` (-1 for none).
+    Kill `time` is milliseconds into the round, -1 where it was not stored.
+    """
+
+    def __init__(
+        self, match_ids, start_times, puuids, uuids, player_rounds, kills, damage
+    ):
+        self.match_ids = match_ids
+        self.start_times = start_times
+        self.puuids = puuids
+        self.uuids = uuids
+        self.player_rounds = player_rounds
+        self.kills = kills
+        self.damage = damage
+
+    def player_index(self, puuid):
+        try:
+            return self.puuids.index(puuid)
+        except ValueError:
+            return None
+
+
+def _concat(parts, dtype=np.int64):
+    if not parts:
+        return np.empty(0, dtype=dtype)
+    return np.concatenate(parts).astype(dtype, copy=False)
+
+
+def flatten(compacts):
+    """Build `RoundData` from compact match dicts (see `matchstore`)."""
+    puuids = _Index()
+    uuids = _Index()
+    match_ids = []
+    start_times = []
+    rounds = {
+        name: []
+        for name in (
+            "match",
+            "round",
+            "player",
+            "score",
+            "spent",
+            "remaining",
+            "weapon",
+            "armor",
+        )
+    }
+    kills = {name: [] for name in ("stat", "killer", "victim", "weapon", "time")}
+    damage = {
+        name: []
+        for name in (
+            "stat",
+            "attacker",
+            "receiver",
+            "damage",
+            "headshots",
+            "bodyshots",
+            "legshots",
+        )
+    }
+    stat_offset = 0
+
+    for match_index, compact in enumerate(compacts):
+        match_ids.append(compact["id"])
+        start_times.append(compact["start"])
+        player_of = puuids.lookup(compact["puuids"])
+        uuid_of = uuids.lookup(compact["uuids"])
+
+        stats = compact["stats"]
+        stat_players = player_of[np.asarray(stats["player"], dtype=np.int64)]
+        count = len(stat_players)
+        rounds["match"].append(np.full(count, match_index))
+        rounds["round"].append(np.asarray(stats["round"]))
+        rounds["player"].append(stat_players)
+        rounds["score"].append(np.asarray(stats["score"]))
+        rounds["spent"].append(np.asarray(stats["spent"]))
+        rounds["remaining"].append(np.asarray(stats["remaining"]))
+        rounds["weapon"].append(uuid_of[np.asarray(stats["weapon"], dtype=np.int64)])
+        rounds["armor"].append(uuid_of[np.asarray(stats["armor"], dtype=np.int64)])
+
+        kill_stats = np.asarray(compact["kills"]["stat"], dtype=np.int64)
+        kills["stat"].append(kill_stats + stat_offset)
+        kills["killer"].append(stat_players[kill_stats])
+        kills["victim"].append(
+            player_of[np.asarray(compact["kills"]["victim"], dtype=np.int64)]
+        )
+        kills["weapon"].append(
+            uuid_of[np.asarray(compact["kills"]["weapon"], dtype=np.int64)]
+        )
+        times = compact["kills"].get("time") or [None] * len(kill_stats)
+        kills["time"].append(np.array([-1 if time is None else time for time in times]))
+
+        events = compact["damage"]
+        damage_stats = np.asarray(events["stat"], dtype=np.int64)
+        damage["stat"].append(damage_stats + stat_offset)
+        damage["attacker"].append(stat_players[damage_stats])
+        damage["receiver"].append(
+            player_of[np.asarray(events["receiver"], dtype=np.int64)]
+        )
+        damage["damage"].append(np.asarray(events["damage"]))
+        damage["headshots"].append(np.asarray(events["head"]))
+        damage["bodyshots"].append(np.asarray(events["body"]))
+        damage["legshots"].append(np.asarray(events["leg"]))
+
+        stat_offset += count
+
+    player_rounds = {name: _concat(parts) for name, parts in rounds.items()}
+    kills = {name: _concat(parts) for name, parts in kills.items()}
+    damage = {name: _concat(parts) for name, parts in damage.items()}
+
+    # Per player-round totals of its events.
+    for name in ("damage", "headshots", "bodyshots", "legshots"):
+        player_rounds[name] = np.bincount(
+            damage["stat"], weights=damage[name], minlength=stat_offset
+        ).astype(np.int64)
+    player_rounds["kills"] = np.bincount(kills["stat"], minlength=stat_offset)
+
+    return RoundData(
+        match_ids,
+        np.asarray(start_times, dtype=np.int64),
+        puuids.values,
+        uuids.values,
+        player_rounds,
+        kills,
+        damage,
+    )
+
+
+def flatten_rows(rows):
+    """`flatten` stored `valorantmatches.data` values, legacy pickles included."""
+    return flatten(
+        load_compact(data) if is_compact(data) else to_compact(decode_match(data))
+        for data in rows
+    )
+
+
+def _player_mask(data, puuid):
+    player = data.player_index(puuid)
+    if player is None:
+        return np.zeros(len(data.player_rounds["player"]), dtype=bool)
+    return data.player_rounds["player"] == player
+
+
+def headshot_trend(data, puuid):
+    """Headshot percentage of `puuid` per match, oldest match first."""
+    rounds = data.player_rounds
+    mask = _player_mask(data, puuid)
+    matches = rounds["match"][mask]
+    count = len(data.match_ids)
+    headshots = np.bincount(matches, weights=rounds["headshots"][mask], minlength=count)
+    shots = np.bincount(
+        matches,
+        weights=(rounds["headshots"] + rounds["bodyshots"] + rounds["legshots"])[mask],
+        minlength=count,
+    )
+    played = np.bincount(matches, minlength=count) > 0
+
+    order = np.argsort(data.start_times, kind="stable")
+    return [
+        {
+            "match_id": data.match_ids[i],
+            "start_time": int(data.start_times[i]),
+            "headshot_percentage": float(headshots[i] / max(shots[i], 1) * 100.0),
+        }
+        for i in order
+        if played[i]
+    ]
+
+
+def damage_per_round(data, puuid=None, bins=10):
+    """Distribution of damage dealt per player-round."""
+    damage = data.player_rounds["damage"]
+    if puuid is not None:
+        damage = damage[_player_mask(data, puuid)]
+    if not len(damage):
+        return {"rounds": 0}
+
+    counts, edges = np.histogram(damage, bins=bins)
+    p25, p50, p75, p90 = np.percentile(damage, [25, 50, 75, 90])
+    return {
+        "rounds": int(len(damage)),
+        "mean": float(damage.mean()),
+        "p25": float(p25),
+        "median": float(p50),
+        "p75": float(p75),
+        "p90": float(p90),
+        "histogram": {"counts": counts.tolist(), "edges": edges.tolist()},
+    }
+
+
+def economy_efficiency(data, puuid=None):
+    """Damage and kills per 1000 credits spent, by player and by weapon bought."""
+    rounds = data.player_rounds
+    mask = slice(None) if puuid is None else _player_mask(data, puuid)
+    spent = rounds["spent"][mask]
+    damage = rounds["damage"][mask]
+    kills = rounds["kills"][mask]
+
+    def grouped(keys, labels):
+        groups, inverse = np.unique(keys, return_inverse=True)
+        group_rounds = np.bincount(inverse)
+        group_spent = np.bincount(inverse, weights=spent)
+        group_damage = np.bincount(inverse, weights=damage)
+        group_kills = np.bincount(inverse, weights=kills)
+        per_credit = 1000.0 / np.maximum(group_spent, 1)
+        return [
+            {
+                "key": labels[group] if group >= 0 else None,
+                "rounds": int(group_rounds[i]),
+                "spent": int(group_spent[i]),
+                "damage_per_1000": float(group_damage[i] * per_credit[i]),
+                "kills_per_1000": float(group_kills[i] * per_credit[i]),
+            }
+            for i, group in enumerate(groups)
+        ]
+
+    return {
+        "players": grouped(rounds["player"][mask], data.puuids),
+        "weapons": grouped(rounds["weapon"][mask], data.uuids),
+    }
+
+
+def first_kills(data, puuid=None):
+    """Opening duels: how often each player gets (or is) the first kill of a
+    round, over the rounds whose kill times are known."""
+    rounds = data.player_rounds
+    kills = data.kills
+    timed = kills["time"] >= 0
+    stat = kills["stat"][timed]
+    width = int(rounds["round"].max()) + 1 if len(rounds["round"]) else 1
+    round_keys = rounds["match"] * width + rounds["round"]
+    kill_rounds = round_keys[stat]
+
+    # Sorted by round, then time: the first kill of each round leads its run.
+    order = np.lexsort((kills["time"][timed], kill_rounds))
+    leads = np.ones(len(order), dtype=bool)
+    leads[1:] = kill_rounds[order][1:] != kill_rounds[order][:-1]
+    first = order[leads]
+
+    players = len(data.puuids)
+    played = np.isin(round_keys, kill_rounds[first])
+    round_counts = np.bincount(rounds["player"][played], minlength=players)
+    kill_counts = np.bincount(kills["killer"][timed][first], minlength=players)
+    death_counts = np.bincount(kills["victim"][timed][first], minlength=players)
+
+    def stats(player):
+        duels = kill_counts[player] + death_counts[player]
+        return {
+            "puuid": data.puuids[player],
+            "rounds": int(round_counts[player]),
+            "first_kills": int(kill_counts[player]),
+            "first_deaths": int(death_counts[player]),
+            "first_kill_rate": float(
+                kill_counts[player] / max(round_counts[player], 1)
+            ),
+            "first_death_rate": float(
+                death_counts[player] / max(round_counts[player], 1)
+            ),
+            "opening_duel_win_rate": float(kill_counts[player] / max(duels, 1)),
+        }
+
+    if puuid is not None:
+        player = data.player_index(puuid)
+        return stats(player) if player is not None else {"puuid": puuid, "rounds": 0}
+    return [stats(player) for player in np.flatnonzero(round_counts)]
+
+
+METRICS = {
+    "headshots": headshot_trend,
+    "damage": damage_per_round,
+    "economy": economy_efficiency,
+    "first-kills": first_kills,
+}
+
+
+async def load(con, puuid=None, limit=100):
+    """Flatten the `limit` most recent stored matches, of `puuid` if given."""
+    if puuid is not None:
+        records = await con.fetch(
+            """
+            SELECT match_id FROM matchplayers WHERE puuid = $1
+            ORDER BY start_time DESC LIMIT $2
+            """,
+            puuid,
+            limit,
+        )
+    else:
+        records = await con.fetch(
+            """
+            SELECT match_id FROM matchplayers
+            GROUP BY match_id ORDER BY max(start_time) DESC LIMIT $1
+            """,
+            limit,
+        )
+    stored = await fetch_match_data(con, [record["match_id"] for record in records])
+    return flatten_rows(stored.values())
+
+
+if __name__ == "__main__":
+    import asyncpg
+    from dotenv import load_dotenv
+
+    from staticdata import loader as static_data
+
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Round-level match analytics")
+    parser.add_argument("metric", choices=sorted(METRICS))
+    parser.add_argument("--puuid")
+    parser.add_argument("--limit", type=int, default=100)
+    args = parser.parse_args()
+    if args.metric == "headshots" and args.puuid is None:
+        parser.error("headshots needs --puuid")
+
+    async def main():
+        con = await asyncpg.connect(os.getenv("DATABASE_URL"))
+        try:
+            # Legacy pickled rows are re-encoded through the catalog.
+            static_data.load_snapshot()
+            data = await load(con, args.puuid, args.limit)
+        finally:
+            await con.close()
+        if args.puuid is None:
+            return METRICS[args.metric](data)
+        return METRICS[args.metric](data, args.puuid)
+
+    print(json.dumps(asyncio.run(main()), indent=2))
@@ -0,0 +1,138 @@
+"""Object loops versus `analytics` columns for round-level metrics.
+
+Computes a player's headshot trend and first kills, the damage-per-round
+distribution and economy efficiency by weapon over synthetic competitive
+matches, once by
+walking decoded `Match` objects and once with the vectorized functions in
+`analytics`, checks that both agree, and reports the time for each from
+stored rows (decode or flatten included) and from already loaded data.
+
+    python -m benchmarks.bench_analytics [--matches 1000] [--rounds 25]
+"""
+
+import argparse
+import collections
+import time
+
+import numpy as np
+
+import analytics
+from matchparser import Match, ValorantAPI
+from matchstore import decode_match, encode_match
+from benchmarks.synthetic import generate_catalog, generate_matches
+
+
+def object_metrics(matches, puuid):
+    trend = []
+    damage_per_round = []
+    weapons = collections.defaultdict(lambda: [0, 0, 0])
+    first_kills = first_deaths = 0
+    for match in sorted(matches, key=lambda match: match.start_time_raw):
+        headshots = shots = 0
+        played = False
+        for round in match.rounds:
+            opening = min(
+                (
+                    (kill.round_time, stat.id, kill.victim_id)
+                    for stat in round.player_stats
+                    for kill in stat.killed_players
+                ),
+                default=None,
+            )
+            if opening is not None:
+                first_kills += opening[1] == puuid
+                first_deaths += opening[2] == puuid
+            for stat in round.player_stats:
+                damage = stat.damaged_players.total_damage
+                damage_per_round.append(damage)
+                group = weapons[stat.economy.weapon_id]
+                group[0] += stat.economy.spent
+                group[1] += damage
+                group[2] += 1
+                if stat.id == puuid:
+                    played = True
+                    for player in stat.damaged_players:
+                        headshots += player.headshots
+                        shots += player.headshots + player.bodyshots + player.legshots
+        if played:
+            trend.append(headshots / max(shots, 1) * 100.0)
+
+    damage_per_round.sort()
+    return {
+        "trend": trend,
+        "median_damage": damage_per_round[len(damage_per_round) // 2],
+        "first_kills": (first_kills, first_deaths),
+        "weapons": {
+            weapon: damage * 1000.0 / max(spent, 1)
+            for weapon, (spent, damage, _) in weapons.items()
+        },
+    }
+
+
+def column_metrics(data, puuid):
+    distribution = analytics.damage_per_round(data, bins=20)
+    opening = analytics.first_kills(data, puuid)
+    return {
+        "first_kills": (opening["first_kills"], opening["first_deaths"]),
+        "trend": [
+            point["headshot_percentage"]
+            for point in analytics.headshot_trend(data, puuid)
+        ],
+        "median_damage": distribution["median"],
+        "weapons": {
+            group["key"]: group["damage_per_1000"]
+            for group in analytics.economy_efficiency(data)["weapons"]
+        },
+    }
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--matches", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=25)
+    args = parser.parse_args()
+
+    catalog = generate_catalog()
+    ValorantAPI.catalog.load(catalog)
+    match_jsons = generate_matches(catalog, args.matches, rounds=args.rounds)
+    blobs = [encode_match(Match(match_json)) for match_json in match_jsons]
+    puuid = match_jsons[0]["players"][0]["puuid"]
+
+    matches, decode_time = timed(lambda: [decode_match(blob) for blob in blobs])
+    data, flatten_time = timed(analytics.flatten_rows, blobs)
+    objects, object_time = timed(object_metrics, matches, puuid)
+    columns, column_time = timed(column_metrics, data, puuid)
+
+    assert np.allclose(objects["trend"], columns["trend"])
+    assert objects["first_kills"] == columns["first_kills"]
+    assert objects["weapons"].keys() == columns["weapons"].keys()
+    assert np.allclose(
+        [objects["weapons"][key] for key in objects["weapons"]],
+        [columns["weapons"][key] for key in objects["weapons"]],
+    )
+
+    rows = len(data.player_rounds["player"])
+    events = len(data.kills["stat"]) + len(data.damage["stat"])
+    print(f"{args.matches} matches, {rows} player-rounds, {events} kill/damage events")
+    print(
+        f"objects: {object_time * 1000:8.1f} ms metrics, "
+        f"{(decode_time + object_time) * 1000:8.1f} ms from stored rows"
+    )
+    print(
+        f"columns: {column_time * 1000:8.1f} ms metrics, "
+        f"{(flatten_time + column_time) * 1000:8.1f} ms from stored rows"
+    )
+    print(
+        f"speedup: {object_time / column_time:6.1f}x metrics, "
+        f"{(decode_time + object_time) / (flatten_time + column_time):6.1f}x from stored rows"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""Load test for the `/api/v1` match routes against a local Postgres.
+
+Stores a long synthetic history for one player, then drives the app
+in-process through Quart's test client with a number of concurrent
+clients: walking the history page by page, streaming it whole, fetching
+match details and revalidating them with `If-None-Match`. Reports
+requests per second and latency for each.
+
+    DATABASE_URL=postgresql://localhost/valorant python -m benchmarks.bench_api [--history 1000] [--clients 8]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+import asyncpg
+
+os.environ.setdefault("SECRET_KEY", "bench")
+
+import main as web
+from db import ensure_schema
+from matchparser import Catalog, Match, ValorantAPI
+from matchstore import encode_match
+from summaries import save_summaries
+from benchmarks.synthetic import generate_catalog, generate_matches
+
+SCHEMA = "bench_api"
+
+
+async def client_for(puuid):
+    client = web.app.test_client()
+    async with client.session_transaction() as session:
+        session["logged_in"] = True
+        session["puuid"] = puuid
+    return client
+
+
+async def walk_pages(client, limit):
+    requests = 0
+    matches = 0
+    cursor = ""
+    while True:
+        response = await client.get(f"/api/v1/matches?limit={limit}{cursor}")
+        assert response.status_code == 200
+        page = await response.get_json()
+        requests += 1
+        matches += len(page["matches"])
+        if page["next"] is None:
+            return requests, matches
+        cursor = f"&cursor={page['next']}"
+
+
+async def stream(client):
+    response = await client.get("/api/v1/matches?stream=1")
+    assert response.status_code == 200
+    page = await response.get_json()
+    return 1, len(page["matches"])
+
+
+async def details(client, match_ids, etag=False):
+    for match_id in match_ids:
+        headers = {"If-None-Match": f'"v1-{match_id}"'} if etag else {}
+        response = await client.get(f"/api/v1/matches/{match_id}", headers=headers)
+        assert response.status_code == (304 if etag else 200)
+        await response.get_data()
+    return len(match_ids), len(match_ids)
+
+
+async def load(name, clients, scenario):
+    latencies = []
+
+    async def run_client(client):
+        start = time.perf_counter()
+        requests, matches = await scenario(client)
+        latencies.append((time.perf_counter() - start) / requests)
+        return requests, matches
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(run_client(client) for client in clients))
+    elapsed = time.perf_counter() - start
+    requests = sum(result[0] for result in results)
+    matches = sum(result[1] for result in results)
+    print(
+        f"{name:>18}: {requests / elapsed:8.1f} req/s  {matches / elapsed:9.1f} matches/s"
+        f"  {statistics.median(latencies) * 1000:7.2f} ms/request"
+    )
+
+
+async def run(database_url, history_size, client_count):
+    catalog = generate_catalog()
+    ValorantAPI.catalog = Catalog(catalog.__getitem__)
+    matches = [
+        Match(match_json)
+        for match_json in generate_matches(
+            catalog, history_size, players=10, pool_size=10
+        )
+    ]
+    puuid = matches[0].players[0].id
+    match_ids = [match.id for match in matches if match.players.get_player_by_id(puuid)]
+
+    web.pool = await asyncpg.create_pool(
+        database_url, server_settings={"search_path": SCHEMA}, min_size=client_count
+    )
+    try:
+        async with web.pool.acquire() as con:
+            await con.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+            await con.execute(f"CREATE SCHEMA {SCHEMA}")
+            await con.execute(
+                "CREATE TABLE valorantmatches (id TEXT PRIMARY KEY, data BYTEA)"
+            )
+            await con.execute("CREATE TABLE riotaccounts (puuid TEXT PRIMARY KEY)")
+            await ensure_schema(con)
+            await con.executemany(
+                "INSERT INTO valorantmatches (id, data) VALUES ($1, $2)",
+                [(match.id, encode_match(match)) for match in matches],
+            )
+            for match in matches:
+                await save_summaries(con, match)
+
+        clients = [await client_for(puuid) for _ in range(client_count)]
+        detail_ids = match_ids[:20]
+        print(f"history of {len(match_ids)} matches, {client_count} clients")
+        await load("pages of 20", clients, lambda client: walk_pages(client, 20))
+        await load("pages of 100", clients, lambda client: walk_pages(client, 100))
+        await load("stream", clients, stream)
+        await load("match details", clients, lambda client: details(client, detail_ids))
+        await load(
+            "revalidated (304)",
+            clients,
+            lambda client: details(client, detail_ids, etag=True),
+        )
+    finally:
+        async with web.pool.acquire() as con:
+            await con.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        await web.pool.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--history", type=int, default=1000)
+    parser.add_argument("--clients", type=int, default=8)
+    args = parser.parse_args()
+    asyncio.run(run(os.getenv("DATABASE_URL"), args.history, args.clients))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""Stats page history lookup latency against a local Postgres.
+
+Builds a throwaway schema holding a 100-match history for one player and
+times the previous per-id `SELECT data ... WHERE id = $1` loop against the
+batched `fetch_history_summaries` path, both with and without precomputed
+summary rows.
+
+    DATABASE_URL=postgresql://localhost/valorant python -m benchmarks.bench_history_lookup
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+import asyncpg
+
+from db import ensure_schema
+from matchparser import Catalog, Match, ValorantAPI
+from matchstore import decode_match, encode_match
+from summaries import PlayerOverallStats, fetch_history_summaries, save_summaries
+from benchmarks.synthetic import generate_catalog, generate_matches
+
+SCHEMA = "bench_history_lookup"
+MAX_MATCHES = 20
+
+
+async def serial_lookup(pool, puuid, match_ids):
+    history = []
+    for match_id in match_ids:
+        async with pool.acquire() as con:
+            match_data = await con.fetchrow(
+                "SELECT data FROM valorantmatches WHERE id = $1", match_id
+            )
+        if match_data is None:
+            continue
+        if len(history) >= MAX_MATCHES:
+            break
+        match = decode_match(match_data["data"])
+        player = match.players.get_player_by_id(puuid)
+        history.append(PlayerOverallStats.for_player(match, player))
+    return history
+
+
+async def batched_lookup(pool, puuid, match_ids):
+    async with pool.acquire() as con:
+        return await fetch_history_summaries(con, puuid, match_ids, MAX_MATCHES)
+
+
+async def measure(name, lookup, pool, puuid, match_ids, repeat, before=None):
+    timings = []
+    for _ in range(repeat):
+        if before is not None:
+            await before()
+        start = time.perf_counter()
+        history = await lookup(pool, puuid, match_ids)
+        timings.append(time.perf_counter() - start)
+    assert len(history) == MAX_MATCHES
+    timings.sort()
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(
+        f"{name:>22}: median {statistics.median(timings) * 1000:7.2f} ms"
+        f"  p95 {p95 * 1000:7.2f} ms"
+    )
+
+
+async def run(database_url, history_size, repeat):
+    catalog = generate_catalog()
+    ValorantAPI.catalog = Catalog(catalog.__getitem__)
+    matches = [
+        Match(match_json)
+        for match_json in generate_matches(
+            catalog, history_size, players=10, pool_size=10
+        )
+    ]
+    puuid = matches[0].players[0].id
+    match_ids = [match.id for match in matches]
+
+    pool = await asyncpg.create_pool(
+        database_url, server_settings={"search_path": SCHEMA}, min_size=1
+    )
+    try:
+        async with pool.acquire() as con:
+            await con.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+            await con.execute(f"CREATE SCHEMA {SCHEMA}")
+            await con.execute(
+                "CREATE TABLE valorantmatches (id TEXT PRIMARY KEY, data BYTEA)"
+            )
+            await con.execute("CREATE TABLE riotaccounts (puuid TEXT PRIMARY KEY)")
+            await ensure_schema(con)
+            await con.executemany(
+                "INSERT INTO valorantmatches (id, data) VALUES ($1, $2)",
+                [(match.id, encode_match(match)) for match in matches],
+            )
+
+        async def drop_summaries():
+            async with pool.acquire() as con:
+                await con.execute("TRUNCATE matchplayers")
+
+        print(f"history of {history_size} matches, {MAX_MATCHES} rendered")
+        await measure("serial per-id", serial_lookup, pool, puuid, match_ids, repeat)
+        await measure(
+            "batched, no summaries",
+            batched_lookup,
+            pool,
+            puuid,
+            match_ids,
+            repeat,
+            before=drop_summaries,
+        )
+        async with pool.acquire() as con:
+            for match in matches:
+                await save_summaries(con, match)
+        await measure(
+            "batched, summaries", batched_lookup, pool, puuid, match_ids, repeat
+        )
+    finally:
+        async with pool.acquire() as con:
+            await con.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        await pool.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--history", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(run(os.getenv("DATABASE_URL"), args.history, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Page latency while a burst of matches is being ingested.
+
+Four ingest workers parse and encode a 200-match burst, either inline on
+the event loop (the previous behaviour) or through `ParseExecutor`, while a
+probe issues a page-sized request every 10 ms and records how long each
+waited for the loop.
+
+    python -m benchmarks.bench_ingest_latency [--matches 200]
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from matchparser import ValorantAPI
+from parsepool import ParseExecutor, parse_match
+from benchmarks.synthetic import generate_catalog, generate_matches
+
+
+async def probe(stop, latencies, interval=0.01):
+    while not stop.is_set():
+        scheduled = time.perf_counter()
+        await asyncio.sleep(interval)
+        latencies.append(time.perf_counter() - scheduled - interval)
+
+
+async def ingest(matches, parse, workers=4):
+    queue = list(matches)
+
+    async def worker():
+        while queue:
+            await parse(queue.pop())
+            await asyncio.sleep(0.002)  # stands in for the database write
+
+    await asyncio.gather(*(worker() for _ in range(workers)))
+
+
+async def run_mode(name, matches, parse):
+    stop = asyncio.Event()
+    latencies = []
+    probe_task = asyncio.create_task(probe(stop, latencies))
+    start = time.perf_counter()
+    await ingest(matches, parse)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await probe_task
+
+    latencies.sort()
+    p99 = latencies[max(int(len(latencies) * 0.99) - 1, 0)]
+    print(
+        f"{name:>8}: burst {elapsed:6.2f}s  page delay median "
+        f"{statistics.median(latencies) * 1000:6.2f} ms  p99 {p99 * 1000:7.2f} ms"
+    )
+
+
+async def run(count):
+    catalog = generate_catalog()
+    ValorantAPI.catalog.load(catalog)
+    matches = generate_matches(catalog, count)
+
+    async def inline(match_json):
+        return parse_match(match_json)
+
+    await run_mode("inline", matches, inline)
+    for kind in ("thread", "process"):
+        executor = ParseExecutor(kind)
+        await executor.start(catalog)
+        await run_mode(executor.kind, matches, executor.parse)
+        executor.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--matches", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(run(args.matches))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Eager versus lazy decoding for the two pages that decode matches.
+
+For each page, decodes synthetic competitive matches from the compact
+format, eagerly and with `lazy=True`, reads what the page reads, and
+reports the median time per match and the objects and memory each decoded
+match still holds afterwards (as it would in `MatchCache`).
+
+- match page: `PlayerOverallStats.for_player` plus the attributes
+  `match_stats.html` renders for every player and round;
+- stats card: `summarize_match`, the stats page's fallback for matches
+  without summary rows.
+
+    python -m benchmarks.bench_lazy_decode [--matches 50] [--rounds 25]
+"""
+
+import argparse
+import gc
+import statistics
+import time
+import tracemalloc
+
+from matchparser import Match, ValorantAPI
+from matchstore import decode_match, encode_match
+from summaries import PlayerOverallStats, summarize_match
+from benchmarks.synthetic import generate_catalog, generate_matches
+
+
+def match_page(match):
+    player = match.players[0]
+    PlayerOverallStats.for_player(match, player)
+    for player in match.players:
+        (player.display_name, player.team.name, player.overall_stats.score)
+    for round in match.rounds:
+        (round.winner.name, round.serial, round.spike_info.site, round.result_code)
+
+
+def stats_card(match):
+    summarize_match(match)
+
+
+def time_page(blobs, page, lazy):
+    timings = []
+    for blob in blobs:
+        start = time.perf_counter()
+        page(decode_match(blob, lazy=lazy))
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def retained(blobs, page, lazy):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    matches = []
+    for blob in blobs:
+        match = decode_match(blob, lazy=lazy)
+        page(match)
+        matches.append(match)
+    gc.collect()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    stats = after.compare_to(before, "filename")
+    size = sum(stat.size_diff for stat in stats)
+    blocks = sum(stat.count_diff for stat in stats)
+    return size / len(blobs), blocks / len(blobs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--matches", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=25)
+    args = parser.parse_args()
+
+    catalog = generate_catalog()
+    ValorantAPI.catalog.load(catalog)
+    match_jsons = generate_matches(catalog, args.matches, rounds=args.rounds)
+    blobs = [encode_match(Match(match_json)) for match_json in match_jsons]
+    Match(match_jsons[0])  # warm the catalog indexes
+
+    print(f"{args.matches} matches, {args.rounds} rounds")
+    for name, page in (("match page", match_page), ("stats card", stats_card)):
+        for lazy in (False, True):
+            median = time_page(blobs, page, lazy)
+            size, blocks = retained(blobs, page, lazy)
+            print(
+                f"{name:>10} {'lazy' if lazy else 'eager':>5}: "
+                f"{median * 1000:6.2f} ms  {blocks:6.0f} objects  "
+                f"{size / 1024:6.1f} KiB per match"
+            )
+
+
+if __name__ == "__main__":
+    main()
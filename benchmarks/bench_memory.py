@@ -0,0 +1,57 @@
+"""Memory held by one decoded `Match`, measured with tracemalloc.
+
+Decodes a batch of synthetic competitive matches from the compact storage
+format and reports the retained size and allocation count per match. The
+static catalog is loaded beforehand, so shared catalog items are not
+counted.
+
+    python -m benchmarks.bench_memory [--matches 50] [--rounds 25]
+"""
+
+import argparse
+import gc
+import tracemalloc
+
+from matchparser import Match, ValorantAPI
+from matchstore import decode_match, encode_match
+from benchmarks.synthetic import generate_catalog, generate_matches
+
+
+def measure(build, count):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    matches = build()
+    gc.collect()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    stats = after.compare_to(before, "filename")
+    size = sum(stat.size_diff for stat in stats)
+    blocks = sum(stat.count_diff for stat in stats)
+    assert len(matches) == count
+    return size / count, blocks / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--matches", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=25)
+    args = parser.parse_args()
+
+    catalog = generate_catalog()
+    ValorantAPI.catalog.load(catalog)
+    match_jsons = generate_matches(catalog, args.matches, rounds=args.rounds)
+    blobs = [encode_match(Match(match_json)) for match_json in match_jsons]
+    # Warm the catalog indexes so their instances are not attributed to a match.
+    Match(match_jsons[0])
+
+    size, blocks = measure(lambda: [decode_match(blob) for blob in blobs], args.matches)
+    print(
+        f"{args.matches} matches, {args.rounds} rounds: "
+        f"{size / 1024:.1f} KiB and {blocks:.0f} allocations per decoded match"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Per-match parse time for `Match(...)` on a synthetic competitive fixture.
+
+Compares the indexed `Catalog` against the previous linear-scan lookups,
+which constructed a new catalog object on every hit, and the dict-backed
+player and team indexes against the previous linear `get_*_by_id` scans.
+
+    python -m benchmarks.bench_parse [--rounds 25] [--repeat 50]
+"""
+
+import argparse
+import contextlib
+import time
+
+from matchparser import (
+    CATALOG_ENDPOINTS,
+    Catalog,
+    Match,
+    PlayerStats,
+    Players,
+    Teams,
+    ValorantAPI,
+)
+from benchmarks.synthetic import generate_catalog, generate_match
+
+
+class LinearCatalog:
+    """The lookup strategy `ValorantAPI` used before `Catalog`."""
+
+    def __init__(self, fetch):
+        self.fetch = fetch
+
+    def get(self, endpoint, key):
+        model, field, items = CATALOG_ENDPOINTS[endpoint]
+        for item in items(self.fetch(endpoint)):
+            if item[field] == key:
+                return model(item)
+        return None
+
+
+def _linear_get(attribute):
+    def get(self, item_id):
+        if item_id is None:
+            return None
+
+        for item in getattr(self, attribute):
+            if item.id == item_id:
+                return item
+        return None
+
+    return get
+
+
+@contextlib.contextmanager
+def linear_lookups():
+    """Swap the container indexes for the linear scans they replaced."""
+    patched = [
+        (Teams, "get_team_by_id", "teams"),
+        (Players, "get_player_by_id", "players"),
+        (PlayerStats, "get_player_by_id", "player_stats"),
+    ]
+    originals = [getattr(container, name) for container, name, _ in patched]
+    for container, name, attribute in patched:
+        setattr(container, name, _linear_get(attribute))
+    try:
+        yield
+    finally:
+        for (container, name, _), original in zip(patched, originals):
+            setattr(container, name, original)
+
+
+def time_parse(match_json, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        Match(match_json)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return timings[len(timings) // 2], timings[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=25)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    catalog = generate_catalog()
+    match_json = generate_match(catalog, rounds=args.rounds)
+
+    modes = (
+        ("linear catalog", LinearCatalog, linear_lookups),
+        ("linear players", Catalog, linear_lookups),
+        ("indexed", Catalog, contextlib.nullcontext),
+    )
+    print(f"{args.rounds} rounds, {len(match_json['players'])} players")
+    for name, catalog_type, lookups in modes:
+        ValorantAPI.catalog = catalog_type(catalog.__getitem__)
+        with lookups():
+            Match(match_json)  # warm the indexes
+            median, best = time_parse(match_json, args.repeat)
+        print(f"{name:>15}: median {median * 1000:.3f} ms  best {best * 1000:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""RiotClient behaviour against the local 429-emitting Riot stub.
+
+Fires a burst of background match downloads at a stub whose real limit is
+lower than the client's starting guess, with an interactive request in the
+middle of it, then a second burst once the client has learnt the limit.
+Reports 429s, completion and interactive latency, and fails if a download
+did not end 200, the second burst still saw 429s or the interactive
+request waited past the client's budget.
+
+    python -m benchmarks.bench_riot_client [--requests 60] [--limit 10] [--retry-after 1]
+"""
+
+import argparse
+import asyncio
+import collections
+import time
+
+import aiohttp
+
+from riotclient import INTERACTIVE, RiotClient
+from benchmarks.riot_stub import RiotStub
+from benchmarks.synthetic import generate_catalog, generate_matches
+
+# Scheduling slack allowed on top of the interactive wait budget.
+LATENCY_MARGIN = 0.5
+
+
+async def run(requests, limit, retry_after=1, interactive_max_wait=2):
+    catalog = generate_catalog()
+    matches = generate_matches(catalog, requests * 2)
+    stub = RiotStub(matches, app_limit=(limit, 1), retry_after=retry_after)
+    base_url = await stub.start()
+    puuid = matches[0]["players"][0]["puuid"]
+
+    async with aiohttp.ClientSession() as session:
+        client = RiotClient(
+            session,
+            app_limits=f"{limit * 2}:1",
+            interactive_max_wait=interactive_max_wait,
+        )
+
+        def download(match):
+            return client.get(
+                f"{base_url}/val/match/v1/matches/{match['matchInfo']['matchId']}"
+            )
+
+        async def interactive():
+            await asyncio.sleep(0.5)
+            start = time.perf_counter()
+            status, _ = await client.get(
+                f"{base_url}/val/match/v1/matchlists/by-puuid/{puuid}",
+                priority=INTERACTIVE,
+            )
+            return status, time.perf_counter() - start
+
+        start = time.perf_counter()
+        results = await asyncio.gather(
+            *(download(match) for match in matches[:requests]), interactive()
+        )
+        elapsed = time.perf_counter() - start
+        rate_limited = stub.rate_limited
+
+        adapted = await asyncio.gather(
+            *(download(match) for match in matches[requests:])
+        )
+    await stub.stop()
+
+    interactive_status, interactive_latency = results[-1]
+    return {
+        "statuses": collections.Counter(status for status, _ in results[:-1] + adapted),
+        "elapsed": elapsed,
+        "rate_limited": rate_limited,
+        "rate_limited_after_adapting": stub.rate_limited - rate_limited,
+        "interactive_status": interactive_status,
+        "interactive_latency": interactive_latency,
+        "interactive_max_wait": interactive_max_wait,
+    }
+
+
+def check(result):
+    """Raise AssertionError unless the client behaved."""
+    assert set(result["statuses"]) == {
+        200
+    }, f"background statuses {dict(result['statuses'])}"
+    assert (
+        result["rate_limited_after_adapting"] == 0
+    ), f"{result['rate_limited_after_adapting']} 429s after the client adapted"
+    assert result["interactive_status"] in (200, 429), result["interactive_status"]
+    budget = result["interactive_max_wait"] + LATENCY_MARGIN
+    assert (
+        result["interactive_latency"] <= budget
+    ), f"interactive request took {result['interactive_latency']:.2f}s (budget {budget:.2f}s)"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=60)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--retry-after", type=int, default=1)
+    args = parser.parse_args()
+    result = asyncio.run(run(args.requests, args.limit, args.retry_after))
+
+    elapsed = result["elapsed"]
+    print(
+        f"background: {dict(result['statuses'])}, first burst in {elapsed:.2f}s "
+        f"({args.requests / elapsed:.1f} req/s, stub limit {args.limit}/s)"
+    )
+    print(
+        f"stub answered {result['rate_limited']} requests with 429, "
+        f"{result['rate_limited_after_adapting']} after the client adapted"
+    )
+    print(
+        f"interactive: {result['interactive_status']} after "
+        f"{result['interactive_latency'] * 1000:.0f} ms"
+    )
+    check(result)
+
+
+if __name__ == "__main__":
+    main()
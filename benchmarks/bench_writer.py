@@ -0,0 +1,104 @@
+"""Match persistence throughput against a local Postgres.
+
+Writes the same parsed matches into a throwaway schema with the previous
+per-row path (one transaction per match: an INSERT plus its summary rows)
+and with `MatchWriter`, and reports matches and rows per second for each.
+
+    DATABASE_URL=postgresql://localhost/valorant python -m benchmarks.bench_writer
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+import asyncpg
+
+from db import ensure_schema
+from matchparser import Catalog, ValorantAPI
+from matchwriter import MatchWriter
+from parsepool import parse_match
+from summaries import save_summaries
+from benchmarks.synthetic import generate_catalog, generate_matches
+
+SCHEMA = "bench_writer"
+
+
+async def per_row(pool, parsed, workers):
+    queue = list(parsed)
+
+    async def worker():
+        while queue:
+            match_id, data, summary_rows = queue.pop()
+            async with pool.acquire() as con:
+                async with con.transaction():
+                    await con.execute(
+                        "INSERT INTO valorantmatches (id, data) VALUES ($1, $2)",
+                        match_id,
+                        data,
+                    )
+                    await save_summaries(con, None, summary_rows)
+
+    await asyncio.gather(*(worker() for _ in range(workers)))
+
+
+async def batched(pool, parsed, workers):
+    writer = MatchWriter(pool)
+    writer.start()
+    results = await asyncio.gather(*(writer.add(*entry) for entry in parsed))
+    results = await asyncio.gather(*results)
+    await writer.stop()
+    assert all(results)
+
+
+async def run(database_url, count, workers):
+    catalog = generate_catalog()
+    ValorantAPI.catalog = Catalog(catalog.__getitem__)
+    parsed = []
+    for match_json in generate_matches(catalog, count):
+        data, summary_rows, _, _ = parse_match(match_json)
+        parsed.append((match_json["matchInfo"]["matchId"], data, summary_rows))
+    rows = sum(1 + len(summary_rows) for _, _, summary_rows in parsed)
+
+    pool = await asyncpg.create_pool(
+        database_url, server_settings={"search_path": SCHEMA}, min_size=workers
+    )
+    try:
+        print(f"{count} matches, {rows} rows, {workers} connections")
+        for name, write in (("per-row", per_row), ("MatchWriter", batched)):
+            async with pool.acquire() as con:
+                await con.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+                await con.execute(f"CREATE SCHEMA {SCHEMA}")
+                await con.execute(
+                    "CREATE TABLE valorantmatches (id TEXT PRIMARY KEY, data BYTEA)"
+                )
+                await con.execute("CREATE TABLE riotaccounts (puuid TEXT PRIMARY KEY)")
+                await ensure_schema(con)
+
+            start = time.perf_counter()
+            await write(pool, parsed, workers)
+            elapsed = time.perf_counter() - start
+
+            async with pool.acquire() as con:
+                stored = await con.fetchval("SELECT count(*) FROM valorantmatches")
+            assert stored == count
+            print(
+                f"{name:>12}: {elapsed:6.2f}s  {count / elapsed:8.1f} matches/s"
+                f"  {rows / elapsed:9.1f} rows/s"
+            )
+    finally:
+        async with pool.acquire() as con:
+            await con.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        await pool.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--matches", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+    asyncio.run(run(os.getenv("DATABASE_URL"), args.matches, args.workers))
+
+
+if __name__ == "__main__":
+    main()
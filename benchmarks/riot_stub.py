@@ -0,0 +1,108 @@
+"""Local stand-in for the Riot match and account APIs.
+
+Serves synthetic matches and matchlists and enforces a fixed-window
+application rate limit the way Riot does, answering 429 with
+`Retry-After` and `X-Rate-Limit-Type` once the window is spent.
+"""
+
+import collections
+import time
+
+from aiohttp import web
+
+
+class RiotStub:
+    def __init__(self, matches=(), app_limit=(20, 1), retry_after=1):
+        self.matches = {}
+        self.histories = collections.defaultdict(list)
+        for match in matches:
+            self.add_match(match)
+        self.app_limit = app_limit
+        self.retry_after = retry_after
+        self.window = collections.deque()
+        self.requests = collections.Counter()
+        self.rate_limited = 0
+
+    def add_match(self, match):
+        match_id = match["matchInfo"]["matchId"]
+        if match_id not in self.matches:
+            for player in match["players"]:
+                self.histories[player["puuid"]].append(match_id)
+        self.matches[match_id] = match
+
+    def history(self, puuid):
+        history = []
+        for match_id in self.histories.get(puuid, ()):
+            info = self.matches[match_id]["matchInfo"]
+            history.append(
+                {
+                    "matchId": match_id,
+                    "gameStartTimeMillis": info["gameStartMillis"],
+                    "queueId": info["queueId"],
+                }
+            )
+        history.sort(key=lambda entry: entry["gameStartTimeMillis"], reverse=True)
+        return history
+
+    def _rate_limit_headers(self):
+        count, seconds = self.app_limit
+        return {
+            "X-App-Rate-Limit": f"{count}:{seconds}",
+            "X-App-Rate-Limit-Count": f"{len(self.window)}:{seconds}",
+        }
+
+    @web.middleware
+    async def limit(self, request, handler):
+        count, seconds = self.app_limit
+        now = time.monotonic()
+        while self.window and self.window[0] <= now - seconds:
+            self.window.popleft()
+        if len(self.window) >= count:
+            self.rate_limited += 1
+            headers = self._rate_limit_headers()
+            headers["Retry-After"] = str(self.retry_after)
+            headers["X-Rate-Limit-Type"] = "application"
+            return web.json_response({}, status=429, headers=headers)
+
+        self.window.append(now)
+        response = await handler(request)
+        response.headers.update(self._rate_limit_headers())
+        return response
+
+    async def match(self, request):
+        self.requests["match"] += 1
+        match = self.matches.get(request.match_info["match_id"])
+        if match is None:
+            return web.json_response({}, status=404)
+        return web.json_response(match)
+
+    async def matchlist(self, request):
+        self.requests["matchlist"] += 1
+        puuid = request.match_info["puuid"]
+        return web.json_response({"puuid": puuid, "history": self.history(puuid)})
+
+    async def account(self, request):
+        self.requests["account"] += 1
+        puuid = request.match_info["puuid"]
+        return web.json_response(
+            {"puuid": puuid, "gameName": f"Stub{puuid[:4]}", "tagLine": "0000"}
+        )
+
+    def app(self):
+        app = web.Application(middlewares=[self.limit])
+        app.router.add_get("/val/match/v1/matches/{match_id}", self.match)
+        app.router.add_get("/val/match/v1/matchlists/by-puuid/{puuid}", self.matchlist)
+        app.router.add_get("/riot/account/v1/accounts/by-puuid/{puuid}", self.account)
+        return app
+
+    async def start(self, host="127.0.0.1", port=0):
+        """Serve on `host`; returns the base URL."""
+        self.runner = web.AppRunner(self.app())
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        return f"http://{host}:{port}"
+
+    async def stop(self):
+        await self.runner.cleanup()
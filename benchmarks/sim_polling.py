@@ -0,0 +1,195 @@
+"""Fixed 30-second polling versus `PollSchedule`, in simulated time.
+
+Generates a population of accounts (a few active players with sessions of
+back-to-back games, some casual ones, the rest dormant), releases their
+matches on the local Riot stub as simulated time passes, and polls the
+stub's matchlists over HTTP with each strategy. Players open their stats
+page after some games, which bumps them under `PollSchedule`. Reports the
+matchlist requests each strategy spends and how long new matches take to
+be discovered.
+
+    python -m benchmarks.sim_polling [--accounts 100] [--hours 4] [--seed 0]
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import uuid
+
+import aiohttp
+
+from ingest import PollSchedule
+from benchmarks.riot_stub import RiotStub
+
+EPOCH = 1_700_000_000
+FIXED_INTERVAL = 30
+STEP = 1
+PUBLISH_DELAY = 60  # seconds between a game ending and Riot listing it
+VISIT_CHANCE = 0.5
+
+
+def _match(puuid, start):
+    return {
+        "matchInfo": {
+            "matchId": str(uuid.UUID(int=random.getrandbits(128))),
+            "gameStartMillis": int((EPOCH + start) * 1000),
+            "queueId": "competitive",
+        },
+        "players": [{"puuid": puuid}],
+    }
+
+
+def generate_activity(accounts, seconds, seed):
+    """Return the accounts, their games `(available_at, match)` and the
+    page visits `(at, puuid)`, times in seconds from the start."""
+    rng = random.Random(seed)
+    random.seed(seed)
+    population = []
+    games = []
+    visits = []
+    for _ in range(accounts):
+        puuid = str(uuid.UUID(int=rng.getrandbits(128)))
+        kind = rng.choices(["active", "casual", "dormant"], [0.2, 0.3, 0.5])[0]
+        idle = {"active": 6 * 3600, "casual": 3 * 86400, "dormant": 30 * 86400}[kind]
+        history = [_match(puuid, -rng.uniform(3600, idle))]
+        population.append(
+            {
+                "puuid": puuid,
+                "last_match_start": history[0]["matchInfo"]["gameStartMillis"],
+                "history": history,
+            }
+        )
+
+        sessions = {
+            "active": rng.randint(1, 3),
+            "casual": rng.randint(0, 1),
+            "dormant": 0,
+        }[kind]
+        for _ in range(sessions):
+            start = rng.uniform(0, seconds)
+            for _ in range(
+                rng.randint(2, 5) if kind == "active" else rng.randint(1, 2)
+            ):
+                end = start + rng.uniform(30 * 60, 45 * 60)
+                available_at = end + PUBLISH_DELAY
+                if available_at < seconds:
+                    games.append((available_at, _match(puuid, start)))
+                    if rng.random() < VISIT_CHANCE:
+                        visits.append((available_at + rng.uniform(0, 300), puuid))
+                start = end + rng.uniform(60, 300)
+    games.sort(key=lambda game: game[0])
+    visits.sort()
+    return population, games, visits
+
+
+class Simulation:
+    def __init__(self, population, games, visits, seconds):
+        self.population = population
+        self.games = games
+        self.game_count = len(games)
+        self.visits = visits
+        self.seconds = seconds
+        self.now = 0
+        self.stub = RiotStub(
+            [match for account in population for match in account["history"]],
+            app_limit=(10**9, 1),
+        )
+        self.known = {
+            account["puuid"]: {
+                match["matchInfo"]["matchId"] for match in account["history"]
+            }
+            for account in population
+        }
+        self.available_at = {}
+        self.latencies = []
+
+    async def poll(self, session, base_url, puuid):
+        async with session.get(
+            f"{base_url}/val/match/v1/matchlists/by-puuid/{puuid}"
+        ) as response:
+            history = (await response.json())["history"]
+        new = [
+            entry["matchId"]
+            for entry in history
+            if entry["matchId"] not in self.known[puuid]
+        ]
+        for match_id in new:
+            self.known[puuid].add(match_id)
+            self.latencies.append(self.now - self.available_at[match_id])
+        return bool(new)
+
+    async def run(self, strategy):
+        base_url = await self.stub.start()
+        try:
+            async with aiohttp.ClientSession() as session:
+                await strategy(self, lambda puuid: self.poll(session, base_url, puuid))
+        finally:
+            await self.stub.stop()
+        return self.stub.requests["matchlist"], self.latencies, self.game_count
+
+    def advance(self):
+        """Release the games and return the visits up to `now`."""
+        while self.games and self.games[0][0] <= self.now:
+            available_at, match = self.games.pop(0)
+            self.available_at[match["matchInfo"]["matchId"]] = available_at
+            self.stub.add_match(match)
+        visits = []
+        while self.visits and self.visits[0][0] <= self.now:
+            visits.append(self.visits.pop(0)[1])
+        return visits
+
+
+async def fixed_loop(simulation, poll):
+    puuids = [account["puuid"] for account in simulation.population]
+    while simulation.now < simulation.seconds:
+        simulation.advance()
+        await asyncio.gather(*(poll(puuid) for puuid in puuids))
+        simulation.now += FIXED_INTERVAL
+
+
+async def adaptive(simulation, poll):
+    schedule = PollSchedule(clock=lambda: EPOCH + simulation.now)
+    schedule.sync(simulation.population)
+    while simulation.now < simulation.seconds:
+        for puuid in simulation.advance():
+            schedule.bump(puuid)
+        due = schedule.pop_due()
+        found = await asyncio.gather(*(poll(puuid) for puuid in due))
+        for puuid, new in zip(due, found):
+            schedule.record(puuid, new)
+        simulation.now += STEP
+
+
+def report(name, requests, latencies, games, accounts, hours):
+    latencies = sorted(latencies)
+    p95 = latencies[max(int(len(latencies) * 0.95) - 1, 0)] if latencies else 0
+    print(
+        f"{name:>10}: {requests:6d} matchlist requests "
+        f"({requests / hours / 60:6.1f}/min, {requests / accounts / hours:5.1f} per account-hour)  "
+        f"discovered {len(latencies)}/{games}  latency median "
+        f"{statistics.median(latencies) if latencies else 0:6.1f}s  p95 {p95:6.1f}s  "
+        f"max {latencies[-1] if latencies else 0:6.1f}s"
+    )
+
+
+async def run(accounts, hours, seed):
+    seconds = hours * 3600
+    for name, strategy in (("fixed 30s", fixed_loop), ("adaptive", adaptive)):
+        population, games, visits = generate_activity(accounts, seconds, seed)
+        simulation = Simulation(population, games, visits, seconds)
+        requests, latencies, game_count = await simulation.run(strategy)
+        report(name, requests, latencies, game_count, accounts, hours)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--accounts", type=int, default=100)
+    parser.add_argument("--hours", type=float, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    asyncio.run(run(args.accounts, args.hours, args.seed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,424 @@
+"""Offline benchmark suite for the parse, store and render hot paths.
+
+Loads a frozen catalog snapshot through `StaticDataLoader` (written from
+`generate_catalog` unless `--catalog` names one) and generates synthetic
+matches, then times:
+
+- `Match(...)` construction from Riot JSON;
+- `encode_match`, and `decode_match` eager and lazy;
+- `PlayerOverallStats.for_player` and `summarize_match`;
+- `stats.html` and `match_stats.html` rendering;
+- with `DATABASE_URL` set, the `/` and `/matches/<id>` handlers through
+  Quart's test client against a throwaway schema. The match page is timed
+  with nothing cached, for a lobby member whose page is not rendered yet
+  (match and shared fragments cached), from `PageCache` and revalidated
+  with `If-None-Match`.
+
+Results are written as JSON; `--compare` prints each case against an
+earlier results file, so two commits can be compared on the same inputs.
+
+    python -m benchmarks.suite [--output results.json] [--compare baseline.json]
+        [--matches 20] [--rounds 25] [--players 10] [--kills 9] [--damage 3]
+        [--repeat 200] [--only render]
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("SECRET_KEY", "bench")
+
+import asyncpg
+from markupsafe import Markup
+from quart import render_template
+
+import main as web
+from career import CAREER_TOTALS, Career
+from db import ensure_schema, save_matchlist
+from matchcache import MatchCache
+from pagecache import PageCache
+from matchparser import Match
+from matchstore import decode_match, encode_match
+from staticdata import StaticDataLoader
+from summaries import (
+    SUMMARY_COLUMNS,
+    MatchSummary,
+    PlayerOverallStats,
+    save_summaries,
+    summarize_match,
+)
+from benchmarks.synthetic import generate_catalog, generate_matches
+
+SCHEMA = "bench_suite"
+RESULTS_VERSION = 1
+
+
+def load_catalog(path):
+    """Load the catalog snapshot at `path`, writing a synthetic one first
+    when it is missing. Returns the snapshot's sha256."""
+    loader = StaticDataLoader(path=path, offline=True)
+    if not os.path.exists(path):
+        loader.save_snapshot(generate_catalog(), fetched_at=0)
+    if not loader.load_snapshot():
+        raise Exception(f"No usable catalog snapshot at {path}")
+    with open(path, "rb") as file:
+        return hashlib.sha256(file.read()).hexdigest()
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def summarize(samples):
+    samples = sorted(samples)
+    return {
+        "runs": len(samples),
+        "median_ms": statistics.median(samples) * 1000,
+        "p95_ms": samples[max(int(len(samples) * 0.95) - 1, 0)] * 1000,
+        "min_ms": samples[0] * 1000,
+    }
+
+
+def measure(func, items, repeat):
+    """Time `func(item)` `repeat` times, cycling through `items`."""
+    for item in items[:3]:
+        func(item)
+    samples = []
+    for i in range(repeat):
+        item = items[i % len(items)]
+        start = time.perf_counter()
+        func(item)
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+async def measure_async(func, items, repeat, warmup=3):
+    for item in items[:warmup]:
+        await func(item)
+    samples = []
+    for i in range(repeat):
+        item = items[i % len(items)]
+        start = time.perf_counter()
+        await func(item)
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+def career_for(rows):
+    """The `Career` the `playercareer` trigger would hold for these rows."""
+    totals = {}
+    for row in rows:
+        summary = dict(zip(SUMMARY_COLUMNS, row))
+        summary["matches"] = 1
+        summary["wins"] = int(bool(summary["won"]))
+        for dimension, key in (
+            ("all", ""),
+            ("agent", summary["agent"]),
+            ("map", summary["map_url"]),
+            ("queue", summary["queue"]),
+        ):
+            group = totals.setdefault(
+                (dimension, key),
+                {"dimension": dimension, "key": key, **dict.fromkeys(CAREER_TOTALS, 0)},
+            )
+            for total in CAREER_TOTALS:
+                group[total] += summary[total]
+    return Career(totals.values())
+
+
+def offline_cases(match_jsons, repeat):
+    results = {}
+    matches = [Match(match_json) for match_json in match_jsons]
+    rows = [encode_match(match) for match in matches]
+    players = [(match, match.players[0]) for match in matches]
+
+    results["match_parse"] = measure(Match, match_jsons, repeat)
+    results["match_encode"] = measure(encode_match, matches, repeat)
+    results["match_decode"] = measure(decode_match, rows, repeat)
+    results["match_decode_lazy"] = measure(
+        lambda row: decode_match(row, lazy=True), rows, repeat
+    )
+    results["overall_stats"] = measure(
+        lambda pair: PlayerOverallStats.for_player(*pair), players, repeat
+    )
+    results["summarize_match"] = measure(summarize_match, matches, repeat)
+    return results
+
+
+async def render_cases(match_jsons, repeat):
+    matches = [Match(match_json) for match_json in match_jsons]
+    puuid = matches[0].players[0].id
+    rows = [
+        row
+        for match in matches
+        for row in summarize_match(match)
+        if row[SUMMARY_COLUMNS.index("puuid")] == puuid
+    ]
+    history = [MatchSummary(dict(zip(SUMMARY_COLUMNS, row))) for row in rows]
+    career = career_for(rows)
+    pages = [
+        (
+            decode_match(encode_match(match), lazy=True),
+            match.players[0].id,
+        )
+        for match in matches
+    ]
+
+    async def stats_page(_):
+        await render_template(
+            "stats.html",
+            matches=history,
+            career=career,
+            ordinal=web.ordinal,
+            username="Player0#0000",
+        )
+
+    async def match_page(page):
+        match, puuid = page
+        player = match.players.get_player_by_id(puuid)
+        players_table = await render_template("match_players.html", match=match)
+        rounds_overview = await render_template("match_rounds.html", match=match)
+        await render_template(
+            "match_stats.html",
+            match=match,
+            current_player=player,
+            overall_stats=PlayerOverallStats.for_player(match, player),
+            players_table=Markup(players_table),
+            rounds_overview=Markup(rounds_overview),
+        )
+
+    results = {}
+    async with web.app.test_request_context("/"):
+        results["render_stats"] = await measure_async(stats_page, [None], repeat)
+        results["render_match_stats"] = await measure_async(match_page, pages, repeat)
+    return results
+
+
+async def route_cases(database_url, match_jsons, repeat):
+    # The synthetic catalog is loaded; pages would otherwise answer 503.
+    web.static_data.loaded.set()
+    matches = [Match(match_json) for match_json in match_jsons]
+    puuid = matches[0].players[0].id
+    history = sorted(
+        (match for match in matches if match.players.get_player_by_id(puuid)),
+        key=lambda match: match.start_time_raw,
+        reverse=True,
+    )
+
+    web.pool = await asyncpg.create_pool(
+        database_url, server_settings={"search_path": SCHEMA}, min_size=1
+    )
+    try:
+        async with web.pool.acquire() as con:
+            await con.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+            await con.execute(f"CREATE SCHEMA {SCHEMA}")
+            await con.execute(
+                "CREATE TABLE valorantmatches (id TEXT PRIMARY KEY, data BYTEA)"
+            )
+            await con.execute("CREATE TABLE riotaccounts (puuid TEXT PRIMARY KEY)")
+            await ensure_schema(con)
+            await con.executemany(
+                "INSERT INTO valorantmatches (id, data) VALUES ($1, $2)",
+                [(match.id, encode_match(match)) for match in matches],
+            )
+            for match in matches:
+                await save_summaries(con, match)
+            await con.execute(
+                "INSERT INTO riotaccounts (puuid, riot_id) VALUES ($1, $2)",
+                puuid,
+                "Player0#0000",
+            )
+            await save_matchlist(
+                con,
+                puuid,
+                [
+                    {"matchId": match.id, "gameStartTimeMillis": match.start_time_raw}
+                    for match in history
+                ],
+            )
+
+        clients = {}
+        for player in history[0].players:
+            clients[player.id] = web.app.test_client()
+            async with clients[player.id].session_transaction() as session:
+                session["logged_in"] = True
+                session["puuid"] = player.id
+        client = clients[puuid]
+        etags = {}
+
+        async def get(path, client=client, status=200, headers=None):
+            response = await client.get(path, headers=headers)
+            assert response.status_code == status, (path, response.status_code)
+            await response.get_data()
+            etags[path] = response.headers.get("ETag")
+
+        async def cold_match_page(path):
+            web.match_cache = MatchCache()
+            web.page_cache = PageCache()
+            await get(path)
+
+        async def revalidate(path):
+            await get(path, status=304, headers={"If-None-Match": etags[path]})
+
+        match_paths = [f"/matches/{match.id}" for match in history]
+        results = {}
+        results["route_stats"] = await measure_async(get, ["/"], repeat)
+        results["route_match_cold"] = await measure_async(
+            cold_match_page, match_paths, repeat
+        )
+
+        # Every (viewer, match) page once, after one lobby member's visit.
+        web.match_cache = MatchCache()
+        web.page_cache = PageCache()
+        for path in match_paths:
+            await get(path)
+        views = [
+            (other, path) for path in match_paths for other in clients if other != puuid
+        ]
+        results["route_match_new_viewer"] = await measure_async(
+            lambda view: get(view[1], client=clients[view[0]]),
+            views,
+            min(repeat, len(views)),
+            warmup=0,
+        )
+        results["route_match_warm"] = await measure_async(get, match_paths, repeat)
+        results["route_match_304"] = await measure_async(
+            revalidate, match_paths, repeat
+        )
+        return results
+    finally:
+        async with web.pool.acquire() as con:
+            await con.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        await web.pool.close()
+
+
+def compare(results, baseline):
+    print(f"\ncompared with {baseline['meta'].get('commit') or 'baseline'}:")
+    for name, result in results.items():
+        before = baseline["results"].get(name)
+        if before is None:
+            print(f"{name:>22}: new")
+            continue
+        ratio = result["median_ms"] / before["median_ms"]
+        print(
+            f"{name:>22}: {before['median_ms']:9.3f} -> {result['median_ms']:9.3f} ms"
+            f"  ({(ratio - 1) * 100:+6.1f}%)"
+        )
+
+
+async def run(args):
+    catalog_path = args.catalog or os.path.join(
+        tempfile.gettempdir(), "vms_bench_catalog.json"
+    )
+    catalog_sha256 = load_catalog(catalog_path)
+    with open(catalog_path, encoding="utf-8") as file:
+        datasets = json.load(file)["datasets"]
+    match_jsons = generate_matches(
+        datasets,
+        args.matches,
+        seed=args.seed,
+        rounds=args.rounds,
+        players=args.players,
+        pool_size=args.players,
+        kills=args.kills,
+        damage_events=args.damage,
+    )
+
+    results = {}
+    results.update(offline_cases(match_jsons, args.repeat))
+    results.update(await render_cases(match_jsons, args.repeat))
+    database_url = os.getenv("DATABASE_URL")
+    if database_url:
+        results.update(await route_cases(database_url, match_jsons, args.repeat))
+    else:
+        print("DATABASE_URL not set, skipping the route handlers")
+    if args.only:
+        results = {
+            name: result
+            for name, result in results.items()
+            if re.search(args.only, name)
+        }
+
+    for name, result in results.items():
+        print(
+            f"{name:>22}: median {result['median_ms']:9.3f} ms  "
+            f"p95 {result['p95_ms']:9.3f} ms  min {result['min_ms']:9.3f} ms"
+        )
+
+    output = {
+        "version": RESULTS_VERSION,
+        "meta": {
+            "commit": git_commit(),
+            "created_at": time.time(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "catalog_sha256": catalog_sha256,
+            "params": {
+                name: getattr(args, name)
+                for name in (
+                    "matches",
+                    "rounds",
+                    "players",
+                    "kills",
+                    "damage",
+                    "seed",
+                    "repeat",
+                )
+            },
+        },
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(output, file, indent=2)
+    print(f"Wrote {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            baseline = json.load(file)
+        inputs = dict(output["meta"]["params"], repeat=None)
+        if dict(baseline["meta"]["params"], repeat=None) != inputs or (
+            baseline["meta"]["catalog_sha256"] != catalog_sha256
+        ):
+            print("Warning: baseline was run on different inputs")
+        compare(results, baseline)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    parser.add_argument("--catalog", help="catalog snapshot to load (or create)")
+    parser.add_argument("--matches", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=25)
+    parser.add_argument("--players", type=int, default=10)
+    parser.add_argument("--kills", type=int, help="most kills per round")
+    parser.add_argument(
+        "--damage", type=int, default=3, help="damage events per player-round"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--only", help="regex selecting the cases to report")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
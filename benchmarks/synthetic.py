@@ -0,0 +1,403 @@
+"""Deterministic generator for Riot-shaped match JSON and valorant-api.com
+catalog payloads, so the parse/store paths can be exercised offline."""
+
+import random
+import uuid
+
+
+WEAPON_CATEGORIES = ["Sidearm", "SMG", "Shotgun", "Rifle", "Sniper", "Heavy"]
+ABILITY_SLOTS = ["Ability1", "Ability2", "Grenade", "Ultimate", "Passive"]
+RESULT_CODES = ["Elimination", "Detonate", "Defuse", ""]
+QUEUES = ["competitive", "unrated", "swiftplay", "spikerush"]
+
+
+def _uuid(rng):
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def generate_catalog(seed=0, cards=700, titles=350, maps=20, agents=25, weapons=19):
+    """Return a dict of endpoint -> payload matching the valorant-api.com shape."""
+    rng = random.Random(seed)
+
+    weapon_data = [
+        {
+            "uuid": _uuid(rng),
+            "displayName": f"Weapon {i}",
+            "displayIcon": f"https://media.example/weapons/{i}.png",
+            "shopData": {
+                "cost": rng.randrange(0, 4700, 50),
+                "category": rng.choice(WEAPON_CATEGORIES),
+            },
+        }
+        for i in range(weapons)
+    ]
+    gear_data = [
+        {
+            "uuid": _uuid(rng),
+            "displayName": name,
+            "displayIcon": f"https://media.example/gear/{i}.png",
+            "shopData": {"cost": cost},
+            "details": [
+                {"name": "Armor", "value": str(armor)},
+                {"name": "Damage Reduction", "value": "66%"},
+            ],
+        }
+        for i, (name, cost, armor) in enumerate(
+            [
+                ("Light Shields", 400, 25),
+                ("Heavy Shields", 1000, 50),
+                ("Regen Shield", 650, 25),
+            ]
+        )
+    ]
+    card_data = [
+        {
+            "uuid": _uuid(rng),
+            "displayName": f"Card {i}",
+            "displayIcon": f"https://media.example/cards/{i}/icon.png",
+            "smallArt": f"https://media.example/cards/{i}/small.png",
+            "wideArt": f"https://media.example/cards/{i}/wide.png",
+            "largeArt": f"https://media.example/cards/{i}/large.png",
+        }
+        for i in range(cards)
+    ]
+    title_data = [
+        {"uuid": _uuid(rng), "titleText": f"Title {i}"} for i in range(titles)
+    ]
+    map_data = [
+        {
+            "uuid": _uuid(rng),
+            "mapUrl": f"/Game/Maps/Map{i}/Map{i}",
+            "displayName": f"Map {i}",
+            "splash": f"https://media.example/maps/{i}/splash.png",
+            "displayIcon": f"https://media.example/maps/{i}/minimap.png",
+            "tacticalDescription": "A/B Sites",
+            "coordinates": f"{i}°N, {i}°E",
+            "xMultiplier": 7.0e-05 + rng.random() * 1.0e-05,
+            "yMultiplier": -7.0e-05 - rng.random() * 1.0e-05,
+            "xScalarToAdd": 0.5 + rng.random() * 0.3,
+            "yScalarToAdd": 0.5 + rng.random() * 0.3,
+        }
+        for i in range(maps)
+    ]
+    agent_data = [
+        {
+            "uuid": _uuid(rng),
+            "displayName": f"Agent {i}",
+            "displayIcon": f"https://media.example/agents/{i}.png",
+            "description": f"Agent {i} description.",
+            "role": {
+                "displayName": rng.choice(
+                    ["Duelist", "Initiator", "Controller", "Sentinel"]
+                )
+            },
+            "abilities": [
+                {
+                    "slot": slot,
+                    "displayName": f"Agent {i} {slot}",
+                    "description": f"{slot} description.",
+                    "displayIcon": f"https://media.example/agents/{i}/{slot}.png",
+                }
+                for slot in ABILITY_SLOTS
+            ],
+        }
+        for i in range(agents)
+    ]
+    tier_data = [
+        {
+            "uuid": _uuid(rng),
+            "tiers": [
+                {
+                    "tier": tier,
+                    "tierName": f"TIER {tier}",
+                    "divisionName": f"DIVISION {tier // 3}",
+                    "smallIcon": f"https://media.example/tiers/{tier}/small.png",
+                    "largeIcon": f"https://media.example/tiers/{tier}/large.png",
+                }
+                for tier in range(28)
+            ],
+        }
+        for _ in range(3)
+    ]
+
+    return {
+        "gear": {"status": 200, "data": gear_data},
+        "weapons": {"status": 200, "data": weapon_data},
+        "playercards": {"status": 200, "data": card_data},
+        "playertitles": {"status": 200, "data": title_data},
+        "maps": {"status": 200, "data": map_data},
+        "agents?isPlayableCharacter=true": {"status": 200, "data": agent_data},
+        "competitivetiers": {"status": 200, "data": tier_data},
+    }
+
+
+def generate_player_pool(catalog, size=50, seed=0):
+    """Return `size` player records that matches can draw their lobbies from."""
+    rng = random.Random(seed)
+    cards = catalog["playercards"]["data"]
+    titles = catalog["playertitles"]["data"]
+    return [
+        {
+            "puuid": _uuid(rng),
+            "gameName": f"Player{i}",
+            "tagLine": f"{rng.randrange(1000, 9999)}",
+            "playerCard": rng.choice(cards)["uuid"],
+            "playerTitle": rng.choice(titles)["uuid"],
+            "accountLevel": rng.randrange(1, 500),
+            "competitiveTier": rng.randrange(0, 28),
+        }
+        for i in range(size)
+    ]
+
+
+def generate_match(
+    catalog,
+    seed=0,
+    rounds=25,
+    players=10,
+    player_pool=None,
+    queue=None,
+    kills=None,
+    damage_events=3,
+):
+    """Return a Riot `val/match/v1/matches/{id}` style payload.
+
+    Each round has between 3 and `kills` kills (default: all but one
+    player), and every player damages up to `damage_events` enemies in it.
+    Per-round kills and damage are consistent with the per-player totals, so
+    aggregates computed from rounds can be checked against `stats`.
+    """
+    rng = random.Random(seed)
+    weapons = catalog["weapons"]["data"]
+    gear = catalog["gear"]["data"]
+    maps = catalog["maps"]["data"]
+    agents = catalog["agents?isPlayableCharacter=true"]["data"]
+
+    if kills is None:
+        kills = players - 1
+    if player_pool is None:
+        player_pool = generate_player_pool(catalog, size=players, seed=seed)
+    lobby = rng.sample(player_pool, players)
+    teams = ["Red", "Blue"]
+    roster = []
+    for index, base in enumerate(lobby):
+        record = dict(base)
+        record.update(
+            {
+                "teamId": teams[index % 2],
+                "partyId": _uuid(rng),
+                "characterId": rng.choice(agents)["uuid"],
+                "isObserver": False,
+            }
+        )
+        roster.append(record)
+
+    totals = {
+        player["puuid"]: {"score": 0, "kills": 0, "deaths": 0, "assists": 0}
+        for player in roster
+    }
+    team_rounds = {team: 0 for team in teams}
+    round_results = []
+    for round_num in range(rounds):
+        winner = rng.choice(teams)
+        team_rounds[winner] += 1
+        attackers = teams[0] if round_num < rounds // 2 else teams[1]
+        planted = rng.random() < 0.6
+        planter = None
+        if planted:
+            planter = rng.choice(
+                [p["puuid"] for p in roster if p["teamId"] == attackers]
+            )
+        defuser = None
+        if planted and winner != attackers and rng.random() < 0.5:
+            defuser = rng.choice(
+                [p["puuid"] for p in roster if p["teamId"] != attackers]
+            )
+
+        alive = {p["puuid"] for p in roster}
+        kills_by = {p["puuid"]: [] for p in roster}
+        for _ in range(rng.randrange(min(3, kills), kills + 1)):
+            candidates = sorted(alive)
+            if len(candidates) < 2:
+                break
+            killer, victim = rng.sample(candidates, 2)
+            alive.discard(victim)
+            others = [p for p in candidates if p not in (killer, victim)]
+            assistants = rng.sample(others, min(len(others), rng.randrange(0, 3)))
+            # Riot records where every living player stood at the kill.
+            locations = {
+                puuid: {
+                    "x": rng.randrange(-8000, 8000),
+                    "y": rng.randrange(-8000, 8000),
+                }
+                for puuid in candidates
+            }
+            kills_by[killer].append(
+                {
+                    "timeSinceGameStartMillis": rng.randrange(0, 3_000_000),
+                    "timeSinceRoundStartMillis": rng.randrange(0, 100_000),
+                    "killer": killer,
+                    "victim": victim,
+                    "victimLocation": dict(locations[victim]),
+                    "assistants": assistants,
+                    "playerLocations": [
+                        {
+                            "subject": puuid,
+                            "viewRadians": round(rng.uniform(0, 6.283), 4),
+                            "location": location,
+                        }
+                        for puuid, location in locations.items()
+                    ],
+                    "finishingDamage": {
+                        "damageType": "Weapon",
+                        "damageItem": rng.choice(weapons)["uuid"],
+                        "isSecondaryFireMode": False,
+                    },
+                }
+            )
+            totals[killer]["kills"] += 1
+            totals[victim]["deaths"] += 1
+            for assistant in assistants:
+                totals[assistant]["assists"] += 1
+
+        player_stats = []
+        for player in roster:
+            puuid = player["puuid"]
+            damage = []
+            enemies = [p["puuid"] for p in roster if p["teamId"] != player["teamId"]]
+            for receiver in rng.sample(
+                enemies, min(rng.randrange(0, damage_events + 1), len(enemies))
+            ):
+                damage.append(
+                    {
+                        "receiver": receiver,
+                        "damage": rng.randrange(10, 250),
+                        "legshots": rng.randrange(0, 2),
+                        "bodyshots": rng.randrange(0, 4),
+                        "headshots": rng.randrange(0, 2),
+                    }
+                )
+            score = 200 * len(kills_by[puuid]) + rng.randrange(0, 150)
+            totals[puuid]["score"] += score
+            player_stats.append(
+                {
+                    "puuid": puuid,
+                    "kills": kills_by[puuid],
+                    "damage": damage,
+                    "score": score,
+                    "economy": {
+                        "loadoutValue": rng.randrange(0, 6000),
+                        "weapon": rng.choice(weapons)["uuid"],
+                        "armor": rng.choice(gear)["uuid"] if rng.random() < 0.8 else "",
+                        "remaining": rng.randrange(0, 9000),
+                        "spent": rng.randrange(0, 5000),
+                    },
+                    "ability": {},
+                }
+            )
+
+        round_results.append(
+            {
+                "roundNum": round_num,
+                "roundResult": "Eliminated",
+                "roundCeremony": "CeremonyDefault",
+                "winningTeam": winner,
+                "bombPlanter": planter,
+                "bombDefuser": defuser,
+                "plantRoundTime": rng.randrange(20_000, 90_000) if planted else 0,
+                "plantPlayerLocations": [],
+                "plantLocation": {
+                    "x": rng.randrange(-8000, 8000) if planted else 0,
+                    "y": rng.randrange(-8000, 8000) if planted else 0,
+                },
+                "plantSite": rng.choice("ABC") if planted else "",
+                "defuseRoundTime": rng.randrange(20_000, 90_000) if defuser else 0,
+                "defusePlayerLocations": [],
+                "defuseLocation": {
+                    "x": rng.randrange(-8000, 8000) if defuser else 0,
+                    "y": rng.randrange(-8000, 8000) if defuser else 0,
+                },
+                "playerStats": player_stats,
+                "roundResultCode": rng.choice(RESULT_CODES),
+                "playerEconomies": [],
+                "playerScores": [],
+            }
+        )
+
+    player_records = []
+    for player in roster:
+        record = dict(player)
+        record["stats"] = dict(
+            totals[player["puuid"]],
+            roundsPlayed=rounds,
+            playtimeMillis=rounds * 100_000,
+            abilityCasts={
+                "grenadeCasts": rng.randrange(0, rounds),
+                "ability1Casts": rng.randrange(0, rounds),
+                "ability2Casts": rng.randrange(0, rounds),
+                "ultimateCasts": rng.randrange(0, 5),
+            },
+        )
+        player_records.append(record)
+
+    red_won = team_rounds["Red"] > team_rounds["Blue"]
+    return {
+        "matchInfo": {
+            "matchId": _uuid(rng),
+            "mapId": rng.choice(maps)["mapUrl"],
+            "gameLengthMillis": rounds * 100_000,
+            "gameStartMillis": 1_700_000_000_000 + rng.randrange(0, 10**10),
+            "provisioningFlowId": "Matchmaking",
+            "isCompleted": True,
+            "customGameName": "",
+            "queueId": queue if queue is not None else rng.choice(QUEUES),
+            "gameMode": "/Game/GameModes/Bomb/BombGameMode.BombGameMode_C",
+            "isRanked": True,
+            "seasonId": _uuid(rng),
+        },
+        "players": player_records,
+        "coaches": [],
+        "teams": [
+            {
+                "teamId": "Red",
+                "won": red_won,
+                "roundsPlayed": rounds,
+                "roundsWon": team_rounds["Red"],
+                "numPoints": team_rounds["Red"],
+            },
+            {
+                "teamId": "Blue",
+                "won": not red_won,
+                "roundsPlayed": rounds,
+                "roundsWon": team_rounds["Blue"],
+                "numPoints": team_rounds["Blue"],
+            },
+        ],
+        "roundResults": round_results,
+    }
+
+
+def generate_matches(
+    catalog,
+    count,
+    seed=0,
+    rounds=25,
+    players=10,
+    pool_size=50,
+    kills=None,
+    damage_events=3,
+):
+    """Return `count` matches drawn from a shared pool of players."""
+    player_pool = generate_player_pool(catalog, size=max(pool_size, players), seed=seed)
+    return [
+        generate_match(
+            catalog,
+            seed=seed + i + 1,
+            rounds=rounds,
+            players=players,
+            player_pool=player_pool,
+            kills=kills,
+            damage_events=damage_events,
+        )
+        for i in range(count)
+    ]
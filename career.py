@@ -0,0 +1,214 @@
+"""Per-player career totals, kept up to date as matches are summarized.
+
+`playercareer` holds one row of running totals per player and group: every
+match (dimension `all`), and per agent, map and queue. A statement trigger
+on `matchplayers` adds each newly inserted summary row, whichever path
+wrote it, so a career is read in O(groups) rather than by re-reading every
+stored match.
+
+    python career.py rebuild    # recompute every total from matchplayers
+"""
+
+import argparse
+import asyncio
+import os
+
+from matchparser import ValorantAPI
+
+
+CAREER_TOTALS = (
+    "matches",
+    "wins",
+    "score",
+    "kills",
+    "deaths",
+    "assists",
+    "damage",
+    "rounds_played",
+    "headshots",
+    "bodyshots",
+    "legshots",
+)
+DIMENSIONS = ("all", "agent", "map", "queue")
+RECENT_MATCHES = 20
+
+
+def aggregate_sql(source):
+    """Group the `matchplayers` rows of `source` into career totals."""
+    return f"""
+        SELECT s.puuid, g.dimension, g.key,
+               count(*) AS matches, count(*) FILTER (WHERE s.won) AS wins,
+               sum(s.score) AS score, sum(s.kills) AS kills,
+               sum(s.deaths) AS deaths, sum(s.assists) AS assists,
+               sum(s.damage) AS damage, sum(s.rounds_played) AS rounds_played,
+               sum(s.headshots) AS headshots, sum(s.bodyshots) AS bodyshots,
+               sum(s.legshots) AS legshots
+        FROM {source} s
+        CROSS JOIN LATERAL (
+            VALUES ('all', ''),
+                   ('agent', coalesce(s.agent, '')),
+                   ('map', coalesce(s.map_url, '')),
+                   ('queue', coalesce(s.queue, ''))
+        ) AS g(dimension, key)
+        GROUP BY s.puuid, g.dimension, g.key
+        ORDER BY s.puuid, g.dimension, g.key
+    """
+
+
+_COLUMNS = ", ".join(CAREER_TOTALS)
+
+SCHEMA = [
+    f"""
+    CREATE TABLE IF NOT EXISTS playercareer (
+        puuid TEXT NOT NULL,
+        dimension TEXT NOT NULL,
+        key TEXT NOT NULL,
+        {", ".join(f"{total} BIGINT NOT NULL" for total in CAREER_TOTALS)},
+        PRIMARY KEY (puuid, dimension, key)
+    )
+    """,
+]
+
+# Installed once, by `db.ensure_schema`, when the trigger is missing.
+TRIGGER = [
+    f"""
+    CREATE OR REPLACE FUNCTION matchplayers_add_career() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        INSERT INTO playercareer (puuid, dimension, key, {_COLUMNS})
+        {aggregate_sql("new_rows")}
+        ON CONFLICT (puuid, dimension, key) DO UPDATE SET
+        {", ".join(f"{total} = playercareer.{total} + EXCLUDED.{total}" for total in CAREER_TOTALS)};
+        RETURN NULL;
+    END
+    $$
+    """,
+    """
+    CREATE TRIGGER matchplayers_career AFTER INSERT ON matchplayers
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION matchplayers_add_career()
+    """,
+]
+
+
+async def rebuild(con):
+    """Recompute every career total from `matchplayers`."""
+    async with con.transaction():
+        await con.execute("LOCK TABLE matchplayers IN SHARE MODE")
+        await con.execute("DELETE FROM playercareer")
+        await con.execute(
+            f"""
+            INSERT INTO playercareer (puuid, dimension, key, {_COLUMNS})
+            {aggregate_sql("matchplayers")}
+            """
+        )
+
+
+class CareerStats:
+    """Totals for one group of a player's matches, plus the derived rates."""
+
+    def __init__(self, record):
+        self.dimension = record["dimension"]
+        self.key = record["key"]
+        for total in CAREER_TOTALS:
+            setattr(self, total, record[total])
+
+        self.name = self.key
+        if self.dimension == "agent":
+            agent = ValorantAPI().get_agent(self.key)
+            self.name = agent.name if agent else self.key
+        elif self.dimension == "map":
+            game_map = ValorantAPI().get_map(self.key)
+            self.name = game_map.name if game_map else self.key
+        elif self.dimension == "queue":
+            self.name = ValorantAPI().get_formatted_queue_name(self.key)
+
+        self.win_rate = self.wins / max(self.matches, 1) * 100.0
+        self.KD = self.kills / max(self.deaths, 1)
+        self.average_damage = self.damage / max(self.rounds_played, 1)
+        self.HS = (
+            self.headshots / max(self.headshots + self.bodyshots + self.legshots, 1)
+        ) * 100.0
+
+    def as_dict(self):
+        return {
+            "key": self.key,
+            "name": self.name,
+            **{total: getattr(self, total) for total in CAREER_TOTALS},
+            "win_rate": self.win_rate,
+            "kd": self.KD,
+            "average_damage": self.average_damage,
+            "headshot_percentage": self.HS,
+        }
+
+
+class Career:
+    """A player's totals grouped by dimension: `overall`, `agents`, `maps`
+    and `queues`, the last three sorted by matches played."""
+
+    def __init__(self, records):
+        groups = {dimension: [] for dimension in DIMENSIONS}
+        for record in records:
+            groups[record["dimension"]].append(CareerStats(record))
+        for stats in groups.values():
+            stats.sort(key=lambda stats: stats.matches, reverse=True)
+
+        self.overall = groups["all"][0] if groups["all"] else None
+        self.agents = groups["agent"]
+        self.maps = groups["map"]
+        self.queues = groups["queue"]
+
+    def as_dict(self):
+        return {
+            "overall": self.overall.as_dict() if self.overall else None,
+            "agents": [stats.as_dict() for stats in self.agents],
+            "maps": [stats.as_dict() for stats in self.maps],
+            "queues": [stats.as_dict() for stats in self.queues],
+        }
+
+
+async def fetch_career(con, puuid):
+    records = await con.fetch(
+        f"SELECT dimension, key, {_COLUMNS} FROM playercareer WHERE puuid = $1",
+        puuid,
+    )
+    return Career(records)
+
+
+async def fetch_recent_career(con, puuid, last=RECENT_MATCHES):
+    """Totals over the player's `last` most recent stored matches."""
+    records = await con.fetch(
+        aggregate_sql(
+            """
+            (SELECT * FROM matchplayers WHERE puuid = $1
+             ORDER BY start_time DESC LIMIT $2)
+            """
+        ),
+        puuid,
+        last,
+    )
+    return Career(records)
+
+
+if __name__ == "__main__":
+    import asyncpg
+    from dotenv import load_dotenv
+
+    from db import ensure_schema
+
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Career totals maintenance")
+    parser.add_argument("command", choices=["rebuild"])
+    args = parser.parse_args()
+
+    async def main():
+        con = await asyncpg.connect(os.getenv("DATABASE_URL"))
+        try:
+            await ensure_schema(con)
+            await rebuild(con)
+        finally:
+            await con.close()
+
+    if args.command == "rebuild":
+        asyncio.run(main())
+        print("Done, career totals rebuilt")
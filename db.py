@@ -0,0 +1,132 @@
+import time
+
+import career
+import heatmaps
+import leases
+import pagecache
+
+
+# pg_advisory_xact_lock key serializing `ensure_schema` across processes.
+SCHEMA_LOCK = 0x564D5301
+SCHEMA = [
+    """
+    ALTER TABLE riotaccounts
+        ADD COLUMN IF NOT EXISTS last_match_start BIGINT NOT NULL DEFAULT 0
+    """,
+    """
+    ALTER TABLE riotaccounts
+        ADD COLUMN IF NOT EXISTS riot_id TEXT,
+        ADD COLUMN IF NOT EXISTS riot_id_updated_at BIGINT NOT NULL DEFAULT 0
+    """,
+    """
+    ALTER TABLE riotaccounts
+        ADD COLUMN IF NOT EXISTS matchlist TEXT[],
+        ADD COLUMN IF NOT EXISTS matchlist_starts BIGINT[],
+        ADD COLUMN IF NOT EXISTS matchlist_updated_at BIGINT NOT NULL DEFAULT 0
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS matchplayers (
+        match_id TEXT NOT NULL,
+        puuid TEXT NOT NULL,
+        start_time BIGINT NOT NULL,
+        map_url TEXT,
+        queue TEXT,
+        winner TEXT,
+        won BOOLEAN NOT NULL,
+        agent TEXT,
+        leaderboard_position INTEGER NOT NULL,
+        score INTEGER NOT NULL,
+        kills INTEGER NOT NULL,
+        deaths INTEGER NOT NULL,
+        assists INTEGER NOT NULL,
+        damage INTEGER NOT NULL,
+        rounds_played INTEGER NOT NULL,
+        headshots INTEGER NOT NULL,
+        bodyshots INTEGER NOT NULL,
+        legshots INTEGER NOT NULL,
+        grenade_casts INTEGER NOT NULL,
+        ability1_casts INTEGER NOT NULL,
+        ability2_casts INTEGER NOT NULL,
+        ultimate_casts INTEGER NOT NULL,
+        PRIMARY KEY (puuid, match_id)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS matchplayers_match_id ON matchplayers (match_id)",
+    """
+    CREATE INDEX IF NOT EXISTS matchplayers_puuid_start_time
+        ON matchplayers (puuid, start_time DESC)
+    """,
+]
+
+
+async def ensure_schema(con):
+    """Create the tables and indexes this app derives from stored matches.
+
+    Every web and worker process runs this at boot; the advisory lock makes
+    concurrent runs take turns instead of failing on each other's DDL.
+    """
+    async with con.transaction():
+        await con.execute("SELECT pg_advisory_xact_lock($1)", SCHEMA_LOCK)
+        for statement in SCHEMA + heatmaps.SCHEMA + leases.SCHEMA + pagecache.SCHEMA:
+            await con.execute(statement)
+
+        new_career = await con.fetchval("SELECT to_regclass('playercareer') IS NULL")
+        for statement in career.SCHEMA:
+            await con.execute(statement)
+        has_trigger = await con.fetchval(
+            """
+            SELECT EXISTS (
+                SELECT 1 FROM pg_trigger
+                WHERE tgname = 'matchplayers_career'
+                  AND tgrelid = 'matchplayers'::regclass
+            )
+            """
+        )
+        if not has_trigger:
+            for statement in career.TRIGGER:
+                await con.execute(statement)
+        # Totals are only complete if the trigger saw every summary row.
+        if new_career or not has_trigger:
+            await career.rebuild(con)
+
+
+async def save_matchlist(con, puuid, history):
+    """Store an account's Riot matchlist `history`, newest match first."""
+    await con.execute(
+        """
+        UPDATE riotaccounts
+        SET matchlist = $2, matchlist_starts = $3, matchlist_updated_at = $4
+        WHERE puuid = $1
+        """,
+        puuid,
+        [match["matchId"] for match in history],
+        [match.get("gameStartTimeMillis") for match in history],
+        int(time.time() * 1000),
+    )
+
+
+async def save_riot_ids(con, riot_ids):
+    """Record `(puuid, riot_id, seen_at)` sightings for registered accounts.
+
+    `seen_at` is in epoch milliseconds; a name only replaces one seen
+    earlier, so an old match never undoes a rename.
+    """
+    latest = {}
+    for puuid, riot_id, seen_at in riot_ids:
+        if puuid not in latest or seen_at > latest[puuid][1]:
+            latest[puuid] = (riot_id, seen_at)
+    if not latest:
+        return
+    # Sorted so concurrent writers lock accounts in the same order.
+    puuids = sorted(latest)
+    await con.execute(
+        """
+        UPDATE riotaccounts a
+        SET riot_id = n.riot_id, riot_id_updated_at = n.seen_at
+        FROM unnest($1::text[], $2::text[], $3::bigint[]) AS n(puuid, riot_id, seen_at)
+        WHERE a.puuid = n.puuid AND n.seen_at > a.riot_id_updated_at
+        """,
+        puuids,
+        [latest[puuid][0] for puuid in puuids],
+        [latest[puuid][1] for puuid in puuids],
+    )
@@ -0,0 +1,294 @@
+"""Per-player kill, death and spike plant heatmaps.
+
+A kill is placed where the killer stood and a death where the victim fell.
+Positions are moved into minimap space with each map's coordinate
+multipliers and binned on a `HEATMAP_GRID` x `HEATMAP_GRID` grid when a
+match is parsed (`bin_match`). `heatmapbins` keeps a running count per
+player, map, kind and cell, added to as matches are stored, so a heatmap
+is read from at most one row per cell and rendering never touches stored
+matches or the network.
+
+    python heatmaps.py rebuild    # re-bin every stored match
+    python heatmaps.py render --puuid <puuid> --map <map url> [--kind kills] [-o heatmap.png]
+"""
+
+import argparse
+import asyncio
+import collections
+import json
+import os
+import struct
+import zlib
+
+import numpy as np
+
+
+HEATMAP_GRID = 64
+HEATMAP_SCALE = 4  # PNG pixels per cell
+HEATMAP_CACHE_ENTRIES = int(os.getenv("HEATMAP_CACHE_ENTRIES", 512))
+KINDS = ("kills", "deaths", "plants")
+BIN_COLUMNS = ("puuid", "map_url", "kind", "cell", "count")
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS heatmapbins (
+        puuid TEXT NOT NULL,
+        map_url TEXT NOT NULL,
+        kind TEXT NOT NULL,
+        cell INTEGER NOT NULL,
+        count BIGINT NOT NULL,
+        PRIMARY KEY (puuid, map_url, kind, cell)
+    )
+    """,
+]
+
+
+def _cell(game_map, location):
+    x, y = game_map.to_minimap(location)
+    column = min(max(int(x * HEATMAP_GRID), 0), HEATMAP_GRID - 1)
+    row = min(max(int(y * HEATMAP_GRID), 0), HEATMAP_GRID - 1)
+    return row * HEATMAP_GRID + column
+
+
+def bin_match(match):
+    """Return the `heatmapbins` rows `match` adds, one per player, kind and
+    cell; empty for maps the catalog has no minimap for."""
+    game_map = match.map
+    if game_map is None or not game_map.has_minimap:
+        return []
+
+    counts = collections.Counter()
+    for round in match.rounds:
+        spike = round.spike_info
+        if spike.planter is not None and spike.plant_location is not None:
+            counts[
+                spike.planter.id, "plants", _cell(game_map, spike.plant_location)
+            ] += 1
+        for stat in round.player_stats:
+            for kill in stat.killed_players:
+                counts[kill.victim_id, "deaths", _cell(game_map, kill.location)] += 1
+                # Kills are where the killer stood; without that position
+                # (older stored matches) the kill is left out.
+                killer_location = getattr(kill, "killer_location", None)
+                if killer_location is not None:
+                    counts[stat.id, "kills", _cell(game_map, killer_location)] += 1
+
+    return [
+        (puuid, match.map_url, kind, cell, count)
+        for (puuid, kind, cell), count in counts.items()
+    ]
+
+
+async def save_bins(con, rows):
+    """Add `bin_match` rows to the running counts."""
+    if not rows:
+        return
+    columns = ", ".join(BIN_COLUMNS)
+    await con.execute(
+        """
+        CREATE TEMP TABLE IF NOT EXISTS heatmapbins_staging
+            (LIKE heatmapbins) ON COMMIT DELETE ROWS
+        """
+    )
+    await con.copy_records_to_table(
+        "heatmapbins_staging", records=rows, columns=BIN_COLUMNS
+    )
+    # Merged in key order so concurrent writers lock cells in the same order.
+    await con.execute(
+        f"""
+        INSERT INTO heatmapbins ({columns})
+        SELECT puuid, map_url, kind, cell, sum(count) FROM heatmapbins_staging
+        GROUP BY puuid, map_url, kind, cell
+        ORDER BY puuid, map_url, kind, cell
+        ON CONFLICT (puuid, map_url, kind, cell)
+        DO UPDATE SET count = heatmapbins.count + EXCLUDED.count
+        """
+    )
+    await con.execute("TRUNCATE heatmapbins_staging")
+
+
+class Heatmap:
+    """Counts for one player, map and kind, as a `HEATMAP_GRID` square array
+    indexed `[row, column]` from the minimap's top left corner."""
+
+    def __init__(self, map_url, kind, records):
+        self.map_url = map_url
+        self.kind = kind
+        self.counts = np.zeros(HEATMAP_GRID * HEATMAP_GRID, dtype=np.int64)
+        for record in records:
+            self.counts[record["cell"]] = record["count"]
+        self.counts = self.counts.reshape(HEATMAP_GRID, HEATMAP_GRID)
+        self.total = int(self.counts.sum())
+
+    def as_dict(self):
+        rows, columns = np.nonzero(self.counts)
+        return {
+            "map_url": self.map_url,
+            "kind": self.kind,
+            "grid": HEATMAP_GRID,
+            "total": self.total,
+            "bins": [
+                {
+                    "x": int(column),
+                    "y": int(row),
+                    "count": int(self.counts[row, column]),
+                }
+                for row, column in zip(rows, columns)
+            ],
+        }
+
+    def to_png(self, scale=HEATMAP_SCALE):
+        """An RGBA PNG to lay over the map's minimap: transparent where
+        nothing happened, from translucent blue to opaque red at the peak."""
+        heat = self.counts / max(self.counts.max(), 1)
+        pixels = np.zeros((HEATMAP_GRID, HEATMAP_GRID, 4), dtype=np.uint8)
+        pixels[..., 0] = heat * 255
+        pixels[..., 2] = (1 - heat) * 255
+        pixels[..., 3] = np.where(self.counts > 0, 96 + heat * 159, 0)
+        pixels = pixels.repeat(scale, axis=0).repeat(scale, axis=1)
+        return encode_png(pixels)
+
+
+def _png_chunk(kind, data):
+    chunk = kind + data
+    return struct.pack(">I", len(data)) + chunk + struct.pack(">I", zlib.crc32(chunk))
+
+
+def encode_png(pixels):
+    """Encode a `(height, width, 4)` uint8 array as an RGBA PNG."""
+    height, width, _ = pixels.shape
+    # Each scanline starts with filter type 0 (none).
+    scanlines = np.zeros((height, width * 4 + 1), dtype=np.uint8)
+    scanlines[:, 1:] = pixels.reshape(height, width * 4)
+    return b"".join(
+        (
+            b"\x89PNG\r\n\x1a\n",
+            _png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)),
+            _png_chunk(b"IDAT", zlib.compress(scanlines.tobytes(), 6)),
+            _png_chunk(b"IEND", b""),
+        )
+    )
+
+
+async def fetch_heatmap(con, puuid, map_url, kind):
+    records = await con.fetch(
+        """
+        SELECT cell, count FROM heatmapbins
+        WHERE puuid = $1 AND map_url = $2 AND kind = $3
+        """,
+        puuid,
+        map_url,
+        kind,
+    )
+    return Heatmap(map_url, kind, records)
+
+
+class HeatmapCache:
+    """Rendered heatmap tiles keyed by player, map, kind and format.
+
+    Counts only ever grow, so a tile is current while the total for its
+    heatmap is unchanged; `get` checks that total with one indexed sum and
+    only reads the cells and renders again when it has moved.
+    """
+
+    def __init__(self, max_entries=HEATMAP_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self.entries = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, con, puuid, map_url, kind, format):
+        key = (puuid, map_url, kind, format)
+        total = await con.fetchval(
+            """
+            SELECT coalesce(sum(count), 0) FROM heatmapbins
+            WHERE puuid = $1 AND map_url = $2 AND kind = $3
+            """,
+            puuid,
+            map_url,
+            kind,
+        )
+        entry = self.entries.get(key)
+        if entry is not None and entry[0] == total:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        heatmap = await fetch_heatmap(con, puuid, map_url, kind)
+        if format == "png":
+            body = heatmap.to_png()
+        else:
+            body = json.dumps(heatmap.as_dict())
+        self.entries[key] = (heatmap.total, body)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return body
+
+
+heatmap_cache = HeatmapCache()
+
+
+async def rebuild(con, batch_size=100):
+    """Recompute every heatmap from the stored matches."""
+    from matchstore import decode_match
+
+    async with con.transaction():
+        await con.execute("LOCK TABLE valorantmatches IN SHARE MODE")
+        await con.execute("DELETE FROM heatmapbins")
+        last_id = ""
+        binned = 0
+        while True:
+            rows = await con.fetch(
+                "SELECT id, data FROM valorantmatches WHERE id > $1 ORDER BY id LIMIT $2",
+                last_id,
+                batch_size,
+            )
+            if not rows:
+                break
+            last_id = rows[-1]["id"]
+            bins = []
+            for row in rows:
+                bins.extend(bin_match(decode_match(row["data"], lazy=True)))
+            await save_bins(con, bins)
+            binned += len(rows)
+            print(f"Binned {binned} matches (up to {last_id})")
+    return binned
+
+
+if __name__ == "__main__":
+    import asyncpg
+    from dotenv import load_dotenv
+
+    from db import ensure_schema
+    from staticdata import loader as static_data
+
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Heatmap maintenance")
+    parser.add_argument("command", choices=["rebuild", "render"])
+    parser.add_argument("--puuid")
+    parser.add_argument("--map")
+    parser.add_argument("--kind", choices=KINDS, default="kills")
+    parser.add_argument("-o", "--output", default="heatmap.png")
+    args = parser.parse_args()
+    if args.command == "render" and (args.puuid is None or args.map is None):
+        parser.error("render needs --puuid and --map")
+
+    async def main():
+        con = await asyncpg.connect(os.getenv("DATABASE_URL"))
+        try:
+            await ensure_schema(con)
+            if args.command == "rebuild":
+                # Binning needs the maps' multipliers from the catalog.
+                static_data.load_snapshot()
+                print(f"Done, {await rebuild(con)} matches binned")
+            else:
+                heatmap = await fetch_heatmap(con, args.puuid, args.map, args.kind)
+                with open(args.output, "wb") as file:
+                    file.write(heatmap.to_png())
+                print(f"Wrote {args.output} ({heatmap.total} {args.kind})")
+        finally:
+            await con.close()
+
+    asyncio.run(main())
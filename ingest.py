@@ -0,0 +1,284 @@
+import asyncio
+import heapq
+import os
+import time
+
+import metrics
+
+
+INGEST_POLL_CONCURRENCY = int(os.getenv("INGEST_POLL_CONCURRENCY", 4))
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", 4))
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", 16))
+
+POLL_MIN_INTERVAL = float(os.getenv("POLL_MIN_INTERVAL", 30))
+POLL_MAX_INTERVAL = float(os.getenv("POLL_MAX_INTERVAL", 10 * 60))
+POLL_BACKOFF = float(os.getenv("POLL_BACKOFF", 2.0))
+POLL_IDLE_FRACTION = float(os.getenv("POLL_IDLE_FRACTION", 0.05))
+# Accounts active this recently may be mid-session, so stay at the minimum.
+POLL_ACTIVE_WINDOW = float(os.getenv("POLL_ACTIVE_WINDOW", 3 * 60 * 60))
+
+
+class IngestScheduler:
+    """Polls matchlists concurrently and feeds match downloads to workers.
+
+    `poll_account(account)` returns `None` or `(match_ids, on_complete)`;
+    each id is downloaded by `save_match(match_id)` on one of `workers`
+    tasks, and `on_complete({match_id: result})` runs once all of that
+    account's downloads have finished and returns whether the account made
+    progress. An id already queued by another account in the same cycle is
+    left out of the later account's results.
+
+    At most `poll_concurrency` matchlists are fetched at once, and a poller
+    holds its slot while the bounded queue is full, so polling slows down
+    to the pace downloads and the database can sustain.
+
+    `run_cycle` returns `{puuid: found}`, where `found` is what the
+    account's `on_complete` returned, or False if there was nothing to do.
+    """
+
+    def __init__(
+        self,
+        poll_account,
+        save_match,
+        poll_concurrency=INGEST_POLL_CONCURRENCY,
+        workers=INGEST_WORKERS,
+        queue_size=INGEST_QUEUE_SIZE,
+    ):
+        self.poll_account = poll_account
+        self.save_match = save_match
+        self.poll_concurrency = poll_concurrency
+        self.workers = workers
+        self.queue_size = queue_size
+        self.queue = None
+        self.claimed_match_ids = set()
+        self.found = {}
+
+        self.cycles = 0
+        self.last_cycle_seconds = 0.0
+        self.last_cycle_accounts = 0
+        self.last_cycle_matches = 0
+        self.max_queue_depth = 0
+        self.matches_saved = 0
+        self.matches_failed = 0
+
+    @property
+    def queue_depth(self):
+        return self.queue.qsize() if self.queue is not None else 0
+
+    async def run_cycle(self, accounts):
+        start = time.perf_counter()
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        self.claimed_match_ids = set()
+        self.found = {}
+        self.max_queue_depth = 0
+        self.last_cycle_matches = 0
+        poll_slots = asyncio.Semaphore(self.poll_concurrency)
+        workers = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        try:
+            await asyncio.gather(
+                *(self._poll(account, poll_slots) for account in accounts)
+            )
+            await self.queue.join()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+        self.cycles += 1
+        self.last_cycle_accounts = len(accounts)
+        self.last_cycle_seconds = time.perf_counter() - start
+        print(
+            f"Ingest cycle {self.cycles}: {len(accounts)} accounts, "
+            f"{self.last_cycle_matches} matches in {self.last_cycle_seconds:.2f}s "
+            f"(max queue depth {self.max_queue_depth})"
+        )
+        return self.found
+
+    async def _poll(self, account, poll_slots):
+        loop = asyncio.get_running_loop()
+        async with poll_slots:
+            try:
+                polled = await self.poll_account(account)
+            except Exception as e:
+                metrics.failure("ingest_poll")
+                print(f"Failed to poll account {account['puuid']}: {e!r}")
+                return
+            self.found[account["puuid"]] = False
+            if polled is None:
+                return
+
+            polled_ids, on_complete = polled
+            match_ids = []
+            futures = []
+            for match_id in polled_ids:
+                if match_id in self.claimed_match_ids:
+                    continue
+                self.claimed_match_ids.add(match_id)
+                match_ids.append(match_id)
+                future = loop.create_future()
+                await self.queue.put((match_id, future))
+                self.max_queue_depth = max(self.max_queue_depth, self.queue.qsize())
+                futures.append(future)
+
+        results = await asyncio.gather(*futures)
+        try:
+            found = await on_complete(dict(zip(match_ids, results)))
+            self.found[account["puuid"]] = bool(found)
+        except Exception as e:
+            metrics.failure("ingest_account")
+            print(f"Failed to finish account {account['puuid']}: {e!r}")
+
+    async def _worker(self):
+        while True:
+            match_id, future = await self.queue.get()
+            try:
+                result = await self.save_match(match_id)
+            except Exception as e:
+                metrics.failure("ingest_match")
+                print(f"Failed to save match {match_id}: {e!r}")
+                result = e
+
+            # A buffered write hands back a future; the worker moves on to
+            # the next download and the account is settled once it resolves.
+            if isinstance(result, asyncio.Future):
+                result.add_done_callback(
+                    lambda write, future=future: self._settle(future, write.result())
+                )
+            else:
+                self._settle(future, result)
+            self.queue.task_done()
+
+    def _settle(self, future, result):
+        if result is True:
+            self.matches_saved += 1
+        else:
+            self.matches_failed += 1
+        self.last_cycle_matches += 1
+        future.set_result(result)
+
+
+class PollSchedule:
+    """Decides which accounts' matchlists are due, soonest first.
+
+    Due times live in a heap. After a poll that found new matches an account
+    is polled again in `min_interval` seconds, and it stays there while it
+    was last active within `active_window` (a session of games). After that
+    each poll that finds nothing multiplies the interval by `backoff`, but
+    never beyond `idle_fraction` of the time since the account was last
+    active, and always within `[min_interval, max_interval]`, so a dormant
+    account drifts out to `max_interval`. `bump` (a login or page visit)
+    makes an account due as soon as `min_interval` allows and counts as
+    activity.
+    """
+
+    def __init__(
+        self,
+        min_interval=POLL_MIN_INTERVAL,
+        max_interval=POLL_MAX_INTERVAL,
+        backoff=POLL_BACKOFF,
+        idle_fraction=POLL_IDLE_FRACTION,
+        active_window=POLL_ACTIVE_WINDOW,
+        clock=time.time,
+    ):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.idle_fraction = idle_fraction
+        self.active_window = active_window
+        self.clock = clock
+        self.heap = []
+        self.due_at = {}
+        self.intervals = {}
+        self.last_active = {}
+        self.polled_at = {}
+        self.woken = asyncio.Event()
+
+        self.polls = 0
+        self.bumps = 0
+
+    def __len__(self):
+        return len(self.intervals)
+
+    def _clamp(self, interval):
+        return min(max(interval, self.min_interval), self.max_interval)
+
+    def _schedule(self, puuid, due_at):
+        # Superseded heap entries are skipped when they surface.
+        self.due_at[puuid] = due_at
+        heapq.heappush(self.heap, (due_at, puuid))
+
+    def sync(self, accounts):
+        """Track exactly `accounts` (rows with `puuid` and `last_match_start`);
+        accounts seen for the first time are due now."""
+        now = self.clock()
+        puuids = set()
+        for account in accounts:
+            puuid = account["puuid"]
+            puuids.add(puuid)
+            if puuid not in self.intervals:
+                self.last_active[puuid] = account["last_match_start"] / 1000
+                self.intervals[puuid] = self.min_interval
+                self._schedule(puuid, now)
+        for puuid in [puuid for puuid in self.intervals if puuid not in puuids]:
+            del self.intervals[puuid]
+            del self.last_active[puuid]
+            self.polled_at.pop(puuid, None)
+            self.due_at.pop(puuid, None)
+
+    def bump(self, puuid):
+        now = self.clock()
+        self.last_active[puuid] = now
+        self.intervals[puuid] = self.min_interval
+        self.bumps += 1
+        # Repeated visits still poll an account at most every min_interval.
+        due_at = max(now, self.polled_at.get(puuid, 0) + self.min_interval)
+        if puuid not in self.due_at or self.due_at[puuid] > due_at:
+            self._schedule(puuid, due_at)
+            self.woken.set()
+
+    def pop_due(self):
+        """Return the puuids due now; each is rescheduled by `record`."""
+        now = self.clock()
+        due = []
+        while self.heap and self.heap[0][0] <= now:
+            due_at, puuid = heapq.heappop(self.heap)
+            if self.due_at.get(puuid) == due_at:
+                del self.due_at[puuid]
+                due.append(puuid)
+        return due
+
+    def record(self, puuid, found):
+        if puuid not in self.intervals:
+            return
+        now = self.clock()
+        self.polls += 1
+        self.polled_at[puuid] = now
+        if found:
+            self.last_active[puuid] = now
+        idle = now - self.last_active[puuid]
+        if idle < self.active_window:
+            interval = self.min_interval
+        else:
+            interval = self._clamp(
+                min(self.intervals[puuid] * self.backoff, idle * self.idle_fraction)
+            )
+        self.intervals[puuid] = interval
+        # A bump while the poll was in flight keeps its earlier slot.
+        if puuid not in self.due_at:
+            self._schedule(puuid, now + interval)
+
+    def next_due(self):
+        while self.heap and self.due_at.get(self.heap[0][1]) != self.heap[0][0]:
+            heapq.heappop(self.heap)
+        return self.heap[0][0] if self.heap else None
+
+    async def wait(self, timeout):
+        """Sleep until an account is due, one is bumped or `timeout` passes."""
+        next_due = self.next_due()
+        if next_due is not None:
+            timeout = min(timeout, max(next_due - self.clock(), 0))
+        self.woken.clear()
+        try:
+            await asyncio.wait_for(self.woken.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
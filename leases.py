@@ -0,0 +1,190 @@
+"""Partitioning of ingestion across worker processes through Postgres.
+
+Accounts fall into `INGEST_SHARDS` fixed shards by a hash of their puuid,
+and each shard is leased to one worker at a time in `ingestleases`. Every
+worker heartbeats into `ingestworkers` and, once per heartbeat, renews its
+leases, gives back what it holds beyond an even share of the live workers
+and claims free or expired shards up to that share. A worker that dies
+stops renewing, so its shards are claimed by the others within
+`lease_ttl` seconds; one that joins gets shards as the others shed theirs.
+"""
+
+import asyncio
+import os
+import socket
+import time
+import uuid
+from datetime import timedelta
+
+import metrics
+
+
+INGEST_SHARDS = int(os.getenv("INGEST_SHARDS", 64))
+LEASE_TTL = float(os.getenv("LEASE_TTL", 30))
+LEASE_HEARTBEAT = float(os.getenv("LEASE_HEARTBEAT", 10))
+# Web processes ask ingesting workers to poll an account on this channel.
+POLL_CHANNEL = "account_poll"
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS ingestleases (
+        shard INTEGER PRIMARY KEY,
+        worker_id TEXT,
+        expires_at TIMESTAMPTZ NOT NULL DEFAULT '-infinity'
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS ingestworkers (
+        worker_id TEXT PRIMARY KEY,
+        heartbeat_at TIMESTAMPTZ NOT NULL
+    )
+    """,
+]
+
+
+def in_shards_sql(count_param, shards_param):
+    """A condition on `puuid` selecting the accounts of the shards in
+    parameter `shards_param`, out of `count_param` shards."""
+    return f"(hashtext(puuid) & 2147483647) % ${count_param} = ANY(${shards_param})"
+
+
+class ShardLeases:
+    """This process's share of the ingestion shards.
+
+    `shards` is the set currently held; `run` keeps it up to date until
+    cancelled and `release` hands everything back on a clean shutdown.
+    Whenever `shards` changes, `changed` is set and `on_change()` called.
+    """
+
+    def __init__(
+        self,
+        shard_count=INGEST_SHARDS,
+        lease_ttl=LEASE_TTL,
+        heartbeat=LEASE_HEARTBEAT,
+        worker_id=None,
+        on_change=None,
+    ):
+        self.shard_count = shard_count
+        self.lease_ttl = lease_ttl
+        self.heartbeat = heartbeat
+        self.worker_id = worker_id or (
+            f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        )
+        self.shards = frozenset()
+        self.changed = asyncio.Event()
+        self.on_change = on_change
+
+        self.heartbeats = 0
+        self.claimed = 0
+        self.released = 0
+        self.lost = 0
+
+    async def renew(self, con):
+        """One heartbeat; returns the shards held afterwards."""
+        ttl = timedelta(seconds=self.lease_ttl)
+        async with con.transaction():
+            await con.execute(
+                """
+                INSERT INTO ingestleases (shard)
+                SELECT generate_series(0, $1 - 1) ON CONFLICT DO NOTHING
+                """,
+                self.shard_count,
+            )
+            await con.execute(
+                """
+                INSERT INTO ingestworkers (worker_id, heartbeat_at) VALUES ($1, now())
+                ON CONFLICT (worker_id) DO UPDATE SET heartbeat_at = now()
+                """,
+                self.worker_id,
+            )
+            await con.execute(
+                "DELETE FROM ingestworkers WHERE heartbeat_at < now() - $1::interval",
+                ttl,
+            )
+            workers = await con.fetchval("SELECT count(*) FROM ingestworkers")
+            share = -(-self.shard_count // max(workers, 1))
+
+            held = await con.fetch(
+                """
+                UPDATE ingestleases SET expires_at = now() + $2::interval
+                WHERE worker_id = $1 AND shard < $3
+                RETURNING shard
+                """,
+                self.worker_id,
+                ttl,
+                self.shard_count,
+            )
+            held = sorted(record["shard"] for record in held)
+            self.lost += len(self.shards.difference(held))
+            if len(held) > share:
+                await con.execute(
+                    """
+                    UPDATE ingestleases SET worker_id = NULL, expires_at = '-infinity'
+                    WHERE shard = ANY($1)
+                    """,
+                    held[share:],
+                )
+                self.released += len(held) - share
+                held = held[:share]
+            elif len(held) < share:
+                claimed = await con.fetch(
+                    """
+                    UPDATE ingestleases SET worker_id = $1, expires_at = now() + $2::interval
+                    WHERE shard IN (
+                        SELECT shard FROM ingestleases
+                        WHERE expires_at < now() AND shard < $3
+                        ORDER BY shard LIMIT $4
+                        FOR UPDATE SKIP LOCKED
+                    )
+                    RETURNING shard
+                    """,
+                    self.worker_id,
+                    ttl,
+                    self.shard_count,
+                    share - len(held),
+                )
+                self.claimed += len(claimed)
+                held += [record["shard"] for record in claimed]
+
+        self.heartbeats += 1
+        held = frozenset(held)
+        if held != self.shards:
+            self._set_shards(held)
+        return held
+
+    def _set_shards(self, shards):
+        self.shards = shards
+        self.changed.set()
+        if self.on_change is not None:
+            self.on_change()
+
+    async def run(self, pool):
+        renewed_at = time.monotonic()
+        while True:
+            try:
+                async with pool.acquire() as con:
+                    await self.renew(con)
+                renewed_at = time.monotonic()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                metrics.failure("leases")
+                print(f"Lease heartbeat failed: {e!r}")
+                # Past the TTL another worker may own these shards by now.
+                if self.shards and time.monotonic() - renewed_at >= self.lease_ttl:
+                    self.lost += len(self.shards)
+                    self._set_shards(frozenset())
+            await asyncio.sleep(self.heartbeat)
+
+    async def release(self, con):
+        await con.execute(
+            """
+            UPDATE ingestleases SET worker_id = NULL, expires_at = '-infinity'
+            WHERE worker_id = $1
+            """,
+            self.worker_id,
+        )
+        await con.execute(
+            "DELETE FROM ingestworkers WHERE worker_id = $1", self.worker_id
+        )
+        self.shards = frozenset()
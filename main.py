@@ -1,12 +1,37 @@
-from quart import Quart, request, render_template, redirect, session
+from quart import Quart, g, request, render_template, redirect, session
+import json
+from markupsafe import Markup
 import aiohttp
 import os
 from dotenv import load_dotenv
 import asyncpg
-import pickle
 import asyncio
+import time
 from asyncio import Event
-from matchparser import Match
+from matchparser import ValorantAPI
+from matchcache import match_cache
+from pagecache import PAGE_CACHE_CONTROL, page_cache, page_etag
+from summaries import PlayerOverallStats, fetch_history_summaries
+from career import fetch_career, fetch_recent_career
+from heatmaps import KINDS as HEATMAP_KINDS, heatmap_cache
+from matchapi import (
+    HISTORY_CACHE_CONTROL,
+    MATCH_CACHE_CONTROL,
+    MAX_PAGE_SIZE,
+    PAGE_SIZE,
+    fetch_history_page,
+    match_etag,
+    match_json,
+    stream_history,
+)
+from db import ensure_schema, save_matchlist, save_riot_ids
+from ingest import POLL_MAX_INTERVAL, IngestScheduler, PollSchedule
+from leases import INGEST_SHARDS, POLL_CHANNEL, ShardLeases, in_shards_sql
+from riotclient import BACKGROUND, INTERACTIVE, RiotClient
+from parsepool import ParseExecutor
+from matchwriter import MatchWriter
+from staticdata import loader as static_data
+import metrics
 
 
 load_dotenv()
@@ -20,23 +45,128 @@ RIOT_API_AUTH = {"X-Riot-Token": RIOT_API_KEY}
 DATABASE_URL = os.getenv("DATABASE_URL")
 pool = None
 session_aiohttp = None
+riot_client = None
+parse_executor = ParseExecutor()
+match_writer = None
 MAX_MATCHES = 20
-
-
-async def background_task():
-    global pool, session_aiohttp
-    pool = await asyncpg.create_pool(DATABASE_URL, min_size=1)
+RIOT_ID_TTL = int(os.getenv("RIOT_ID_TTL", 24 * 60 * 60))
+RIOT_ID_REFRESH_BATCH = int(os.getenv("RIOT_ID_REFRESH_BATCH", 20))
+# The poller refreshes a quiet account's list every POLL_MAX_INTERVAL at
+# most, and a visit bumps it; only a list older than that means it is behind.
+MATCHLIST_MAX_AGE = int(os.getenv("MATCHLIST_MAX_AGE", POLL_MAX_INTERVAL * 2))
+ACCOUNT_SYNC_INTERVAL = int(os.getenv("ACCOUNT_SYNC_INTERVAL", 30))
+# Web replicas can leave ingestion to `worker.py` processes.
+INGEST_ENABLED = os.getenv("INGEST_ENABLED", "1") != "0"
+# When set, `/metrics` wants `Authorization: Bearer <METRICS_TOKEN>`.
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+riot_id_lookups = {}
+request_profiler = metrics.RequestProfiler()
+
+ROUTE_SECONDS = metrics.Histogram(
+    "http_request_seconds",
+    "Time to handle a request, by route and status.",
+    ["route", "method", "status"],
+)
+RENDER_SECONDS = metrics.Histogram(
+    "template_render_seconds", "Time to render a page template.", ["template"]
+)
+
+
+async def background_task(ingest=INGEST_ENABLED):
+    """Set up the shared clients and, with `ingest`, run ingestion until
+    shutdown; otherwise just hold them for the web routes."""
+    global pool, session_aiohttp, riot_client
+    pool = metrics.TimedPool(
+        await asyncpg.create_pool(
+            DATABASE_URL, min_size=1, init=metrics.instrument_connection
+        )
+    )
     session_aiohttp = aiohttp.ClientSession()
+    riot_client = RiotClient(session_aiohttp)
     try:
-        while not shutdown_event.is_set():
-            await valorantMatchesSave()
-            await asyncio.sleep(30)
+        async with pool.acquire() as con:
+            await ensure_schema(con)
+        await static_data.start(session_aiohttp)
+        if ingest:
+            await ingestMatches()
+        else:
+            await shutdown_event.wait()
     except asyncio.CancelledError:
         print("Background task cancelled")
     finally:
+        await static_data.stop()
+        await session_aiohttp.close()
         await pool.close()
 
 
+async def ingestMatches():
+    """Poll and download the matches of the accounts in the shards this
+    process holds, alongside any other ingesting processes."""
+    global match_writer
+    # Parsing resolves weapons, maps, ... so nothing is ingested without them.
+    if not await waitForCatalog():
+        return
+    match_writer = MatchWriter(pool)
+    await parse_executor.start(ValorantAPI.catalog.datasets)
+    match_writer.start()
+    async with pool.acquire() as con:
+        await shard_leases.renew(con)
+    heartbeat = asyncio.create_task(shard_leases.run(pool))
+    listener = await pool.acquire()
+    await listener.add_listener(POLL_CHANNEL, onPollRequested)
+    try:
+        synced_at = 0
+        while not shutdown_event.is_set():
+            if (
+                shard_leases.changed.is_set()
+                or time.monotonic() - synced_at >= ACCOUNT_SYNC_INTERVAL
+            ):
+                shard_leases.changed.clear()
+                await syncAccounts()
+                await refreshRiotIds()
+                synced_at = time.monotonic()
+            await valorantMatchesSave()
+            await poll_schedule.wait(
+                max(synced_at + ACCOUNT_SYNC_INTERVAL - time.monotonic(), 0)
+            )
+    finally:
+        heartbeat.cancel()
+        await listener.remove_listener(POLL_CHANNEL, onPollRequested)
+        await pool.release(listener)
+        await match_writer.stop()
+        parse_executor.shutdown()
+        # Hand the shards over now rather than when the leases expire.
+        async with pool.acquire() as con:
+            await shard_leases.release(con)
+
+
+async def waitForCatalog():
+    """Wait for the static catalog; False if shutdown comes first."""
+    while not static_data.loaded.is_set():
+        if shutdown_event.is_set():
+            return False
+        try:
+            await asyncio.wait_for(static_data.loaded.wait(), 1)
+        except asyncio.TimeoutError:
+            pass
+    return True
+
+
+def catalogUnavailable():
+    # Matches decoded without the catalog would be cached half-resolved.
+    return "Match data is still loading, try again shortly.", 503, {"Retry-After": "10"}
+
+
+def notModified(etag, headers):
+    """A 304 response if the request's `If-None-Match` names `etag`, else
+    `None`. Callers derive `etag` from the URL and viewer alone, so a
+    revalidation is answered without any lookup."""
+    tags = request.headers.get("If-None-Match", "").split(",")
+    if etag in (tag.strip().removeprefix("W/") for tag in tags):
+        return "", 304, headers
+    return None
+
+
 @app.before_serving
 async def start_background_task():
     asyncio.create_task(background_task())
@@ -45,17 +175,34 @@ async def start_background_task():
 @app.after_serving
 async def stop_background_task():
     shutdown_event.set()
+    poll_schedule.woken.set()
 
 
-async def getAiohttp(url, headers=None):
-    global session_aiohttp
-    async with session_aiohttp.get(url, headers=headers) as response:
-        if response.status == 200:
-            response_body = await response.json()
-            return (200, response_body)
-        else:
-            return (response.status, None)
-    return (-1, None)
+@app.before_request
+async def startRequestTimer():
+    g.request_start = time.perf_counter()
+    g.profile = request_profiler.start()
+
+
+@app.after_request
+async def recordRequestTime(response):
+    if "request_start" not in g:
+        return response
+    elapsed = time.perf_counter() - g.request_start
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    ROUTE_SECONDS.labels(route, request.method, response.status_code).observe(elapsed)
+    if g.profile is not None:
+        request_profiler.finish(g.profile, f"{request.method} {request.path}", elapsed)
+    return response
+
+
+async def renderTemplate(name, **context):
+    with RENDER_SECONDS.labels(name).time():
+        return await render_template(name, **context)
+
+
+async def getAiohttp(url, headers=None, priority=BACKGROUND):
+    return await riot_client.get(url, headers=headers, priority=priority)
 
 
 async def valorantMatchSave(id):
@@ -64,108 +211,268 @@ async def valorantMatchSave(id):
         RIOT_API_AUTH,
     )
     if response[0] == 200:
-        await saveParsedMatch(Match(response[1]), id)
-
-
-async def saveParsedMatch(match, id):
-    try:
-        async with pool.acquire() as con:
-            results = "INSERT INTO valorantmatches (id, data) VALUES ($1, $2) ON CONFLICT (id) DO NOTHING"
-            await con.execute(results, id, pickle.dumps(match))
-    except asyncpg.exceptions.UniqueViolationError:
-        pass
-    except TimeoutError:
-        print("Retrying {}".format(id))
-        await saveParsedMatch(match)
+        data, summary_rows, riot_ids, heatmap_bins = await parse_executor.parse(
+            response[1]
+        )
+        return await match_writer.add(id, data, summary_rows, riot_ids, heatmap_bins)
+    return False
 
 
-async def valorantAccountSave(account, unique_match_ids):
+async def valorantAccountSave(account):
     puuid = account["puuid"]
+    cursor = account["last_match_start"]
     response = await getAiohttp(
         f"https://ap.api.riotgames.com/val/match/v1/matchlists/by-puuid/{puuid}",
         RIOT_API_AUTH,
     )
-
     if response[0] != 200:
-        response = await getAiohttp(
-            f"https://ap.api.riotgames.com/val/match/v1/matchlists/by-puuid/{puuid}",
-            RIOT_API_AUTH,
-        )
-        if response[0] != 200:
-            return []
+        return None
 
-    coroutines = []
-    for match in response[1]["history"]:
-        match_id = match["matchId"]
-        if match_id not in unique_match_ids:
-            unique_match_ids.add(match_id)
-            coroutines.append(valorantMatchSave(match_id))
+    async with pool.acquire() as con:
+        await save_matchlist(con, puuid, response[1]["history"])
 
-    return coroutines
+    new_matches = [
+        match
+        for match in response[1]["history"]
+        if match.get("gameStartTimeMillis") is None
+        or match["gameStartTimeMillis"] > cursor
+    ]
+    if not new_matches:
+        return None
 
+    async with pool.acquire() as con:
+        stored_ids = await con.fetch(
+            "SELECT id FROM valorantmatches WHERE id = ANY($1)",
+            [match["matchId"] for match in new_matches],
+        )
+    stored_ids = {record["id"] for record in stored_ids}
+
+    downloads = [
+        match["matchId"] for match in new_matches if match["matchId"] not in stored_ids
+    ]
+
+    async def on_complete(results):
+        return await valorantAccountAdvance(puuid, cursor, new_matches, results)
+
+    return downloads, on_complete
+
+
+async def valorantAccountAdvance(puuid, cursor, new_matches, results):
+    """Move an account's cursor past the matches it just downloaded.
+
+    The cursor only moves up to the earliest match that failed to download,
+    so failures are retried next cycle without rescanning the whole history.
+    Returns whether the account made progress: a match was stored or the
+    cursor moved. A match that keeps failing is not activity.
+    """
+    starts = [
+        match["gameStartTimeMillis"]
+        for match in new_matches
+        if match.get("gameStartTimeMillis") is not None
+    ]
+    failed_starts = [
+        match["gameStartTimeMillis"]
+        for match in new_matches
+        if match.get("gameStartTimeMillis") is not None
+        and results.get(match["matchId"], True) is not True
+    ]
+    stored = any(result is True for result in results.values())
+    if failed_starts:
+        new_cursor = min(failed_starts) - 1
+    elif starts:
+        new_cursor = max(starts)
+    else:
+        return stored
+    if new_cursor <= cursor:
+        return stored
 
-async def valorantMatchesSave():
     async with pool.acquire() as con:
-        accounts = await con.fetch("SELECT * FROM riotaccounts")
-        existing_match_ids = await con.fetch("SELECT id FROM valorantmatches")
-        unique_match_ids = {record["id"] for record in existing_match_ids}
+        await con.execute(
+            "UPDATE riotaccounts SET last_match_start = GREATEST(last_match_start, $2) WHERE puuid = $1",
+            puuid,
+            new_cursor,
+        )
+    return True
+
+
+scheduler = IngestScheduler(valorantAccountSave, valorantMatchSave)
+poll_schedule = PollSchedule()
+shard_leases = ShardLeases(on_change=poll_schedule.woken.set)
+
+metrics.register(
+    "match_cache",
+    "Decoded match cache counters and size.",
+    "gauge",
+    lambda: [((name,), value) for name, value in match_cache.stats().items()],
+    ["stat"],
+)
+metrics.register(
+    "page_cache",
+    "Rendered match page cache counters and size.",
+    "gauge",
+    lambda: [((name,), value) for name, value in page_cache.stats().items()],
+    ["stat"],
+)
+metrics.register(
+    "heatmap_cache_lookups_total",
+    "Heatmap cache lookups, by result.",
+    "counter",
+    lambda: [(("hit",), heatmap_cache.hits), (("miss",), heatmap_cache.misses)],
+    ["result"],
+)
+metrics.register(
+    "match_writer",
+    "Buffered match writer counters.",
+    "gauge",
+    lambda: (
+        [
+            ((name,), getattr(match_writer, name))
+            for name in ("rows_written", "batches_written", "batches_failed")
+        ]
+        if match_writer
+        else []
+    ),
+    ["stat"],
+)
+metrics.register(
+    "ingest",
+    "Ingestion cycle counters.",
+    "gauge",
+    lambda: [
+        ((name,), getattr(scheduler, name))
+        for name in (
+            "cycles",
+            "last_cycle_accounts",
+            "last_cycle_matches",
+            "last_cycle_seconds",
+            "max_queue_depth",
+            "matches_saved",
+            "matches_failed",
+        )
+    ]
+    + [(("scheduled_accounts",), len(poll_schedule.intervals))]
+    + [((name,), getattr(poll_schedule, name)) for name in ("polls", "bumps")],
+    ["stat"],
+)
+metrics.register(
+    "ingest_shards",
+    "Shard leases held and lease changes.",
+    "gauge",
+    lambda: [(("held",), len(shard_leases.shards))]
+    + [
+        ((name,), getattr(shard_leases, name))
+        for name in ("heartbeats", "claimed", "released", "lost")
+    ],
+    ["stat"],
+)
+metrics.register(
+    "db_pool_connections",
+    "Postgres pool connections, by state.",
+    "gauge",
+    lambda: (
+        [(("open",), pool.get_size()), (("idle",), pool.get_idle_size())]
+        if pool
+        else []
+    ),
+    ["state"],
+)
+
+
+async def syncAccounts():
+    async with pool.acquire() as con:
+        accounts = await con.fetch(
+            f"""
+            SELECT puuid, last_match_start FROM riotaccounts
+            WHERE {in_shards_sql(1, 2)}
+            """,
+            INGEST_SHARDS,
+            list(shard_leases.shards),
+        )
+    poll_schedule.sync(accounts)
+
+
+def onPollRequested(con, pid, channel, puuid):
+    # Every ingesting process hears this; only the one polling it acts.
+    if puuid in poll_schedule.intervals:
+        poll_schedule.bump(puuid)
 
-    all_match_coroutines = []
-    for account in accounts:
-        match_coroutines = await valorantAccountSave(account, unique_match_ids)
-        all_match_coroutines.extend(match_coroutines)
 
-    await asyncio.gather(*all_match_coroutines)
+async def requestPoll(con, puuid):
+    """Ask whichever process holds `puuid`'s shard to poll it soon."""
+    await con.execute("SELECT pg_notify($1, $2)", POLL_CHANNEL, puuid)
+
+
+async def valorantMatchesSave():
+    """Poll the accounts `poll_schedule` has due, and reschedule them by
+    whether they had new matches."""
+    due = poll_schedule.pop_due()
+    if not due:
+        return
+    async with pool.acquire() as con:
+        accounts = await con.fetch(
+            "SELECT puuid, last_match_start FROM riotaccounts WHERE puuid = ANY($1)",
+            due,
+        )
+    found = await scheduler.run_cycle(accounts)
+    for puuid in due:
+        poll_schedule.record(puuid, found.get(puuid, False))
 
 
-async def getAccountPUUIDName(puuid):
+async def getAccountPUUIDName(puuid, priority=INTERACTIVE):
     response = await getAiohttp(
         f"https://asia.api.riotgames.com/riot/account/v1/accounts/by-puuid/{puuid}",
         RIOT_API_AUTH,
+        priority,
     )
     if response[0] == 200:
         return f'{response[1]["gameName"]}#{response[1]["tagLine"]}'
     return None
 
 
-class PlayerOverallStats:
-    def __init__(self):
-        self.score = 0
-        self.kills = 0
-        self.deaths = 0
-        self.assists = 0
-        self.KD = 0
-
-        self.damage = 0
-        self.average_damage = 0
-
-        self.headshots = 0
-        self.bodyshots = 0
-        self.legshots = 0
-        self.HS = 0
+async def refreshRiotIds(puuids=None):
+    """Re-resolve cached Riot IDs older than RIOT_ID_TTL.
 
-        self.rounds_played = 0
+    Without `puuids`, the stalest RIOT_ID_REFRESH_BATCH accounts of this
+    process's shards are refreshed, so every account comes round within a
+    few cycles.
+    """
+    if puuids is None:
+        stale_before = int(time.time() * 1000) - RIOT_ID_TTL * 1000
+        async with pool.acquire() as con:
+            accounts = await con.fetch(
+                f"""
+                SELECT puuid FROM riotaccounts
+                WHERE riot_id_updated_at < $1 AND {in_shards_sql(3, 4)}
+                ORDER BY riot_id_updated_at LIMIT $2
+                """,
+                stale_before,
+                RIOT_ID_REFRESH_BATCH,
+                INGEST_SHARDS,
+                list(shard_leases.shards),
+            )
+        puuids = [account["puuid"] for account in accounts]
 
-    def updateKDA(self, overall_stats):
-        self.score = overall_stats.score
-        self.kills = overall_stats.kills
-        self.deaths = overall_stats.deaths
-        self.assists = overall_stats.assists
-        self.KD = self.kills / max(self.deaths, 1)
+    names = await asyncio.gather(
+        *(getAccountPUUIDName(puuid, BACKGROUND) for puuid in puuids),
+        return_exceptions=True,
+    )
+    seen_at = int(time.time() * 1000)
+    async with pool.acquire() as con:
+        await save_riot_ids(
+            con,
+            [
+                (puuid, name, seen_at)
+                for puuid, name in zip(puuids, names)
+                if isinstance(name, str)
+            ],
+        )
 
-    def updateDamage(self, damage):
-        self.damage += damage
-        self.rounds_played += 1
-        self.average_damage = self.damage / self.rounds_played
 
-    def updateShots(self, damaged_players):
-        for player in damaged_players:
-            self.headshots += player.headshots
-            self.bodyshots += player.bodyshots
-            self.legshots += player.legshots
-        self.HS = (
-            self.headshots / max(self.headshots + self.bodyshots + self.legshots, 1)
-        ) * 100.0
+async def fetchMatchData(match_id):
+    async with pool.acquire() as con:
+        return await con.fetchval(
+            "SELECT data FROM valorantmatches WHERE id = $1", match_id
+        )
 
 
 def ordinal(n: int):
@@ -175,98 +482,120 @@ def ordinal(n: int):
 @app.route("/")
 async def home_or_stats():
     if session.get("logged_in"):
+        if not static_data.loaded.is_set():
+            return catalogUnavailable()
         puuid = session.get("puuid")
-        response = await getAiohttp(
-            f"https://ap.api.riotgames.com/val/match/v1/matchlists/by-puuid/{puuid}",
-            RIOT_API_AUTH,
-        )
-        if response[0] != 200:
-            return await render_template("stats.html", matches=[])
-
-        match_count = 0
-        match_summaries = []
-        for match in response[1]["history"]:
-            match_id = match["matchId"]
-            async with pool.acquire() as con:
-                match_data = await con.fetchrow(
-                    "SELECT data FROM valorantmatches WHERE id = $1", match_id
-                )
-            if match_data is None:
-                continue
-            if match_count >= MAX_MATCHES:
-                break
-            current_match = pickle.loads(match_data["data"])
-            current_stats = PlayerOverallStats()
-            current_player = current_match.players.get_player_by_id(puuid)
-            current_stats.result = current_player.team.won
-
-            current_stats.updateKDA(current_player.overall_stats)
-            for round in current_match.rounds:
-                current_round_player = round.player_stats.get_player_by_id(puuid)
-                current_stats.updateShots(current_round_player.damaged_players)
-                current_stats.updateDamage(
-                    current_round_player.damaged_players.total_damage
-                )
-            current_stats.leaderboard_position = (
-                current_match.players.players.index(current_player) + 1
+        async with pool.acquire() as con:
+            await requestPoll(con, puuid)
+            account = await con.fetchrow(
+                """
+                SELECT riot_id, matchlist, matchlist_updated_at
+                FROM riotaccounts WHERE puuid = $1
+                """,
+                puuid,
+            )
+        username = account and account["riot_id"]
+        history_ids = account and account["matchlist"]
+
+        # The poller keeps the matchlist fresh; only go to Riot when it has
+        # fallen behind, and keep a stale list if Riot is unavailable.
+        fetched_at = account["matchlist_updated_at"] if account else 0
+        if time.time() * 1000 - fetched_at > MATCHLIST_MAX_AGE * 1000:
+            response = await getAiohttp(
+                f"https://ap.api.riotgames.com/val/match/v1/matchlists/by-puuid/{puuid}",
+                RIOT_API_AUTH,
+                INTERACTIVE,
             )
-            current_stats.ability_stats = current_player.ability_stats
+            if response[0] == 200:
+                history = response[1]["history"]
+                history_ids = [match["matchId"] for match in history]
+                async with pool.acquire() as con:
+                    await save_matchlist(con, puuid, history)
+        if history_ids is None:
+            return await renderTemplate("stats.html", matches=[])
 
-            current_match.overall_stats = current_stats
-            match_summaries.append(current_match)
-            match_count += 1
+        async with pool.acquire() as con:
+            match_summaries = await fetch_history_summaries(
+                con, puuid, history_ids, MAX_MATCHES, match_cache
+            )
+            career = await fetch_career(con, puuid)
+        if username is None and puuid not in riot_id_lookups:
+            # Resolve it for the next visit instead of holding up this one.
+            riot_id_lookups[puuid] = asyncio.create_task(refreshRiotIds([puuid]))
+            riot_id_lookups[puuid].add_done_callback(
+                lambda _: riot_id_lookups.pop(puuid, None)
+            )
 
-        return await render_template(
+        return await renderTemplate(
             "stats.html",
             matches=match_summaries,
+            career=career,
             ordinal=ordinal,
-            username=await getAccountPUUIDName(puuid),
+            username=username or "",
         )
     else:
-        return await render_template("index.html")
+        return await renderTemplate("index.html")
 
 
-@app.route("/matches/<match_id>")
-async def match_details(match_id):
-    if not session.get("logged_in") or not match_id:
-        return redirect("/")
-
-    puuid = session.get("puuid")
-    async with pool.acquire() as con:
-        match_data = await con.fetchrow(
-            "SELECT data FROM valorantmatches WHERE id = $1", match_id
-        )
-
-    if match_data is None:
-        return redirect("/")
+async def renderMatchPage(match_id, puuid):
+    current_match = await match_cache.get(match_id, fetchMatchData)
+    if current_match is None:
+        return None
 
-    current_match = pickle.loads(match_data["data"])
     current_player = current_match.players.get_player_by_id(puuid)
 
-    overall_stats = PlayerOverallStats()
-    overall_stats.updateKDA(current_player.overall_stats)
-    for round in current_match.rounds:
-        round_player = round.player_stats.get_player_by_id(puuid)
-        if round_player:
-            overall_stats.updateShots(round_player.damaged_players)
-            overall_stats.updateDamage(round_player.damaged_players.total_damage)
+    overall_stats = PlayerOverallStats.for_player(current_match, current_player)
 
-    return await render_template(
+    players_table = await page_cache.fragment(
+        match_id,
+        "players",
+        lambda: renderTemplate("match_players.html", match=current_match),
+    )
+    rounds_overview = await page_cache.fragment(
+        match_id,
+        "rounds",
+        lambda: renderTemplate("match_rounds.html", match=current_match),
+    )
+    return await renderTemplate(
         "match_stats.html",
         match=current_match,
         current_player=current_player,
         overall_stats=overall_stats,
+        players_table=Markup(players_table),
+        rounds_overview=Markup(rounds_overview),
+    )
+
+
+@app.route("/matches/<match_id>")
+async def match_details(match_id):
+    if not session.get("logged_in") or not match_id:
+        return redirect("/")
+
+    puuid = session.get("puuid")
+    etag = page_etag(match_id, puuid)
+    headers = {"ETag": etag, "Cache-Control": PAGE_CACHE_CONTROL, "Vary": "Cookie"}
+    not_modified = notModified(etag, headers)
+    if not_modified:
+        return not_modified
+    if not static_data.loaded.is_set():
+        return catalogUnavailable()
+
+    body = await page_cache.page(
+        pool, match_id, puuid, lambda: renderMatchPage(match_id, puuid)
     )
+    if body is None:
+        return redirect("/")
+    return body, 200, headers
 
 
 @app.route("/privacyPolicy")
 async def privacyPolicy():
-    return await render_template("privacyPolicy.html")
+    return await renderTemplate("privacyPolicy.html")
 
 
 @app.route("/termsOfService")
 async def termsOfService():
-    return await render_template("termsOfService.html")
+    return await renderTemplate("termsOfService.html")
 
 
 @app.route("/login")
@@ -292,15 +621,23 @@ async def valorantLogin():
             if response.status == 200:
                 account_resp = await response.json()
                 async with pool.acquire() as con:
-                    results = f"INSERT INTO riotaccounts (puuid) VALUES ($1)"
-                    try:
-                        await con.execute(results, account_resp["puuid"])
-                    except asyncpg.exceptions.UniqueViolationError:
-                        pass
+                    await con.execute(
+                        """
+                        INSERT INTO riotaccounts (puuid, riot_id, riot_id_updated_at)
+                        VALUES ($1, $2, $3)
+                        ON CONFLICT (puuid) DO UPDATE
+                        SET riot_id = EXCLUDED.riot_id,
+                            riot_id_updated_at = EXCLUDED.riot_id_updated_at
+                        """,
+                        account_resp["puuid"],
+                        f'{account_resp["gameName"]}#{account_resp["tagLine"]}',
+                        int(time.time() * 1000),
+                    )
+                    await requestPoll(con, account_resp["puuid"])
                 session["logged_in"] = True
                 session["puuid"] = account_resp["puuid"]
                 return redirect("/")
-    return await render_template("riotaccountNotLinked.html")
+    return await renderTemplate("riotaccountNotLinked.html")
 
 
 def login_required(func):
@@ -313,6 +650,116 @@ def login_required(func):
     return wrapper
 
 
+def notOwnPlayer(puuid):
+    """A 403 unless `puuid` is the logged-in player, else `None`."""
+    if puuid != session.get("puuid"):
+        return {"error": "players can only read their own stats"}, 403
+    return None
+
+
+@app.route("/api/players/<puuid>/career")
+@login_required
+async def player_career(puuid):
+    forbidden = notOwnPlayer(puuid)
+    if forbidden:
+        return forbidden
+    try:
+        last = int(request.args.get("last", 20))
+    except ValueError:
+        return {"error": "last must be an integer"}, 400
+    last = min(max(last, 1), 100)
+
+    async with pool.acquire() as con:
+        career = await fetch_career(con, puuid)
+        recent = await fetch_recent_career(con, puuid, last)
+    return {
+        "puuid": puuid,
+        "career": career.as_dict(),
+        "recent": {"matches": last, **recent.as_dict()},
+    }
+
+
+@app.route("/api/players/<puuid>/heatmaps/<kind>")
+@login_required
+async def player_heatmap(puuid, kind):
+    """`kind` heatmap on the map given by its `map` url, as JSON bins or,
+    with `format=png`, an overlay for the map's minimap."""
+    forbidden = notOwnPlayer(puuid)
+    if forbidden:
+        return forbidden
+    map_url = request.args.get("map")
+    format = request.args.get("format", "json")
+    if kind not in HEATMAP_KINDS:
+        return {"error": f"kind must be one of {', '.join(HEATMAP_KINDS)}"}, 404
+    if not map_url:
+        return {"error": "missing map parameter"}, 400
+    if format not in ("json", "png"):
+        return {"error": "format must be json or png"}, 400
+
+    async with pool.acquire() as con:
+        body = await heatmap_cache.get(con, puuid, map_url, kind, format)
+    content_type = "image/png" if format == "png" else "application/json"
+    return body, 200, {"Content-Type": content_type}
+
+
+@app.route("/api/v1/matches")
+@login_required
+async def api_matches():
+    """The logged-in player's stored matches, newest first, a page at a
+    time (follow `next` as `cursor`), or all of them in one chunked response
+    with `stream=1`."""
+    puuid = session.get("puuid")
+    if request.args.get("stream") == "1":
+        return (
+            stream_history(pool, puuid),
+            200,
+            {
+                "Content-Type": "application/json",
+                "Cache-Control": HISTORY_CACHE_CONTROL,
+            },
+        )
+
+    try:
+        limit = int(request.args.get("limit", PAGE_SIZE))
+    except ValueError:
+        return {"error": "limit must be an integer"}, 400
+    limit = min(max(limit, 1), MAX_PAGE_SIZE)
+
+    try:
+        async with pool.acquire() as con:
+            page = await fetch_history_page(
+                con, puuid, request.args.get("cursor"), limit
+            )
+    except ValueError as e:
+        return {"error": str(e)}, 400
+    return page, 200, {"Cache-Control": HISTORY_CACHE_CONTROL}
+
+
+@app.route("/api/v1/matches/<match_id>")
+@login_required
+async def api_match(match_id):
+    etag = match_etag(match_id)
+    headers = {"ETag": etag, "Cache-Control": MATCH_CACHE_CONTROL}
+    not_modified = notModified(etag, headers)
+    if not_modified:
+        return not_modified
+
+    data = await fetchMatchData(match_id)
+    if data is None:
+        return {"error": "match not found"}, 404
+    body = json.dumps(match_json(data))
+    return body, 200, {**headers, "Content-Type": "application/json"}
+
+
+@app.route("/metrics")
+async def metricsPage():
+    if METRICS_TOKEN and (
+        request.headers.get("Authorization") != f"Bearer {METRICS_TOKEN}"
+    ):
+        return "", 401
+    return metrics.render(), 200, {"Content-Type": "text/plain; version=0.0.4"}
+
+
 @app.route("/logout")
 async def logout():
     session.pop("logged_in", None)
@@ -0,0 +1,131 @@
+"""JSON serialization for the `/api/v1` match routes.
+
+Everything here works from `matchplayers` rows and the compact stored
+columns, never from `Match` objects. Histories are paged with an opaque
+keyset cursor over `(start_time, match_id)`, so any page costs one
+indexed range read however deep it is; `stream_history` walks the same
+cursor to send a whole history in chunks.
+"""
+
+import base64
+import json
+
+from matchparser import ValorantAPI
+from matchstore import decode_match, is_compact, load_compact, to_compact, to_riot_json
+
+
+API_VERSION = 1
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+STREAM_BATCH = 500
+
+# Stored matches never change; only a new API version changes their JSON.
+MATCH_CACHE_CONTROL = "private, max-age=31536000, immutable"
+HISTORY_CACHE_CONTROL = "private, no-cache"
+
+_HISTORY_QUERY = """
+    SELECT * FROM matchplayers
+    WHERE puuid = $1 AND (start_time, match_id) < ($2, $3)
+    ORDER BY start_time DESC, match_id DESC
+    LIMIT $4
+"""
+# Sorts after every real key, so the first page starts at the newest match.
+_FIRST_KEY = (2**63 - 1, "")
+
+
+def encode_cursor(record):
+    key = f"{record['start_time']}:{record['match_id']}"
+    return base64.urlsafe_b64encode(key.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Return the `(start_time, match_id)` a cursor continues after; raises
+    `ValueError` for anything `encode_cursor` did not produce."""
+    try:
+        key = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        start_time, match_id = key.split(":", 1)
+        return int(start_time), match_id
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor {cursor!r}") from e
+
+
+def summary_json(record):
+    game_map = ValorantAPI().get_map(record["map_url"])
+    agent = ValorantAPI().get_agent(record["agent"])
+    shots = record["headshots"] + record["bodyshots"] + record["legshots"]
+    return {
+        "match_id": record["match_id"],
+        "start_time": record["start_time"],
+        "map": {"url": record["map_url"], "name": game_map.name if game_map else None},
+        "queue": {
+            "id": record["queue"],
+            "name": ValorantAPI().get_formatted_queue_name(record["queue"]),
+        },
+        "agent": {"id": record["agent"], "name": agent.name if agent else None},
+        "won": record["won"],
+        "leaderboard_position": record["leaderboard_position"],
+        "stats": {
+            "score": record["score"],
+            "kills": record["kills"],
+            "deaths": record["deaths"],
+            "assists": record["assists"],
+            "damage": record["damage"],
+            "rounds_played": record["rounds_played"],
+            "headshots": record["headshots"],
+            "bodyshots": record["bodyshots"],
+            "legshots": record["legshots"],
+            "headshot_percentage": record["headshots"] / max(shots, 1) * 100.0,
+            "average_damage": record["damage"] / max(record["rounds_played"], 1),
+        },
+    }
+
+
+async def fetch_history_page(con, puuid, cursor=None, limit=PAGE_SIZE):
+    """Return one page of `puuid`'s stored matches, newest first, and the
+    cursor of the next page (`None` on the last one)."""
+    start_time, match_id = _FIRST_KEY if cursor is None else decode_cursor(cursor)
+    # One extra row tells whether another page follows.
+    records = await con.fetch(_HISTORY_QUERY, puuid, start_time, match_id, limit + 1)
+    next_cursor = encode_cursor(records[limit - 1]) if len(records) > limit else None
+    return {
+        "version": API_VERSION,
+        "puuid": puuid,
+        "matches": [summary_json(record) for record in records[:limit]],
+        "next": next_cursor,
+    }
+
+
+async def stream_history(pool, puuid, batch_size=STREAM_BATCH):
+    """Yield `puuid`'s whole history as chunks of one JSON document.
+
+    A connection is held only while a batch is read, so a slow client never
+    ties one up.
+    """
+    yield f'{{"version": {API_VERSION}, "puuid": {json.dumps(puuid)}, "matches": ['.encode()
+    start_time, match_id = _FIRST_KEY
+    first = True
+    while True:
+        async with pool.acquire() as con:
+            records = await con.fetch(
+                _HISTORY_QUERY, puuid, start_time, match_id, batch_size
+            )
+        if not records:
+            break
+        chunk = ", ".join(json.dumps(summary_json(record)) for record in records)
+        yield (chunk if first else ", " + chunk).encode()
+        first = False
+        if len(records) < batch_size:
+            break
+        start_time, match_id = records[-1]["start_time"], records[-1]["match_id"]
+    yield b"]}"
+
+
+def match_etag(match_id):
+    return f'"v{API_VERSION}-{match_id}"'
+
+
+def match_json(data):
+    """Serialize a stored row in Riot's match shape; legacy pickled rows are
+    decoded and re-encoded to the compact columns first."""
+    compact = load_compact(data) if is_compact(data) else to_compact(decode_match(data))
+    return {"version": API_VERSION, "match": to_riot_json(compact)}
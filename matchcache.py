@@ -0,0 +1,121 @@
+import asyncio
+import collections
+import os
+
+from matchstore import decode_match, is_compact
+
+
+MATCH_CACHE_BYTES = int(os.getenv("MATCH_CACHE_BYTES", 128 * 1024 * 1024))
+
+# Decoded size per stored byte, measured with tracemalloc on synthetic
+# 10-player matches; walking the object graph costs more than decoding.
+COMPACT_EXPANSION = 40
+PICKLE_EXPANSION = 3
+
+
+def estimate_size(data):
+    """Approximate memory held by the decoded form of a stored row."""
+    return len(data) * (COMPACT_EXPANSION if is_compact(data) else PICKLE_EXPANSION)
+
+
+class MatchCache:
+    """Decoded `Match` objects keyed by match id, least recently used first.
+
+    Stored matches never change, so entries are only dropped to keep the
+    estimated decoded size under `max_bytes`. Concurrent `get` calls for an
+    id that is not cached share one fetch and decode.
+    """
+
+    def __init__(self, max_bytes=MATCH_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = collections.OrderedDict()
+        self.size = 0
+        self._inflight = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, match_id):
+        return match_id in self.entries
+
+    def stats(self):
+        return {
+            "entries": len(self.entries),
+            "bytes": self.size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+        }
+
+    def _lookup(self, match_id):
+        entry = self.entries.get(match_id)
+        if entry is None:
+            return None
+        self.entries.move_to_end(match_id)
+        self.hits += 1
+        return entry[0]
+
+    def _store(self, match_id, data):
+        match = decode_match(data, lazy=True)
+        size = estimate_size(data)
+        previous = self.entries.pop(match_id, None)
+        if previous is not None:
+            self.size -= previous[1]
+        if size <= self.max_bytes:
+            self.entries[match_id] = (match, size)
+            self.size += size
+            while self.size > self.max_bytes:
+                _, (_, evicted_size) = self.entries.popitem(last=False)
+                self.size -= evicted_size
+                self.evictions += 1
+        return match
+
+    def add(self, match_id, data):
+        """Return the decoded match for an already fetched row, caching it."""
+        match = self._lookup(match_id)
+        if match is None:
+            self.misses += 1
+            match = self._store(match_id, data)
+        return match
+
+    async def get(self, match_id, fetch):
+        """Return the decoded match, calling `fetch(match_id)` on a miss.
+
+        `fetch` returns the stored row's data, or `None` when the match is
+        not stored; missing matches are not cached.
+        """
+        match = self._lookup(match_id)
+        if match is not None:
+            return match
+
+        load = self._inflight.get(match_id)
+        if load is None:
+            self.misses += 1
+            # The load runs as its own task so a waiter that gives up (a
+            # closed request) does not cancel it for everyone else.
+            load = asyncio.create_task(self._load(match_id, fetch))
+            self._inflight[match_id] = load
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(load)
+
+    async def _load(self, match_id, fetch):
+        try:
+            data = await fetch(match_id)
+            if data is None:
+                return None
+            # `add` may have cached it while the fetch was running.
+            entry = self.entries.get(match_id)
+            return entry[0] if entry is not None else self._store(match_id, data)
+        finally:
+            del self._inflight[match_id]
+
+
+match_cache = MatchCache()
@@ -1,50 +1,21 @@
 from datetime import datetime
-import requests
-from functools import lru_cache
+from sys import intern
 
 
 class ValorantAPI:
     BASE_URL = "https://valorant-api.com/v1/"
 
-    @staticmethod
-    @lru_cache(maxsize=None)
-    def fetch_data(endpoint):
-        """Fetch data from the Valorant API and cache it."""
-        url = f"{ValorantAPI.BASE_URL}{endpoint}"
-        response = requests.get(url)
-        if response.status_code == 200:
-            return response.json()
-        raise Exception(
-            f"Failed to fetch data from {url}: {response.status_code} {response.text}"
-        )
-
     def get_armor(self, armor_id):
-        json_data = self.fetch_data("gear")
-        for i in json_data["data"]:
-            if i["uuid"] == armor_id:
-                return Armor(i)
-        return None
+        return self.catalog.get("gear", armor_id)
 
     def get_weapon(self, weapon_id):
-        json_data = self.fetch_data("weapons")
-        for i in json_data["data"]:
-            if i["uuid"] == weapon_id:
-                return Weapon(i)
-        return None
+        return self.catalog.get("weapons", weapon_id)
 
     def get_card(self, card_id):
-        json_data = self.fetch_data("playercards")
-        for i in json_data["data"]:
-            if i["uuid"] == card_id:
-                return Card(i)
-        return None
+        return self.catalog.get("playercards", card_id)
 
     def get_title(self, title_id):
-        json_data = self.fetch_data("playertitles")
-        for i in json_data["data"]:
-            if i["uuid"] == title_id:
-                return Title(i)
-        return None
+        return self.catalog.get("playertitles", title_id)
 
     def get_formatted_team_name(self, team_id):
         team_names = {"Red": "Attackers", "Blue": "Defenders"}
@@ -66,28 +37,88 @@ class ValorantAPI:
         return queue_names.get(queue_id, "Unknown")
 
     def get_map(self, map_url):
-        json_data = self.fetch_data("maps")
-        for i in json_data["data"]:
-            if map_url == i["mapUrl"]:
-                return Map(i)
-        return None
+        return self.catalog.get("maps", map_url)
 
     def get_agent(self, agent_id):
-        json_data = self.fetch_data("agents?isPlayableCharacter=true")
-        for i in json_data["data"]:
-            if i["uuid"] == agent_id:
-                return Agent(i)
-        return None
+        return self.catalog.get("agents?isPlayableCharacter=true", agent_id)
 
     def get_competitive_tier(self, tier_id):
-        json_data = self.fetch_data("competitivetiers")
-        for i in json_data["data"][-1]["tiers"]:
-            if i["tier"] == tier_id:
-                return CompetitiveTier(i)
-        return None
+        return self.catalog.get("competitivetiers", tier_id)
+
+
+class Catalog:
+    """Keyed view over the static valorant-api.com datasets.
+
+    Each dataset is indexed once on first use, and every key resolves to a
+    single shared model instance, so lookups are O(1) and parsing a match no
+    longer builds a fresh Weapon/Armor/... object per reference. Datasets
+    come from `load` (see `staticdata`), or from `fetch(endpoint)` when one
+    is given; until then every lookup is a miss, never a network call.
+    """
+
+    def __init__(self, fetch=None):
+        self.fetch = fetch
+        self.datasets = {}
+        self._indexes = {}
+
+    def load(self, datasets):
+        """Replace the cached payloads; indexes are rebuilt on next use."""
+        self.datasets = dict(datasets)
+        self._indexes = {}
+
+    def clear(self):
+        self.load({})
+
+    @property
+    def is_loaded(self):
+        return all(endpoint in self.datasets for endpoint in CATALOG_ENDPOINTS)
+
+    def get(self, endpoint, key):
+        entry = self._indexes.get(endpoint)
+        if entry is None:
+            entry = self._build_index(endpoint)
+        index, instances = entry
+
+        instance = instances.get(key)
+        if instance is None:
+            json_data = index.get(key)
+            if json_data is None:
+                return None
+            instance = CATALOG_ENDPOINTS[endpoint][0](json_data)
+            instance.freeze()
+            instances[key] = instance
+        return instance
+
+    def _build_index(self, endpoint):
+        _, key, items = CATALOG_ENDPOINTS[endpoint]
+        json_data = self.datasets.get(endpoint)
+        if json_data is None:
+            if self.fetch is None:
+                # Not loaded yet: a miss, and indexed properly once it is.
+                return {}, {}
+            json_data = self.fetch(endpoint)
+        entry = ({item[key]: item for item in items(json_data)}, {})
+        self._indexes[endpoint] = entry
+        return entry
+
+
+class CatalogItem:
+    """Static content shared between every match that references it."""
+
+    _frozen = False
+
+    def freeze(self):
+        object.__setattr__(self, "_frozen", True)
+
+    def __setattr__(self, name, value):
+        if self._frozen:
+            raise AttributeError(
+                f"{type(self).__name__} instances are shared and read-only"
+            )
+        object.__setattr__(self, name, value)
 
 
-class CompetitiveTier:
+class CompetitiveTier(CatalogItem):
     def __init__(self, json_data):
         self.tier = json_data["tier"]
         self.rank = json_data["divisionName"]
@@ -97,7 +128,7 @@ class CompetitiveTier:
         self.large_icon = json_data["largeIcon"]
 
 
-class Agent:
+class Agent(CatalogItem):
     def __init__(self, json_data):
         self.id = json_data["uuid"]
         self.name = json_data["displayName"]
@@ -128,7 +159,7 @@ class Agent:
                 self.icon = json_data["displayIcon"]
 
 
-class Map:
+class Map(CatalogItem):
     def __init__(self, json_data):
         self.id = json_data["uuid"]
         self.url = json_data["mapUrl"]
@@ -139,8 +170,31 @@ class Map:
         self.tactical_description = json_data["tacticalDescription"]
         self.coordinates = json_data["coordinates"]
 
+        # Game coordinates to minimap fractions; None on maps without one.
+        self.x_multiplier = json_data.get("xMultiplier")
+        self.y_multiplier = json_data.get("yMultiplier")
+        self.x_scalar = json_data.get("xScalarToAdd")
+        self.y_scalar = json_data.get("yScalarToAdd")
+
+    @property
+    def has_minimap(self):
+        return None not in (
+            self.x_multiplier,
+            self.y_multiplier,
+            self.x_scalar,
+            self.y_scalar,
+        )
+
+    def to_minimap(self, location):
+        """Position of a game `Coordinate` on the minimap, as `(x, y)`
+        fractions of its width and height; the game's axes are swapped."""
+        return (
+            location.y * self.x_multiplier + self.x_scalar,
+            location.x * self.y_multiplier + self.y_scalar,
+        )
+
 
-class Armor:
+class Armor(CatalogItem):
     def __init__(self, json_data):
         self.id = json_data["uuid"]
         self.name = json_data["displayName"]
@@ -150,7 +204,7 @@ class Armor:
         self.damage_reduction = json_data["details"][1]["value"]
 
 
-class Weapon:
+class Weapon(CatalogItem):
     def __init__(self, json_data):
         self.id = json_data["uuid"]
         self.name = json_data["displayName"]
@@ -160,7 +214,7 @@ class Weapon:
         self.category = json_data["shopData"]["category"]
 
 
-class Card:
+class Card(CatalogItem):
     def __init__(self, json_data):
         self.id = json_data["uuid"]
         self.name = json_data["displayName"]
@@ -171,13 +225,75 @@ class Card:
         self.large_image = json_data["largeArt"]
 
 
-class Title:
+class Title(CatalogItem):
     def __init__(self, json_data):
         self.id = json_data["uuid"]
         self.text = json_data["titleText"]
 
 
-class Match:
+CATALOG_ENDPOINTS = {
+    # endpoint: (model, key field, items accessor)
+    "gear": (Armor, "uuid", lambda json_data: json_data["data"]),
+    "weapons": (Weapon, "uuid", lambda json_data: json_data["data"]),
+    "playercards": (Card, "uuid", lambda json_data: json_data["data"]),
+    "playertitles": (Title, "uuid", lambda json_data: json_data["data"]),
+    "maps": (Map, "mapUrl", lambda json_data: json_data["data"]),
+    "agents?isPlayableCharacter=true": (
+        Agent,
+        "uuid",
+        lambda json_data: json_data["data"],
+    ),
+    "competitivetiers": (
+        CompetitiveTier,
+        "tier",
+        lambda json_data: json_data["data"][-1]["tiers"],
+    ),
+}
+
+ValorantAPI.catalog = Catalog()
+
+
+class Model:
+    """Base of the per-match classes.
+
+    A decoded match holds thousands of these, so they are slotted, and they
+    pickle as a plain dict of their slots; rows pickled before the slots
+    (whose state is the old instance `__dict__`) load the same way.
+    """
+
+    __slots__ = ()
+
+    def __getstate__(self):
+        state = {}
+        for cls in type(self).__mro__:
+            for name in getattr(cls, "__slots__", ()):
+                if hasattr(self, name):
+                    state[name] = getattr(self, name)
+        return state
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+
+
+class Match(Model):
+    __slots__ = (
+        "id",
+        "map_url",
+        "map",
+        "mode_raw",
+        "mode",
+        "is_ranked",
+        "start_time_raw",
+        "start_time",
+        "end_time_raw",
+        "end_time",
+        "teams",
+        "winner",
+        "players",
+        "rounds",
+    )
+
     def __init__(self, json_data):
         self.id = json_data["matchInfo"]["matchId"]
 
@@ -206,18 +322,22 @@ class Match:
         self.rounds = Rounds(json_data["roundResults"], self.players, self.teams)
 
 
-class Teams:
+class Teams(Model):
+    __slots__ = ("teams", "teams_by_id")
+
     def __init__(self, json_data):
         self.teams = [Team(team_data) for team_data in json_data]
+        self.teams_by_id = {team.id: team for team in self.teams}
+
+    def __setstate__(self, state):
+        # Matches pickled before the index existed rebuild it on load.
+        super().__setstate__(state)
+        self.teams_by_id = {team.id: team for team in self.teams}
 
     def get_team_by_id(self, team_id):
         if team_id is None:
             return None
-
-        for team in self.teams:
-            if team.id == team_id:
-                return team
-        return None
+        return self.teams_by_id.get(team_id)
 
     def __iter__(self):
         return iter(self.teams)
@@ -229,7 +349,9 @@ class Teams:
         return self.teams[index]
 
 
-class Team:
+class Team(Model):
+    __slots__ = ("id", "name", "score", "won")
+
     def __init__(self, json_data):
         self.id = json_data["teamId"]
 
@@ -238,19 +360,22 @@ class Team:
         self.won = json_data["won"]
 
 
-class Players:
+class Players(Model):
+    __slots__ = ("players", "players_by_id")
+
     def __init__(self, json_data, teams: Teams):
         self.players = [Player(player_data, teams) for player_data in json_data]
         self.players.sort(key=lambda x: x.overall_stats.score, reverse=True)
+        self.players_by_id = {player.id: player for player in self.players}
+
+    def __setstate__(self, state):
+        super().__setstate__(state)
+        self.players_by_id = {player.id: player for player in self.players}
 
     def get_player_by_id(self, player_id):
         if player_id is None:
             return None
-
-        for player in self.players:
-            if player.id == player_id:
-                return player
-        return None
+        return self.players_by_id.get(player_id)
 
     def __iter__(self):
         return iter(self.players)
@@ -262,9 +387,31 @@ class Players:
         return self.players[index]
 
 
-class Player:
+class Player(Model):
+    __slots__ = (
+        "id",
+        "name",
+        "tag",
+        "display_name",
+        "card_id",
+        "card",
+        "title_id",
+        "title",
+        "level",
+        "party_id",
+        "tier_id",
+        "tier",
+        "is_observer",
+        "team_id",
+        "team",
+        "character_id",
+        "character",
+        "overall_stats",
+        "ability_stats",
+    )
+
     def __init__(self, json_data, teams: Teams):
-        self.id = json_data["puuid"]
+        self.id = intern(json_data["puuid"])
         self.name = json_data["gameName"]
         self.tag = json_data["tagLine"]
         self.display_name = f"{self.name}#{self.tag}"
@@ -291,7 +438,9 @@ class Player:
             json_data.get("stats", {}).get("abilityCasts", {}), self.character
         )
 
-    class Stats:
+    class Stats(Model):
+        __slots__ = ("score", "kills", "deaths", "assists")
+
         def __init__(self, json_data):
             self.score = json_data.get("score", 0)
             self.kills = json_data.get("kills", 0)
@@ -303,7 +452,15 @@ class Player:
                 f"Score: {self.score}, K/D/A: {self.kills}/{self.deaths}/{self.assists}"
             )
 
-    class AbilityStats:
+    class AbilityStats(Model):
+        __slots__ = (
+            "character",
+            "grenade_casts",
+            "ability1_casts",
+            "ability2_casts",
+            "ultimate_casts",
+        )
+
         def __init__(self, json_data, character: Agent):
             self.character = character
             if json_data is None:
@@ -328,7 +485,9 @@ class Player:
             return ability_summary
 
 
-class Rounds:
+class Rounds(Model):
+    __slots__ = ("rounds",)
+
     def __init__(self, json_data, players: Players, teams: Teams):
         self.rounds = [Round(round_data, players, teams) for round_data in json_data]
 
@@ -342,26 +501,31 @@ class Rounds:
         return self.rounds[index]
 
 
-class Coordinate:
+class Coordinate(Model):
+    __slots__ = ("x", "y")
+
     def __init__(self, json_data):
         self.x = json_data["x"]
         self.y = json_data["y"]
 
 
-class PlayerStats:
+class PlayerStats(Model):
+    __slots__ = ("player_stats", "player_stats_by_id")
+
     def __init__(self, json_data, players: Players):
         self.player_stats = [
             self.PlayerStat(player_data, players) for player_data in json_data
         ]
+        self.player_stats_by_id = {stat.id: stat for stat in self.player_stats}
+
+    def __setstate__(self, state):
+        super().__setstate__(state)
+        self.player_stats_by_id = {stat.id: stat for stat in self.player_stats}
 
     def get_player_by_id(self, player_id):
         if player_id is None:
             return None
-
-        for player in self.player_stats:
-            if player.id == player_id:
-                return player
-        return None
+        return self.player_stats_by_id.get(player_id)
 
     def __iter__(self):
         return iter(self.player_stats)
@@ -372,28 +536,110 @@ class PlayerStats:
     def __getitem__(self, index):
         return self.player_stats[index]
 
-    class PlayerStat:
+    class PlayerStat(Model):
+        """One player's round.
+
+        Instead of `economy`, `kills` and `damage`, the JSON may carry a
+        `source` with `economy(row)`, `kills(row)` and `damage(row)` methods
+        returning them; they are then only built on first access.
+        """
+
+        __slots__ = (
+            "id",
+            "player",
+            "score",
+            "_players",
+            "_source",
+            "_row",
+            "_economy",
+            "_killed_players",
+            "_damaged_players",
+        )
+
         def __init__(self, json_data, players: Players):
-            self.id = json_data["puuid"]
+            self.id = intern(json_data["puuid"])
             self.player = players.get_player_by_id(self.id)
             self.score = json_data["score"]
 
-            self.economy = self.Economy(json_data["economy"])
+            self._players = players
+            self._source = json_data.get("source")
+            self._row = json_data.get("row")
+            if self._source is None:
+                self._economy = self.Economy(json_data["economy"])
+                self._killed_players = self.KilledPlayers(json_data["kills"], players)
+                self._damaged_players = self.DamagedPlayers(
+                    json_data["damage"], players
+                )
+            else:
+                self._economy = None
+                self._killed_players = None
+                self._damaged_players = None
+
+        @property
+        def economy(self):
+            if self._economy is None:
+                self._economy = self.Economy(self._source.economy(self._row))
+            return self._economy
+
+        @property
+        def killed_players(self):
+            if self._killed_players is None:
+                self._killed_players = self.KilledPlayers(
+                    self._source.kills(self._row), self._players
+                )
+            return self._killed_players
 
-            self.killed_players = self.KilledPlayers(json_data["kills"], players)
-            self.damaged_players = self.DamagedPlayers(json_data["damage"], players)
+        @property
+        def damaged_players(self):
+            if self._damaged_players is None:
+                self._damaged_players = self.DamagedPlayers(
+                    self._source.damage(self._row), self._players
+                )
+            return self._damaged_players
+
+        def __getstate__(self):
+            return {
+                "id": self.id,
+                "player": self.player,
+                "score": self.score,
+                "economy": self.economy,
+                "killed_players": self.killed_players,
+                "damaged_players": self.damaged_players,
+            }
+
+        def __setstate__(self, state):
+            self.id = state["id"]
+            self.player = state["player"]
+            self.score = state["score"]
+            self._players = None
+            self._source = None
+            self._row = None
+            self._economy = state["economy"]
+            self._killed_players = state["killed_players"]
+            self._damaged_players = state["damaged_players"]
+
+        class Economy(Model):
+            __slots__ = (
+                "spent",
+                "remaining",
+                "weapon_id",
+                "weapon",
+                "armor_id",
+                "armor",
+            )
 
-        class Economy:
             def __init__(self, json_data):
                 self.spent = json_data["spent"]
                 self.remaining = json_data["remaining"]
 
-                self.weapon_id = json_data["weapon"]
+                self.weapon_id = intern(json_data["weapon"])
                 self.weapon = ValorantAPI().get_weapon(self.weapon_id)
-                self.armor_id = json_data["armor"]
+                self.armor_id = intern(json_data["armor"])
                 self.armor = ValorantAPI().get_armor(self.armor_id)
 
-        class KilledPlayers:
+        class KilledPlayers(Model):
+            __slots__ = ("killed_players",)
+
             def __init__(self, json_data, players: Players):
                 self.killed_players = [
                     self.KilledPlayer(data, players) for data in json_data
@@ -408,20 +654,48 @@ class PlayerStats:
             def __getitem__(self, index):
                 return self.killed_players[index]
 
-            class KilledPlayer:
+            class KilledPlayer(Model):
+                __slots__ = (
+                    "victim_id",
+                    "victim",
+                    "location",
+                    "killer_location",
+                    "round_time",
+                    "assistant_ids",
+                    "assistants",
+                    "weapon_used_id",
+                    "weapon_used",
+                )
+
                 def __init__(self, json_data, players: Players):
-                    self.victim_id = json_data["victim"]
+                    self.victim_id = intern(json_data["victim"])
                     self.victim = players.get_player_by_id(self.victim_id)
                     self.location = Coordinate(json_data["victimLocation"])
-
-                    self.assistants = [
+                    self.round_time = json_data.get("timeSinceRoundStartMillis")
+                    # Riot records where everyone stood at each kill; keep
+                    # the killer's, when it is there.
+                    self.killer_location = None
+                    killer_id = json_data.get("killer")
+                    for player_location in json_data.get("playerLocations") or ():
+                        if player_location["subject"] == killer_id:
+                            self.killer_location = Coordinate(
+                                player_location["location"]
+                            )
+                            break
+
+                    self.assistant_ids = tuple(map(intern, json_data["assistants"]))
+                    self.assistants = tuple(
                         players.get_player_by_id(player_id)
-                        for player_id in json_data["assistants"]
-                    ]
-                    self.weapon_used_id = json_data["finishingDamage"]["damageItem"]
+                        for player_id in self.assistant_ids
+                    )
+                    self.weapon_used_id = intern(
+                        json_data["finishingDamage"]["damageItem"]
+                    )
                     self.weapon_used = ValorantAPI().get_weapon(self.weapon_used_id)
 
-        class DamagedPlayers:
+        class DamagedPlayers(Model):
+            __slots__ = ("damaged_players", "total_damage")
+
             def __init__(self, json_data, players: Players):
                 self.damaged_players = [
                     self.DamagedPlayer(data, players) for data in json_data
@@ -439,9 +713,18 @@ class PlayerStats:
             def __getitem__(self, index):
                 return self.damaged_players[index]
 
-            class DamagedPlayer:
+            class DamagedPlayer(Model):
+                __slots__ = (
+                    "receiver_id",
+                    "receiver",
+                    "damage",
+                    "headshots",
+                    "bodyshots",
+                    "legshots",
+                )
+
                 def __init__(self, json_data, players: Players):
-                    self.receiver_id = json_data["receiver"]
+                    self.receiver_id = intern(json_data["receiver"])
                     self.receiver = players.get_player_by_id(self.receiver_id)
 
                     self.damage = json_data["damage"]
@@ -450,7 +733,9 @@ class PlayerStats:
                     self.legshots = json_data["legshots"]
 
 
-class Round:
+class Round(Model):
+    __slots__ = ("serial", "winner", "spike_info", "player_stats", "result_code")
+
     def __init__(self, json_data, players: Players, teams: Teams):
         self.serial = json_data["roundNum"]
         self.winner = teams.get_team_by_id(json_data["winningTeam"])
@@ -460,8 +745,24 @@ class Round:
 
         self.result_code = json_data["roundResultCode"]
 
-    class Spike:
+    class Spike(Model):
+        __slots__ = (
+            "planter",
+            "site",
+            "plant_time",
+            "plant_location",
+            "defuser",
+            "defuse_time",
+            "defuse_location",
+        )
+
         def __init__(self, json_data, players: Players):
+            self.site = None
+            self.plant_time = None
+            self.plant_location = None
+            self.defuse_time = None
+            self.defuse_location = None
+
             self.planter = players.get_player_by_id(json_data["bombPlanter"])
             if self.planter:
                 self.site = json_data["plantSite"]
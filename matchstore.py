@@ -0,0 +1,516 @@
+"""Compact, versioned storage format for parsed matches.
+
+A stored match is `MAGIC + version byte + zlib(JSON)`. The JSON holds only
+primitive columns: catalog references (weapons, armor, agents, cards,
+titles) are kept as uuids and rehydrated from `ValorantAPI.catalog` on
+decode, players are referenced by index into a puuid table, and rounds,
+per-round player stats, kills and damage events are stored as parallel
+arrays rather than one object per row. Columns added since version 1
+(the killer's position, kill times) are optional, so older rows still
+decode.
+
+    python matchstore.py migrate    # rewrite pickled valorantmatches rows
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import pickle
+import zlib
+from bisect import bisect_left, bisect_right
+
+import metrics
+from matchparser import Match
+
+
+MAGIC = b"VMS"
+SCHEMA_VERSION = 1
+
+DECODE_SECONDS = metrics.Histogram(
+    "match_decode_seconds", "Time to rebuild a stored match, by row format.", ["format"]
+)
+
+
+class _RefTable:
+    """Assigns a stable integer to every distinct value written."""
+
+    def __init__(self, values=()):
+        self.values = []
+        self.indexes = {}
+        for value in values:
+            self.add(value)
+
+    def add(self, value):
+        if value is None:
+            return -1
+        index = self.indexes.get(value)
+        if index is None:
+            index = len(self.values)
+            self.indexes[value] = index
+            self.values.append(value)
+        return index
+
+
+def _columns(*names):
+    return {name: [] for name in names}
+
+
+def _coordinate(location):
+    if location is None:
+        return 0, 0
+    return location.x, location.y
+
+
+def to_compact(match):
+    """Flatten a `Match` into the primitive, columnar storage layout."""
+    puuids = _RefTable(player.id for player in match.players)
+    uuids = _RefTable()
+
+    teams = _columns("id", "score", "won")
+    for team in match.teams:
+        teams["id"].append(team.id)
+        teams["score"].append(team.score)
+        teams["won"].append(team.won)
+
+    players = _columns(
+        "name",
+        "tag",
+        "card",
+        "title",
+        "level",
+        "party",
+        "tier",
+        "observer",
+        "team",
+        "agent",
+        "score",
+        "kills",
+        "deaths",
+        "assists",
+        "casts",
+    )
+    for player in match.players:
+        players["name"].append(player.name)
+        players["tag"].append(player.tag)
+        players["card"].append(uuids.add(player.card_id))
+        players["title"].append(uuids.add(player.title_id))
+        players["level"].append(player.level)
+        players["party"].append(player.party_id)
+        players["tier"].append(player.tier_id)
+        players["observer"].append(player.is_observer)
+        players["team"].append(player.team_id)
+        players["agent"].append(uuids.add(player.character_id))
+        players["score"].append(player.overall_stats.score)
+        players["kills"].append(player.overall_stats.kills)
+        players["deaths"].append(player.overall_stats.deaths)
+        players["assists"].append(player.overall_stats.assists)
+        ability_stats = player.ability_stats
+        players["casts"].append(
+            [
+                ability_stats.grenade_casts,
+                ability_stats.ability1_casts,
+                ability_stats.ability2_casts,
+                ability_stats.ultimate_casts,
+            ]
+        )
+
+    rounds = _columns(
+        "num",
+        "winner",
+        "result",
+        "planter",
+        "site",
+        "plant_time",
+        "plant_x",
+        "plant_y",
+        "defuser",
+        "defuse_time",
+        "defuse_x",
+        "defuse_y",
+    )
+    stats = _columns(
+        "round", "player", "score", "spent", "remaining", "weapon", "armor"
+    )
+    kills = _columns(
+        "stat",
+        "victim",
+        "x",
+        "y",
+        "killer_x",
+        "killer_y",
+        "time",
+        "weapon",
+        "assistants",
+    )
+    damage = _columns("stat", "receiver", "damage", "head", "body", "leg")
+
+    for round_index, round in enumerate(match.rounds):
+        rounds["num"].append(round.serial)
+        rounds["winner"].append(round.winner.id if round.winner else None)
+        rounds["result"].append(round.result_code)
+
+        spike = round.spike_info
+        if spike.planter:
+            x, y = _coordinate(spike.plant_location)
+            rounds["planter"].append(puuids.add(spike.planter.id))
+            rounds["site"].append(spike.site)
+            rounds["plant_time"].append(spike.plant_time)
+        else:
+            x, y = 0, 0
+            rounds["planter"].append(-1)
+            rounds["site"].append(None)
+            rounds["plant_time"].append(0)
+        rounds["plant_x"].append(x)
+        rounds["plant_y"].append(y)
+
+        if spike.defuser:
+            x, y = _coordinate(spike.defuse_location)
+            rounds["defuser"].append(puuids.add(spike.defuser.id))
+            rounds["defuse_time"].append(spike.defuse_time)
+        else:
+            x, y = 0, 0
+            rounds["defuser"].append(-1)
+            rounds["defuse_time"].append(0)
+        rounds["defuse_x"].append(x)
+        rounds["defuse_y"].append(y)
+
+        for player_stat in round.player_stats:
+            stat_index = len(stats["round"])
+            stats["round"].append(round_index)
+            stats["player"].append(puuids.add(player_stat.id))
+            stats["score"].append(player_stat.score)
+            stats["spent"].append(player_stat.economy.spent)
+            stats["remaining"].append(player_stat.economy.remaining)
+            stats["weapon"].append(uuids.add(player_stat.economy.weapon_id))
+            stats["armor"].append(uuids.add(player_stat.economy.armor_id))
+
+            for kill in player_stat.killed_players:
+                assistant_ids = getattr(kill, "assistant_ids", None)
+                if assistant_ids is None:
+                    assistant_ids = [
+                        assistant.id for assistant in kill.assistants if assistant
+                    ]
+                x, y = _coordinate(kill.location)
+                killer_location = getattr(kill, "killer_location", None)
+                kills["stat"].append(stat_index)
+                kills["victim"].append(puuids.add(kill.victim_id))
+                kills["x"].append(x)
+                kills["y"].append(y)
+                kills["killer_x"].append(killer_location and killer_location.x)
+                kills["killer_y"].append(killer_location and killer_location.y)
+                kills["time"].append(getattr(kill, "round_time", None))
+                kills["weapon"].append(uuids.add(kill.weapon_used_id))
+                kills["assistants"].append(
+                    [puuids.add(assistant_id) for assistant_id in assistant_ids]
+                )
+
+            for damaged in player_stat.damaged_players:
+                damage["stat"].append(stat_index)
+                damage["receiver"].append(puuids.add(damaged.receiver_id))
+                damage["damage"].append(damaged.damage)
+                damage["head"].append(damaged.headshots)
+                damage["body"].append(damaged.bodyshots)
+                damage["leg"].append(damaged.legshots)
+
+    return {
+        "v": SCHEMA_VERSION,
+        "id": match.id,
+        "map": match.map_url,
+        "queue": match.mode_raw,
+        "ranked": match.is_ranked,
+        "start": match.start_time_raw,
+        "length": match.end_time_raw - match.start_time_raw,
+        "puuids": puuids.values,
+        "uuids": uuids.values,
+        "teams": teams,
+        "players": players,
+        "rounds": rounds,
+        "stats": stats,
+        "kills": kills,
+        "damage": damage,
+    }
+
+
+def _puuid(compact, index):
+    return compact["puuids"][index] if index >= 0 else None
+
+
+def _uuid(compact, index):
+    return compact["uuids"][index] if index >= 0 else None
+
+
+def _stat_rows(columns, stat_index):
+    """Rows of `columns` (kills or damage, stored in stat order) for a stat."""
+    stat = columns["stat"]
+    return range(bisect_left(stat, stat_index), bisect_right(stat, stat_index))
+
+
+def _economy_json(compact, i):
+    stats = compact["stats"]
+    return {
+        "spent": stats["spent"][i],
+        "remaining": stats["remaining"][i],
+        "weapon": _uuid(compact, stats["weapon"][i]),
+        "armor": _uuid(compact, stats["armor"][i]),
+    }
+
+
+def _kills_json(compact, stat_index):
+    kills = compact["kills"]
+    killer = _puuid(compact, compact["stats"]["player"][stat_index])
+    # Rows stored before killer positions were kept have no such columns.
+    killer_x = kills.get("killer_x")
+    killer_y = kills.get("killer_y")
+    times = kills.get("time")
+    result = []
+    for i in _stat_rows(kills, stat_index):
+        kill = {
+            "killer": killer,
+            "victim": _puuid(compact, kills["victim"][i]),
+            "victimLocation": {"x": kills["x"][i], "y": kills["y"][i]},
+            "assistants": [_puuid(compact, index) for index in kills["assistants"][i]],
+            "finishingDamage": {"damageItem": _uuid(compact, kills["weapon"][i])},
+        }
+        if times is not None and times[i] is not None:
+            kill["timeSinceRoundStartMillis"] = times[i]
+        if killer_x is not None and killer_x[i] is not None:
+            kill["playerLocations"] = [
+                {"subject": killer, "location": {"x": killer_x[i], "y": killer_y[i]}}
+            ]
+        result.append(kill)
+    return result
+
+
+def _damage_json(compact, stat_index):
+    damage = compact["damage"]
+    return [
+        {
+            "receiver": _puuid(compact, damage["receiver"][i]),
+            "damage": damage["damage"][i],
+            "headshots": damage["head"][i],
+            "bodyshots": damage["body"][i],
+            "legshots": damage["leg"][i],
+        }
+        for i in _stat_rows(damage, stat_index)
+    ]
+
+
+class CompactStats:
+    """Serves one player-round's economy, kills and damage JSON on demand."""
+
+    __slots__ = ("compact",)
+
+    def __init__(self, compact):
+        self.compact = compact
+
+    def economy(self, row):
+        return _economy_json(self.compact, row)
+
+    def kills(self, row):
+        return _kills_json(self.compact, row)
+
+    def damage(self, row):
+        return _damage_json(self.compact, row)
+
+
+def to_riot_json(compact, lazy=False):
+    """Rebuild the subset of the Riot match payload that `Match` reads.
+
+    With `lazy`, player-rounds carry a `CompactStats` source instead of
+    their economy, kills and damage, which `Match` builds on first access.
+    """
+    puuids = compact["puuids"]
+
+    def puuid(index):
+        return _puuid(compact, index)
+
+    def uuid(index):
+        return _uuid(compact, index)
+
+    teams = compact["teams"]
+    players = compact["players"]
+    rounds = compact["rounds"]
+    stats = compact["stats"]
+
+    player_json = []
+    for i, casts in enumerate(players["casts"]):
+        player_json.append(
+            {
+                "puuid": puuids[i],
+                "gameName": players["name"][i],
+                "tagLine": players["tag"][i],
+                "playerCard": uuid(players["card"][i]),
+                "playerTitle": uuid(players["title"][i]),
+                "accountLevel": players["level"][i],
+                "partyId": players["party"][i],
+                "competitiveTier": players["tier"][i],
+                "isObserver": players["observer"][i],
+                "teamId": players["team"][i],
+                "characterId": uuid(players["agent"][i]),
+                "stats": {
+                    "score": players["score"][i],
+                    "kills": players["kills"][i],
+                    "deaths": players["deaths"][i],
+                    "assists": players["assists"][i],
+                    "abilityCasts": {
+                        "grenadeCasts": casts[0],
+                        "ability1Casts": casts[1],
+                        "ability2Casts": casts[2],
+                        "ultimateCasts": casts[3],
+                    },
+                },
+            }
+        )
+
+    source = CompactStats(compact) if lazy else None
+    stat_json = []
+    for i in range(len(stats["round"])):
+        stat = {"puuid": puuid(stats["player"][i]), "score": stats["score"][i]}
+        if lazy:
+            stat["source"] = source
+            stat["row"] = i
+        else:
+            stat["economy"] = _economy_json(compact, i)
+            stat["kills"] = _kills_json(compact, i)
+            stat["damage"] = _damage_json(compact, i)
+        stat_json.append(stat)
+
+    round_json = [
+        {
+            "roundNum": rounds["num"][i],
+            "winningTeam": rounds["winner"][i],
+            "roundResultCode": rounds["result"][i],
+            "bombPlanter": puuid(rounds["planter"][i]),
+            "plantSite": rounds["site"][i],
+            "plantRoundTime": rounds["plant_time"][i],
+            "plantLocation": {"x": rounds["plant_x"][i], "y": rounds["plant_y"][i]},
+            "bombDefuser": puuid(rounds["defuser"][i]),
+            "defuseRoundTime": rounds["defuse_time"][i],
+            "defuseLocation": {
+                "x": rounds["defuse_x"][i],
+                "y": rounds["defuse_y"][i],
+            },
+            "playerStats": [],
+        }
+        for i in range(len(rounds["num"]))
+    ]
+    for i, round_index in enumerate(stats["round"]):
+        round_json[round_index]["playerStats"].append(stat_json[i])
+
+    return {
+        "matchInfo": {
+            "matchId": compact["id"],
+            "mapId": compact["map"],
+            "queueId": compact["queue"],
+            "isRanked": compact["ranked"],
+            "gameStartMillis": compact["start"],
+            "gameLengthMillis": compact["length"],
+        },
+        "teams": [
+            {"teamId": team_id, "numPoints": score, "won": won}
+            for team_id, score, won in zip(teams["id"], teams["score"], teams["won"])
+        ],
+        "players": player_json,
+        "roundResults": round_json,
+    }
+
+
+def encode_match(match):
+    payload = json.dumps(to_compact(match), separators=(",", ":")).encode()
+    return MAGIC + bytes([SCHEMA_VERSION]) + zlib.compress(payload)
+
+
+def is_compact(data):
+    return bytes(data[: len(MAGIC)]) == MAGIC
+
+
+def load_compact(data):
+    """Return the stored columns without building any model objects."""
+    version = data[len(MAGIC)]
+    if version != SCHEMA_VERSION:
+        raise ValueError(f"Unsupported match schema version {version}")
+    return json.loads(zlib.decompress(data[len(MAGIC) + 1 :]))
+
+
+def decode_match(data, lazy=False):
+    """Build a `Match` from a stored row, accepting legacy pickled rows.
+
+    With `lazy`, compact rows defer each player-round's economy, kills and
+    damage until first access (see `to_riot_json`).
+    """
+    if not is_compact(data):
+        with DECODE_SECONDS.labels("pickle").time():
+            return pickle.loads(data)
+    with DECODE_SECONDS.labels("compact").time():
+        return Match(to_riot_json(load_compact(data), lazy))
+
+
+async def fetch_match_data(con, match_ids, limit=None):
+    """Return `{id: data}` for stored matches among `match_ids`, in one query.
+
+    With `limit`, only the first `limit` stored matches in `match_ids` order
+    are returned, so a long history never pulls more rows than it renders.
+    """
+    if not match_ids:
+        return {}
+    records = await con.fetch(
+        """
+        SELECT m.id, m.data
+        FROM unnest($1::text[]) WITH ORDINALITY AS h(id, position)
+        JOIN valorantmatches m ON m.id = h.id
+        ORDER BY h.position
+        LIMIT $2
+        """,
+        list(match_ids),
+        limit,
+    )
+    return {record["id"]: record["data"] for record in records}
+
+
+async def migrate(database_url, batch_size=200):
+    """Rewrite every pickled `valorantmatches` row in the compact format."""
+    import asyncpg
+
+    con = await asyncpg.connect(database_url)
+    migrated = 0
+    last_id = ""
+    try:
+        while True:
+            rows = await con.fetch(
+                "SELECT id, data FROM valorantmatches WHERE id > $1 ORDER BY id LIMIT $2",
+                last_id,
+                batch_size,
+            )
+            if not rows:
+                break
+            last_id = rows[-1]["id"]
+
+            updates = [
+                (row["id"], encode_match(pickle.loads(row["data"])))
+                for row in rows
+                if not is_compact(row["data"])
+            ]
+            if updates:
+                await con.executemany(
+                    "UPDATE valorantmatches SET data = $2 WHERE id = $1", updates
+                )
+                migrated += len(updates)
+                print(f"Migrated {migrated} matches (up to {last_id})")
+    finally:
+        await con.close()
+    return migrated
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Match storage maintenance")
+    parser.add_argument("command", choices=["migrate"])
+    parser.add_argument("--batch-size", type=int, default=200)
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        total = asyncio.run(migrate(os.getenv("DATABASE_URL"), args.batch_size))
+        print(f"Done, {total} matches rewritten")
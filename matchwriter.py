@@ -0,0 +1,184 @@
+import asyncio
+import os
+
+import asyncpg
+
+import metrics
+from db import save_riot_ids
+from heatmaps import save_bins
+from summaries import SUMMARY_COLUMNS
+
+
+WRITE_BATCH_SIZE = int(os.getenv("WRITE_BATCH_SIZE", 50))
+WRITE_FLUSH_INTERVAL = float(os.getenv("WRITE_FLUSH_INTERVAL", 2.0))
+WRITE_MAX_RETRIES = int(os.getenv("WRITE_MAX_RETRIES", 3))
+
+RETRYABLE_ERRORS = (
+    TimeoutError,
+    asyncio.TimeoutError,
+    OSError,
+    asyncpg.exceptions.InterfaceError,
+    asyncpg.exceptions.PostgresConnectionError,
+    asyncpg.exceptions.DeadlockDetectedError,
+)
+
+
+class MatchWriter:
+    """Persists parsed matches in batches.
+
+    `add` buffers a match and returns a future that resolves to `True` once
+    it is stored (or was already stored) and `False` if the batch could not
+    be written. A batch is flushed when it reaches `batch_size` or when it
+    is `flush_interval` seconds old: rows are COPYed into temporary staging
+    tables and merged with a single `INSERT ... ON CONFLICT DO NOTHING` per
+    table, in one transaction, along with the Riot IDs the matches show for
+    registered accounts and the heatmap bins of the matches that were new.
+    Timeouts and dropped connections are retried up to `max_retries` times. When two batches' worth of matches are
+    waiting, `add` blocks, pushing back on the download workers.
+    """
+
+    def __init__(
+        self,
+        pool,
+        batch_size=WRITE_BATCH_SIZE,
+        flush_interval=WRITE_FLUSH_INTERVAL,
+        max_retries=WRITE_MAX_RETRIES,
+    ):
+        self.pool = pool
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.pending = []
+        self.capacity = asyncio.Semaphore(batch_size * 2)
+        self.flush_lock = asyncio.Lock()
+        self._flusher = None
+        self._flushes = set()
+
+        self.rows_written = 0
+        self.batches_written = 0
+        self.batches_failed = 0
+
+    def start(self):
+        self._flusher = asyncio.create_task(self._flush_periodically())
+
+    async def stop(self):
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        await self.flush()
+
+    async def add(self, match_id, data, summary_rows, riot_ids=(), heatmap_bins=()):
+        await self.capacity.acquire()
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append(
+            (match_id, data, summary_rows, riot_ids, heatmap_bins, future)
+        )
+        if len(self.pending) >= self.batch_size:
+            flush = asyncio.create_task(self.flush())
+            self._flushes.add(flush)
+            flush.add_done_callback(self._flushes.discard)
+        return future
+
+    async def flush(self):
+        async with self.flush_lock:
+            batch, self.pending = self.pending, []
+            if not batch:
+                return
+            stored = await self._write_with_retries(batch)
+            for *_, future in batch:
+                self.capacity.release()
+                if not future.done():
+                    future.set_result(stored)
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                # Shielded so stop() never abandons a batch halfway through.
+                await asyncio.shield(self.flush())
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                metrics.failure("matchwriter_flush")
+                print(f"Match writer flush failed: {e!r}")
+
+    async def _write_with_retries(self, batch):
+        for attempt in range(self.max_retries + 1):
+            try:
+                await self._write(batch)
+                self.rows_written += len(batch)
+                self.batches_written += 1
+                return True
+            except RETRYABLE_ERRORS as e:
+                metrics.failure("matchwriter_retry")
+                print(f"Retrying batch of {len(batch)} matches ({attempt + 1}): {e!r}")
+                await asyncio.sleep(min(2**attempt, 10))
+            except Exception as e:
+                metrics.failure("matchwriter")
+                print(f"Failed to write batch of {len(batch)} matches: {e!r}")
+                break
+        self.batches_failed += 1
+        return False
+
+    async def _write(self, batch):
+        matches = {}
+        summary_rows = []
+        riot_ids = []
+        heatmap_bins = {}
+        for match_id, data, rows, names, bins, _ in batch:
+            if match_id not in matches:
+                matches[match_id] = data
+                summary_rows.extend(rows)
+                riot_ids.extend(names)
+                heatmap_bins[match_id] = bins
+
+        async with self.pool.acquire() as con:
+            async with con.transaction():
+                await con.execute(
+                    """
+                    CREATE TEMP TABLE IF NOT EXISTS valorantmatches_staging
+                        (LIKE valorantmatches INCLUDING DEFAULTS) ON COMMIT DELETE ROWS;
+                    CREATE TEMP TABLE IF NOT EXISTS matchplayers_staging
+                        (LIKE matchplayers INCLUDING DEFAULTS) ON COMMIT DELETE ROWS;
+                    """
+                )
+                await con.copy_records_to_table(
+                    "valorantmatches_staging",
+                    records=list(matches.items()),
+                    columns=["id", "data"],
+                )
+                await con.copy_records_to_table(
+                    "matchplayers_staging",
+                    records=summary_rows,
+                    columns=SUMMARY_COLUMNS,
+                )
+                inserted = await con.fetch(
+                    """
+                    INSERT INTO valorantmatches (id, data)
+                    SELECT id, data FROM valorantmatches_staging
+                    ON CONFLICT (id) DO NOTHING
+                    RETURNING id
+                    """
+                )
+                columns = ", ".join(SUMMARY_COLUMNS)
+                # Concurrent batches that share players take the row locks in
+                # the same order, so they wait on each other instead of
+                # deadlocking.
+                await con.execute(
+                    f"""
+                    INSERT INTO matchplayers ({columns})
+                    SELECT {columns} FROM matchplayers_staging
+                    ORDER BY match_id, puuid
+                    ON CONFLICT DO NOTHING
+                    """
+                )
+                await save_riot_ids(con, riot_ids)
+                # Counts are additive, so only bin matches stored just now.
+                await save_bins(
+                    con,
+                    [row for record in inserted for row in heatmap_bins[record["id"]]],
+                )
@@ -0,0 +1,303 @@
+"""In-process counters and timing histograms, served in Prometheus' text
+format by `render`.
+
+Metrics are declared at module level next to the code they measure and
+cost a `perf_counter` pair and a dict lookup per observation. Components
+that already keep their own counters (`MatchCache`, `MatchWriter`, ...)
+are exposed through `register` callbacks read at scrape time instead of
+being counted twice.
+
+With `PROFILE_SAMPLE_RATE` set, that share of requests runs under
+cProfile, one at a time, and requests slower than `PROFILE_SLOW_SECONDS`
+leave a `.prof` file in `PROFILE_DIR` (open with `python -m pstats`).
+"""
+
+import bisect
+import cProfile
+import os
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+
+DEFAULT_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", 0))
+PROFILE_SLOW_SECONDS = float(os.getenv("PROFILE_SLOW_SECONDS", 0.5))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+
+_metrics = []
+_callbacks = []
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs += [f'{name}="{value}"' for name, value in extra]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self.children = {}
+        self.lock = threading.Lock()
+        _metrics.append(self)
+
+    def labels(self, *values, **named):
+        key = values or tuple(named[name] for name in self.label_names)
+        key = tuple(str(value) for value in key)
+        child = self.children.get(key)
+        if child is None:
+            with self.lock:
+                child = self.children.setdefault(key, self._child())
+        return child
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in sorted(self.children.items()):
+            lines.extend(self._render_child(key, child))
+        return lines
+
+
+class _CounterChild:
+    __slots__ = ("value", "lock")
+
+    def __init__(self, lock):
+        self.value = 0
+        self.lock = lock
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _child(self):
+        return _CounterChild(self.lock)
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+    def _render_child(self, key, child):
+        yield f"{self.name}{_labels(self.label_names, key)} {_number(child.value)}"
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum", "lock")
+
+    def __init__(self, buckets, lock):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.lock = lock
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def _child(self):
+        return _HistogramChild(self.buckets, self.lock)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def time(self):
+        return self.labels().time()
+
+    def _render_child(self, key, child):
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), child.counts):
+            cumulative += count
+            labels = _labels(self.label_names, key, [("le", _number(bound))])
+            yield f"{self.name}_bucket{labels} {cumulative}"
+        labels = _labels(self.label_names, key)
+        yield f"{self.name}_sum{labels} {_number(child.sum)}"
+        yield f"{self.name}_count{labels} {cumulative}"
+
+
+def register(name, help, kind, read, labels=()):
+    """Expose a value kept elsewhere: `read()` returns a number, or with
+    `labels`, an iterable of `(label values, number)`."""
+    _callbacks.append((name, help, kind, read, tuple(labels)))
+
+
+def render():
+    """Every metric in the Prometheus text exposition format."""
+    lines = []
+    for metric in _metrics:
+        lines.extend(metric.render())
+    for name, help, kind, read, label_names in _callbacks:
+        try:
+            values = read()
+        except Exception as e:
+            print(f"Failed to read metric {name}: {e!r}")
+            continue
+        lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+        if not label_names:
+            values = [((), values)]
+        for key, value in values:
+            lines.append(f"{name}{_labels(label_names, key)} {_number(value)}")
+    return "\n".join(lines) + "\n"
+
+
+_QUERY_TARGET = re.compile(
+    r"\b(?:FROM|INTO|UPDATE|TABLE)\s+(?:IF\s+(?:NOT\s+)?EXISTS\s+)?([a-z_][\w.]*)",
+    re.IGNORECASE,
+)
+
+
+def query_name(query):
+    """A low-cardinality label for an SQL statement: its verb and first
+    table, e.g. `SELECT matchplayers`."""
+    words = query.split(None, 1)
+    if not words:
+        return "empty"
+    target = _QUERY_TARGET.search(query)
+    verb = words[0].upper().rstrip(";")
+    return f"{verb} {target.group(1)}" if target else verb
+
+
+FAILURES = Counter(
+    "failures_total", "Errors caught and logged, by component.", ["component"]
+)
+DB_QUERY_SECONDS = Histogram(
+    "db_query_seconds", "Postgres statement time, by statement.", ["query", "outcome"]
+)
+DB_ACQUIRE_SECONDS = Histogram(
+    "db_pool_acquire_seconds", "Time spent waiting for a pool connection."
+)
+
+
+def failure(component):
+    FAILURES.labels(component).inc()
+
+
+def _log_query(record):
+    outcome = "error" if record.exception is not None else "ok"
+    DB_QUERY_SECONDS.labels(query_name(record.query), outcome).observe(record.elapsed)
+
+
+async def instrument_connection(con):
+    """asyncpg pool `init` hook timing every statement on `con`."""
+    con.add_query_logger(_log_query)
+
+
+class _TimedAcquire:
+    def __init__(self, context):
+        self.context = context
+
+    async def __aenter__(self):
+        start = time.perf_counter()
+        try:
+            return await self.context.__aenter__()
+        finally:
+            DB_ACQUIRE_SECONDS.observe(time.perf_counter() - start)
+
+    async def __aexit__(self, *exc_info):
+        return await self.context.__aexit__(*exc_info)
+
+    def __await__(self):
+        return self.__aenter__().__await__()
+
+
+class TimedPool:
+    """An asyncpg pool whose `acquire` waits are measured."""
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    def acquire(self, *, timeout=None):
+        return _TimedAcquire(self.pool.acquire(timeout=timeout))
+
+    def __getattr__(self, name):
+        return getattr(self.pool, name)
+
+
+class RequestProfiler:
+    """cProfile for a sampled share of requests; one profile runs at a time
+    since the profiler sees the whole event loop thread."""
+
+    def __init__(
+        self,
+        sample_rate=PROFILE_SAMPLE_RATE,
+        slow_seconds=PROFILE_SLOW_SECONDS,
+        directory=PROFILE_DIR,
+    ):
+        self.sample_rate = sample_rate
+        self.slow_seconds = slow_seconds
+        self.directory = directory
+        self.active = False
+
+    def start(self):
+        """Return a running profiler for this request, or `None`."""
+        if self.active or random.random() >= self.sample_rate:
+            return None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:  # another profiler owns the thread
+            return None
+        self.active = True
+        return profile
+
+    def finish(self, profile, name, elapsed):
+        profile.disable()
+        self.active = False
+        if elapsed < self.slow_seconds:
+            return None
+        os.makedirs(self.directory, exist_ok=True)
+        slug = re.sub(r"[^\w]+", "_", name).strip("_") or "root"
+        path = os.path.join(self.directory, f"{int(time.time() * 1000)}-{slug}.prof")
+        profile.dump_stats(path)
+        print(f"Slow request {name} ({elapsed * 1000:.0f} ms), profile in {path}")
+        return path
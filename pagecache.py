@@ -0,0 +1,214 @@
+"""Rendered match pages, cached by match, viewer and template version.
+
+Stored matches never change, so a match page only depends on the match,
+who is looking at it and the templates. `PageCache` keeps rendered pages
+and the viewer-independent fragments (player table, rounds overview) that
+all ten lobby members share in one LRU, bounded by size. With
+`PAGE_CACHE_SHARED=1`, whole pages are also kept in `renderedpages` so
+every web process can serve a page any of them has rendered.
+
+`page_etag` is derived from the same key, so a browser revalidating with
+`If-None-Match` gets a 304 without the page being looked up at all. Any
+edit to the templates (or bump of `PAGE_FORMAT`) changes `TEMPLATE_VERSION`
+and with it every key.
+
+    python pagecache.py prune [--days 30]    # drop old shared pages
+"""
+
+import argparse
+import asyncio
+import collections
+import hashlib
+import os
+
+MATCH_PAGE_TEMPLATES = ("match_stats.html", "match_players.html", "match_rounds.html")
+# Bump when what the page shows changes outside the templates.
+PAGE_FORMAT = 1
+PAGE_CACHE_BYTES = int(os.getenv("PAGE_CACHE_BYTES", 32 * 1024 * 1024))
+PAGE_CACHE_SHARED = os.getenv("PAGE_CACHE_SHARED", "0") == "1"
+PAGE_CACHE_CONTROL = "private, no-cache"
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS renderedpages (
+        match_id TEXT NOT NULL,
+        puuid TEXT NOT NULL,
+        version TEXT NOT NULL,
+        body TEXT NOT NULL,
+        created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+        PRIMARY KEY (match_id, puuid, version)
+    )
+    """,
+]
+
+
+def template_version(names=MATCH_PAGE_TEMPLATES, directory=None):
+    """A short hash of the named templates' sources."""
+    directory = directory or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "templates"
+    )
+    digest = hashlib.sha256(str(PAGE_FORMAT).encode())
+    for name in names:
+        with open(os.path.join(directory, name), "rb") as file:
+            digest.update(file.read())
+    return digest.hexdigest()[:12]
+
+
+TEMPLATE_VERSION = template_version()
+
+
+def page_etag(match_id, puuid, version=TEMPLATE_VERSION):
+    viewer = hashlib.sha256((puuid or "").encode()).hexdigest()[:12]
+    return f'"{version}-{match_id}-{viewer}"'
+
+
+class PageCache:
+    """Rendered pages and fragments, least recently used first.
+
+    `page` and `fragment` return the cached text or call `render()` for it;
+    concurrent calls for the same missing entry share one render, and
+    `None` (nothing to render) is never cached.
+    """
+
+    def __init__(
+        self,
+        max_bytes=PAGE_CACHE_BYTES,
+        shared=PAGE_CACHE_SHARED,
+        version=TEMPLATE_VERSION,
+    ):
+        self.max_bytes = max_bytes
+        self.shared = shared
+        self.version = version
+        self.entries = collections.OrderedDict()
+        self.size = 0
+        self._inflight = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.shared_hits = 0
+        self.renders = 0
+        self.evictions = 0
+
+    def stats(self):
+        return {
+            "entries": len(self.entries),
+            "bytes": self.size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "shared_hits": self.shared_hits,
+            "renders": self.renders,
+            "evictions": self.evictions,
+        }
+
+    async def page(self, pool, match_id, puuid, render):
+        key = ("page", match_id, puuid, self.version)
+
+        async def load():
+            if self.shared:
+                async with pool.acquire() as con:
+                    body = await con.fetchval(
+                        """
+                        SELECT body FROM renderedpages
+                        WHERE match_id = $1 AND puuid = $2 AND version = $3
+                        """,
+                        match_id,
+                        puuid,
+                        self.version,
+                    )
+                if body is not None:
+                    self.shared_hits += 1
+                    return body
+
+            body = await render()
+            self.renders += 1
+            if body is not None and self.shared:
+                async with pool.acquire() as con:
+                    await con.execute(
+                        """
+                        INSERT INTO renderedpages (match_id, puuid, version, body)
+                        VALUES ($1, $2, $3, $4) ON CONFLICT DO NOTHING
+                        """,
+                        match_id,
+                        puuid,
+                        self.version,
+                        body,
+                    )
+            return body
+
+        return await self._get(key, load)
+
+    async def fragment(self, match_id, name, render):
+        key = ("fragment", match_id, name, self.version)
+
+        async def load():
+            self.renders += 1
+            return await render()
+
+        return await self._get(key, load)
+
+    async def _get(self, key, load):
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+        task = self._inflight.get(key)
+        if task is None:
+            self.misses += 1
+            task = asyncio.create_task(self._load(key, load))
+            self._inflight[key] = task
+        return await asyncio.shield(task)
+
+    async def _load(self, key, load):
+        try:
+            body = await load()
+        finally:
+            del self._inflight[key]
+        if body is not None and len(body) <= self.max_bytes:
+            self.entries[key] = body
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+                self.evictions += 1
+        return body
+
+
+page_cache = PageCache()
+
+
+async def prune(con, days):
+    """Drop shared pages older than `days` or rendered by other templates."""
+    return await con.execute(
+        """
+        DELETE FROM renderedpages
+        WHERE version <> $1 OR created_at < now() - make_interval(days => $2)
+        """,
+        TEMPLATE_VERSION,
+        days,
+    )
+
+
+if __name__ == "__main__":
+    import asyncpg
+    from dotenv import load_dotenv
+
+    from db import ensure_schema
+
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Rendered page cache maintenance")
+    parser.add_argument("command", choices=["prune"])
+    parser.add_argument("--days", type=int, default=30)
+    args = parser.parse_args()
+
+    async def main():
+        con = await asyncpg.connect(os.getenv("DATABASE_URL"))
+        try:
+            await ensure_schema(con)
+            print(f"Done, {await prune(con, args.days)}")
+        finally:
+            await con.close()
+
+    asyncio.run(main())
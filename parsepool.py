@@ -0,0 +1,104 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import metrics
+from heatmaps import bin_match
+from matchparser import Match, ValorantAPI
+from matchstore import encode_match
+from summaries import summarize_match
+
+
+PARSE_EXECUTOR = os.getenv("PARSE_EXECUTOR", "process")
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", min(os.cpu_count() or 1, 4)))
+
+# Covers `Match.__init__` and encoding, plus any wait for a free worker.
+PARSE_SECONDS = metrics.Histogram(
+    "match_parse_seconds",
+    "Time to parse a downloaded match, by executor.",
+    ["executor"],
+)
+
+
+def _load_catalog(datasets):
+    ValorantAPI.catalog.load(datasets)
+
+
+def parse_match(json_data):
+    """Parse a Riot match payload into its stored row, summary rows, the
+    `(puuid, riot_id, seen_at)` of every player and its heatmap bins."""
+    match = Match(json_data)
+    riot_ids = [
+        (player.id, player.display_name, match.start_time_raw)
+        for player in match.players
+    ]
+    return (
+        encode_match(match),
+        summarize_match(match),
+        riot_ids,
+        bin_match(match),
+    )
+
+
+class ParseExecutor:
+    """Runs `parse_match` off the event loop.
+
+    The default is a process pool whose workers receive the static catalog
+    once, at startup, so parsing never touches the network and scales past
+    the GIL. When `ValorantAPI.catalog` is reloaded (a TTL refresh), the
+    next `parse` starts a fresh pool with the new catalog and lets the old
+    one finish what it has. Where processes cannot be started, or with
+    `PARSE_EXECUTOR=thread`, a thread pool sharing the in-process catalog is
+    used instead; it still keeps the loop free between matches.
+    """
+
+    def __init__(self, kind=PARSE_EXECUTOR, workers=PARSE_WORKERS):
+        self.kind = kind
+        self.workers = workers
+        self.executor = None
+        self.datasets = None
+        self._reload_lock = asyncio.Lock()
+
+    async def start(self, datasets):
+        self.datasets = datasets
+        if self.kind == "process":
+            try:
+                self.executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_load_catalog,
+                    initargs=(datasets,),
+                )
+                # Spawn the workers now so a broken environment falls back here.
+                await asyncio.wrap_future(self.executor.submit(int))
+                return
+            except (OSError, NotImplementedError, RuntimeError) as e:
+                print(f"Process parse pool unavailable, using threads: {e!r}")
+                if self.executor is not None:
+                    self.executor.shutdown(cancel_futures=True)
+                self.kind = "thread"
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="parse"
+        )
+
+    async def reload(self, datasets):
+        async with self._reload_lock:
+            if datasets is self.datasets:
+                return
+            stale = self.executor
+            await self.start(datasets)
+            stale.shutdown(wait=False)
+
+    async def parse(self, json_data):
+        datasets = ValorantAPI.catalog.datasets
+        if self.kind == "process" and datasets is not self.datasets:
+            await self.reload(datasets)
+        loop = asyncio.get_running_loop()
+        with PARSE_SECONDS.labels(self.kind).time():
+            return await loop.run_in_executor(self.executor, parse_match, json_data)
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
@@ -0,0 +1,293 @@
+import asyncio
+import collections
+import math
+import os
+import random
+import time
+from urllib.parse import urlsplit
+
+import aiohttp
+
+import metrics
+
+
+INTERACTIVE = 0
+BACKGROUND = 1
+
+RIOT_APP_RATE_LIMIT = os.getenv("RIOT_APP_RATE_LIMIT", "20:1,100:120")
+RIOT_MAX_RETRIES = int(os.getenv("RIOT_MAX_RETRIES", 3))
+# Share of every bucket that background requests leave for interactive ones.
+RIOT_INTERACTIVE_RESERVE = float(os.getenv("RIOT_INTERACTIVE_RESERVE", 0.2))
+# Longest an interactive request waits on limiters and backoff in total.
+RIOT_INTERACTIVE_MAX_WAIT = float(os.getenv("RIOT_INTERACTIVE_MAX_WAIT", 2))
+
+RIOT_REQUEST_SECONDS = metrics.Histogram(
+    "riot_request_seconds",
+    "Riot API request time per attempt, by endpoint and status.",
+    ["endpoint", "status"],
+)
+RIOT_WAIT_SECONDS = metrics.Histogram(
+    "riot_rate_limit_wait_seconds",
+    "Time requests spent waiting on the rate limiters, by priority.",
+    ["priority"],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120),
+)
+
+
+def parse_rate_limits(header):
+    """Parse a Riot `"20:1,100:120"` header into `[(count, seconds), ...]`."""
+    limits = []
+    for part in header.split(","):
+        count, _, seconds = part.strip().partition(":")
+        if count and seconds:
+            limits.append((int(count), int(seconds)))
+    return limits
+
+
+class TokenBucket:
+    """One `count:seconds` window; a spent token returns `seconds` after use.
+
+    Returning each token a full window after it was taken keeps any span of
+    `seconds` at or under `capacity` requests, whichever instant Riot's own
+    window starts at, unlike a bucket that refills continuously. Riot counts
+    a request when it gets there, so `settle` moves a token to the time its
+    response arrived, which is never earlier.
+    """
+
+    def __init__(self, capacity, seconds):
+        self.capacity = capacity
+        self.seconds = seconds
+        self.spent = collections.deque()
+
+    def refill(self, now):
+        while self.spent and self.spent[0] <= now - self.seconds:
+            self.spent.popleft()
+
+    @property
+    def tokens(self):
+        return self.capacity - len(self.spent)
+
+    def wait_time(self, needed, now):
+        missing = math.ceil(needed - self.tokens)
+        if missing <= 0:
+            return 0.0
+        if missing > len(self.spent):
+            return float(self.seconds)
+        return self.spent[missing - 1] + self.seconds - now
+
+    def consume(self, now):
+        self.spent.append(now)
+
+    def settle(self, taken, now):
+        try:
+            self.spent.remove(taken)
+        except ValueError:  # already returned, or the bucket was replaced
+            return
+        self.spent.append(now)
+
+    def sync(self, used, now):
+        """Trust the server's count of requests already used in this window."""
+        for _ in range(used - len(self.spent)):
+            self.spent.append(now)
+
+
+def endpoint(url):
+    """The method a Riot url calls: its path without the final id."""
+    return urlsplit(url).path.rsplit("/", 1)[0]
+
+
+class RateLimiter:
+    """All of Riot's windows for one app or method limit, as token buckets."""
+
+    def __init__(self, limits):
+        self.buckets = []
+        self.blocked_until = 0.0
+        self.interactive_waiting = 0
+        self.configure(limits)
+
+    def configure(self, limits):
+        current = {(bucket.capacity, bucket.seconds) for bucket in self.buckets}
+        if current == set(limits):
+            return
+        self.buckets = [TokenBucket(count, seconds) for count, seconds in limits]
+
+    def sync(self, counts):
+        now = time.monotonic()
+        used = dict((seconds, count) for count, seconds in counts)
+        for bucket in self.buckets:
+            if bucket.seconds in used:
+                bucket.refill(now)
+                bucket.sync(used[bucket.seconds], now)
+
+    def block(self, seconds):
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    def wait_time(self, priority):
+        now = time.monotonic()
+        wait = max(self.blocked_until - now, 0.0)
+        for bucket in self.buckets:
+            bucket.refill(now)
+            needed = 1.0
+            if priority != INTERACTIVE:
+                # Never reserve the last token, or a 1:10 bucket would
+                # starve background requests.
+                needed += min(
+                    bucket.capacity * RIOT_INTERACTIVE_RESERVE, bucket.capacity - 1
+                )
+            wait = max(wait, bucket.wait_time(needed, now))
+        if priority != INTERACTIVE and self.interactive_waiting and wait == 0:
+            wait = 0.05
+        return wait
+
+    def consume(self, now):
+        for bucket in self.buckets:
+            bucket.consume(now)
+
+    def settle(self, taken):
+        now = time.monotonic()
+        for bucket in self.buckets:
+            bucket.settle(taken, now)
+
+
+class RiotClient:
+    """Riot API access over the shared aiohttp session.
+
+    Requests take a token from their region's application limiter and from
+    the limiter of the method they call. Limits start from
+    `RIOT_APP_RATE_LIMIT` and follow the `X-App-Rate-Limit` /
+    `X-Method-Rate-Limit` headers Riot returns. A 429 blocks the limiter
+    named by `X-Rate-Limit-Type` for `Retry-After` seconds; 429s and 5xx are
+    retried with jittered exponential backoff. Background requests leave a
+    reserve in every bucket and yield to waiting interactive requests, which
+    give up with a 429 rather than wait past `interactive_max_wait` seconds.
+    """
+
+    def __init__(
+        self,
+        session,
+        headers=None,
+        app_limits=RIOT_APP_RATE_LIMIT,
+        max_retries=RIOT_MAX_RETRIES,
+        interactive_max_wait=RIOT_INTERACTIVE_MAX_WAIT,
+    ):
+        self.session = session
+        self.headers = headers or {}
+        self.app_limits = parse_rate_limits(app_limits)
+        self.max_retries = max_retries
+        self.interactive_max_wait = interactive_max_wait
+        self.app_limiters = {}
+        self.method_limiters = {}
+
+    def limiters(self, url):
+        parts = urlsplit(url)
+        region = parts.hostname.split(".", 1)[0]
+        method = endpoint(url)
+
+        app = self.app_limiters.get(region)
+        if app is None:
+            app = self.app_limiters[region] = RateLimiter(self.app_limits)
+        method_limiter = self.method_limiters.get((region, method))
+        if method_limiter is None:
+            method_limiter = self.method_limiters[(region, method)] = RateLimiter([])
+        return app, method_limiter
+
+    async def acquire(self, limiters, priority, deadline=None):
+        """Take a token from every limiter and return when it was taken, or
+        `None`, without one, if that would mean waiting past the monotonic
+        `deadline`."""
+        if priority == INTERACTIVE:
+            for limiter in limiters:
+                limiter.interactive_waiting += 1
+        try:
+            while True:
+                wait = max(limiter.wait_time(priority) for limiter in limiters)
+                if wait <= 0:
+                    taken = time.monotonic()
+                    for limiter in limiters:
+                        limiter.consume(taken)
+                    return taken
+                if deadline is not None and time.monotonic() + wait > deadline:
+                    return None
+                await asyncio.sleep(wait)
+        finally:
+            if priority == INTERACTIVE:
+                for limiter in limiters:
+                    limiter.interactive_waiting -= 1
+
+    def adapt(self, response, app, method):
+        headers = response.headers
+        if "X-App-Rate-Limit" in headers:
+            app.configure(parse_rate_limits(headers["X-App-Rate-Limit"]))
+        if "X-App-Rate-Limit-Count" in headers:
+            app.sync(parse_rate_limits(headers["X-App-Rate-Limit-Count"]))
+        if "X-Method-Rate-Limit" in headers:
+            method.configure(parse_rate_limits(headers["X-Method-Rate-Limit"]))
+        if "X-Method-Rate-Limit-Count" in headers:
+            method.sync(parse_rate_limits(headers["X-Method-Rate-Limit-Count"]))
+
+    def backoff(self, attempt):
+        return min(2**attempt, 30) * random.uniform(0.5, 1.5)
+
+    async def get(self, url, headers=None, priority=BACKGROUND):
+        """Return `(status, json body or None)`, like `getAiohttp` always has."""
+        app, method = self.limiters(url)
+        request_headers = dict(self.headers, **(headers or {}))
+        # Pages would rather show a miss than wait out a long backoff.
+        retries = (
+            self.max_retries if priority == BACKGROUND else min(self.max_retries, 1)
+        )
+        deadline = None
+        if priority == INTERACTIVE:
+            deadline = time.monotonic() + self.interactive_max_wait
+        status = -1
+        name = endpoint(url)
+        waited = RIOT_WAIT_SECONDS.labels(
+            "interactive" if priority == INTERACTIVE else "background"
+        )
+        for attempt in range(retries + 1):
+            with waited.time():
+                taken = await self.acquire((app, method), priority, deadline)
+            if taken is None:
+                return (429, None)
+            start = time.perf_counter()
+            try:
+                async with self.session.get(url, headers=request_headers) as response:
+                    app.settle(taken)
+                    method.settle(taken)
+                    self.adapt(response, app, method)
+                    status = response.status
+                    if status == 200:
+                        body = await response.json()
+                        RIOT_REQUEST_SECONDS.labels(name, 200).observe(
+                            time.perf_counter() - start
+                        )
+                        return (200, body)
+                    RIOT_REQUEST_SECONDS.labels(name, status).observe(
+                        time.perf_counter() - start
+                    )
+
+                    delay = self.backoff(attempt)
+                    if status == 429:
+                        retry_after = response.headers.get("Retry-After")
+                        if retry_after is not None:
+                            delay = float(retry_after) + random.uniform(0, 0.5)
+                            limit_type = response.headers.get("X-Rate-Limit-Type")
+                            limiter = method if limit_type == "method" else app
+                            limiter.block(delay)
+                    elif status < 500:
+                        return (status, None)
+            except (asyncio.TimeoutError, aiohttp.ClientError) as e:
+                app.settle(taken)
+                method.settle(taken)
+                RIOT_REQUEST_SECONDS.labels(name, "error").observe(
+                    time.perf_counter() - start
+                )
+                metrics.failure("riot")
+                print(f"Riot request {url} failed: {e!r}")
+                delay = self.backoff(attempt)
+
+            if attempt < retries:
+                if deadline is not None and time.monotonic() + delay > deadline:
+                    break
+                await asyncio.sleep(delay)
+        return (status, None)
@@ -0,0 +1,153 @@
+import asyncio
+import json
+import os
+import time
+
+import metrics
+from matchparser import CATALOG_ENDPOINTS, ValorantAPI
+
+
+SNAPSHOT_VERSION = 1
+SNAPSHOT_PATH = os.getenv(
+    "CATALOG_SNAPSHOT",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "catalog_snapshot.json"),
+)
+CATALOG_TTL = int(os.getenv("CATALOG_TTL", 6 * 60 * 60))
+CATALOG_OFFLINE = os.getenv("CATALOG_OFFLINE", "0") == "1"
+# Seconds between attempts while there is no catalog at all.
+CATALOG_RETRY = int(os.getenv("CATALOG_RETRY", 10))
+
+
+class StaticDataLoader:
+    """Keeps `ValorantAPI.catalog` populated without blocking the event loop.
+
+    All catalog endpoints are fetched concurrently over the shared aiohttp
+    session and persisted to a versioned snapshot file. A warm start loads
+    the snapshot and refreshes in the background once it is older than
+    `ttl` seconds; with `offline` set the snapshot is the only source. A
+    cold start that cannot reach valorant-api.com keeps retrying in the
+    background every `retry` seconds; `loaded` is set once there is a
+    catalog.
+    """
+
+    def __init__(
+        self,
+        catalog=None,
+        path=SNAPSHOT_PATH,
+        ttl=CATALOG_TTL,
+        offline=CATALOG_OFFLINE,
+        retry=CATALOG_RETRY,
+    ):
+        self.catalog = catalog if catalog is not None else ValorantAPI.catalog
+        self.path = path
+        self.ttl = ttl
+        self.offline = offline
+        self.retry = retry
+        self.session = None
+        self.fetched_at = 0
+        self.loaded = asyncio.Event()
+        self._refresh_task = None
+
+    @property
+    def is_stale(self):
+        return time.time() - self.fetched_at >= self.ttl
+
+    def load_snapshot(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                snapshot = json.load(file)
+        except (OSError, ValueError):
+            return False
+
+        if snapshot.get("version") != SNAPSHOT_VERSION:
+            return False
+        datasets = snapshot.get("datasets", {})
+        if any(endpoint not in datasets for endpoint in CATALOG_ENDPOINTS):
+            return False
+
+        self.catalog.load(datasets)
+        self.fetched_at = snapshot.get("fetched_at", 0)
+        return True
+
+    def save_snapshot(self, datasets, fetched_at):
+        snapshot = {
+            "version": SNAPSHOT_VERSION,
+            "fetched_at": fetched_at,
+            "datasets": datasets,
+        }
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump(snapshot, file)
+        os.replace(temp_path, self.path)
+
+    async def fetch_endpoint(self, endpoint):
+        url = f"{ValorantAPI.BASE_URL}{endpoint}"
+        async with self.session.get(url) as response:
+            if response.status != 200:
+                raise Exception(
+                    f"Failed to fetch data from {url}: {response.status} {await response.text()}"
+                )
+            return await response.json()
+
+    async def refresh(self):
+        """Fetch every endpoint concurrently and swap them in atomically."""
+        payloads = await asyncio.gather(
+            *(self.fetch_endpoint(endpoint) for endpoint in CATALOG_ENDPOINTS)
+        )
+        datasets = dict(zip(CATALOG_ENDPOINTS, payloads))
+        fetched_at = time.time()
+
+        self.catalog.load(datasets)
+        self.fetched_at = fetched_at
+        self.loaded.set()
+        try:
+            await asyncio.to_thread(self.save_snapshot, datasets, fetched_at)
+        except OSError as e:
+            metrics.failure("staticdata_snapshot")
+            print(f"Failed to write catalog snapshot {self.path}: {e}")
+
+    async def start(self, session=None):
+        """Populate the catalog; only waits on the network for a cold start."""
+        self.session = session
+        loaded = await asyncio.to_thread(self.load_snapshot)
+        if loaded:
+            self.loaded.set()
+        if self.offline:
+            if not loaded:
+                raise Exception(f"No usable catalog snapshot at {self.path}")
+            return
+
+        if not loaded:
+            try:
+                await self.refresh()
+            except Exception as e:
+                metrics.failure("staticdata")
+                print(f"Catalog fetch failed, retrying in the background: {e}")
+        self._refresh_task = asyncio.create_task(self.refresh_forever())
+
+    async def refresh_forever(self):
+        while True:
+            delay = max(self.ttl - (time.time() - self.fetched_at), 0)
+            await asyncio.sleep(delay)
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                metrics.failure("staticdata")
+                print(f"Catalog refresh failed: {e}")
+                await asyncio.sleep(
+                    min(self.ttl, 60) if self.loaded.is_set() else self.retry
+                )
+
+    async def stop(self):
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+
+
+loader = StaticDataLoader()
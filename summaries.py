@@ -0,0 +1,331 @@
+"""Per-player match summaries, computed once at ingestion.
+
+Every participant of a stored match gets one `matchplayers` row holding
+the aggregates the stats page shows, so rendering a history is a single
+indexed query instead of decoding each match.
+
+    python summaries.py backfill    # summarize matches stored before this table
+"""
+
+import argparse
+import asyncio
+import os
+from datetime import datetime
+
+import metrics
+from matchparser import Player, Team, ValorantAPI
+from matchstore import decode_match, fetch_match_data
+
+
+SUMMARY_COLUMNS = (
+    "match_id",
+    "puuid",
+    "start_time",
+    "map_url",
+    "queue",
+    "winner",
+    "won",
+    "agent",
+    "leaderboard_position",
+    "score",
+    "kills",
+    "deaths",
+    "assists",
+    "damage",
+    "rounds_played",
+    "headshots",
+    "bodyshots",
+    "legshots",
+    "grenade_casts",
+    "ability1_casts",
+    "ability2_casts",
+    "ultimate_casts",
+)
+# Rows per INSERT, keeping each statement under Postgres' parameter limit.
+INSERT_CHUNK = 1000
+
+OVERALL_STATS_SECONDS = metrics.Histogram(
+    "overall_stats_seconds", "Time to total a player's stats over a decoded match."
+)
+
+
+def insert_summaries_sql(count):
+    """A single INSERT for `count` summary rows."""
+    width = len(SUMMARY_COLUMNS)
+    values = ", ".join(
+        "({})".format(", ".join(f"${row * width + i}" for i in range(1, width + 1)))
+        for row in range(count)
+    )
+    return "INSERT INTO matchplayers ({}) VALUES {} ON CONFLICT DO NOTHING".format(
+        ", ".join(SUMMARY_COLUMNS), values
+    )
+
+
+class PlayerOverallStats:
+    def __init__(self):
+        self.score = 0
+        self.kills = 0
+        self.deaths = 0
+        self.assists = 0
+        self.KD = 0
+
+        self.damage = 0
+        self.average_damage = 0
+
+        self.headshots = 0
+        self.bodyshots = 0
+        self.legshots = 0
+        self.HS = 0
+
+        self.rounds_played = 0
+
+    def updateKDA(self, overall_stats):
+        self.score = overall_stats.score
+        self.kills = overall_stats.kills
+        self.deaths = overall_stats.deaths
+        self.assists = overall_stats.assists
+        self.KD = self.kills / max(self.deaths, 1)
+
+    def updateDamage(self, damage):
+        self.damage += damage
+        self.rounds_played += 1
+        self.average_damage = self.damage / self.rounds_played
+
+    def updateShots(self, damaged_players):
+        for player in damaged_players:
+            self.headshots += player.headshots
+            self.bodyshots += player.bodyshots
+            self.legshots += player.legshots
+        self.HS = (
+            self.headshots / max(self.headshots + self.bodyshots + self.legshots, 1)
+        ) * 100.0
+
+    @classmethod
+    def for_player(cls, match, player):
+        with OVERALL_STATS_SECONDS.time():
+            stats = cls()
+            stats.updateKDA(player.overall_stats)
+            for round in match.rounds:
+                round_player = round.player_stats.get_player_by_id(player.id)
+                if round_player:
+                    stats.updateShots(round_player.damaged_players)
+                    stats.updateDamage(round_player.damaged_players.total_damage)
+            return stats
+
+    @classmethod
+    def from_record(cls, record):
+        stats = cls()
+        stats.score = record["score"]
+        stats.kills = record["kills"]
+        stats.deaths = record["deaths"]
+        stats.assists = record["assists"]
+        stats.KD = stats.kills / max(stats.deaths, 1)
+
+        stats.damage = record["damage"]
+        stats.rounds_played = record["rounds_played"]
+        stats.average_damage = stats.damage / max(stats.rounds_played, 1)
+
+        stats.headshots = record["headshots"]
+        stats.bodyshots = record["bodyshots"]
+        stats.legshots = record["legshots"]
+        stats.HS = (
+            stats.headshots / max(stats.headshots + stats.bodyshots + stats.legshots, 1)
+        ) * 100.0
+        return stats
+
+
+def summarize_match(match):
+    """Return one `matchplayers` row per participant of `match`."""
+    rows = []
+    for position, player in enumerate(match.players, start=1):
+        stats = PlayerOverallStats.for_player(match, player)
+        ability_stats = player.ability_stats
+        rows.append(
+            (
+                match.id,
+                player.id,
+                match.start_time_raw,
+                match.map_url,
+                match.mode_raw,
+                match.winner.id if match.winner else None,
+                bool(player.team and player.team.won),
+                player.character_id,
+                position,
+                stats.score,
+                stats.kills,
+                stats.deaths,
+                stats.assists,
+                stats.damage,
+                stats.rounds_played,
+                stats.headshots,
+                stats.bodyshots,
+                stats.legshots,
+                ability_stats.grenade_casts,
+                ability_stats.ability1_casts,
+                ability_stats.ability2_casts,
+                ability_stats.ultimate_casts,
+            )
+        )
+    return rows
+
+
+class MatchSummary:
+    """The slice of a `Match` that `stats.html` renders, built from one row."""
+
+    def __init__(self, record):
+        self.id = record["match_id"]
+
+        self.map_url = record["map_url"]
+        self.map = ValorantAPI().get_map(self.map_url)
+
+        self.mode_raw = record["queue"]
+        self.mode = ValorantAPI().get_formatted_queue_name(self.mode_raw)
+
+        self.start_time_raw = record["start_time"]
+        self.start_time = datetime.fromtimestamp(self.start_time_raw // 1000)
+
+        self.winner = None
+        if record["winner"] is not None:
+            self.winner = Team(
+                {"teamId": record["winner"], "numPoints": None, "won": True}
+            )
+
+        self.character = ValorantAPI().get_agent(record["agent"])
+
+        self.overall_stats = PlayerOverallStats.from_record(record)
+        self.overall_stats.result = record["won"]
+        self.overall_stats.leaderboard_position = record["leaderboard_position"]
+        self.overall_stats.ability_stats = Player.AbilityStats(
+            {
+                "grenadeCasts": record["grenade_casts"],
+                "ability1Casts": record["ability1_casts"],
+                "ability2Casts": record["ability2_casts"],
+                "ultimateCasts": record["ultimate_casts"],
+            },
+            self.character,
+        )
+
+
+async def save_summaries(con, match, rows=None):
+    if rows is None:
+        rows = summarize_match(match)
+    # One statement per chunk, in key order, so the career trigger runs once
+    # and concurrent writers lock `playercareer` rows in the same order.
+    rows = sorted(rows, key=lambda row: (row[1], row[0]))
+    for start in range(0, len(rows), INSERT_CHUNK):
+        chunk = rows[start : start + INSERT_CHUNK]
+        await con.execute(
+            insert_summaries_sql(len(chunk)),
+            *[value for row in chunk for value in row],
+        )
+
+
+async def fetch_summary_records(con, puuid, match_ids):
+    """Return `{match_id: record}` for the given player's matches."""
+    records = await con.fetch(
+        "SELECT * FROM matchplayers WHERE puuid = $1 AND match_id = ANY($2)",
+        puuid,
+        match_ids,
+    )
+    return {record["match_id"]: record for record in records}
+
+
+async def fetch_history_summaries(con, puuid, match_ids, limit, cache=None):
+    """Return up to `limit` summaries for `match_ids`, in history order.
+
+    Matches stored without summary rows are fetched together in one
+    round-trip, and only the ones that end up on the page are decoded (into
+    `cache`, when given); their summaries are written back so the next view
+    takes the indexed path.
+    """
+    records = await fetch_summary_records(con, puuid, match_ids)
+
+    candidates = []
+    found = 0
+    for match_id in match_ids:
+        if found >= limit:
+            break
+        if match_id in records:
+            found += 1
+        else:
+            candidates.append(match_id)
+    stored = await fetch_match_data(con, candidates, limit)
+
+    history = []
+    new_rows = []
+    for match_id in match_ids:
+        if len(history) >= limit:
+            break
+        if match_id in records:
+            history.append(MatchSummary(records[match_id]))
+        elif match_id in stored:
+            if cache is None:
+                match = decode_match(stored[match_id], lazy=True)
+            else:
+                match = cache.add(match_id, stored[match_id])
+            rows = summarize_match(match)
+            new_rows.extend(rows)
+            for row in rows:
+                if row[1] == puuid:
+                    history.append(MatchSummary(dict(zip(SUMMARY_COLUMNS, row))))
+                    break
+
+    if new_rows:
+        await save_summaries(con, None, new_rows)
+    return history
+
+
+async def backfill(database_url, batch_size=100):
+    """Summarize every stored match that has no `matchplayers` rows yet."""
+    import aiohttp
+    import asyncpg
+
+    from db import ensure_schema
+    from staticdata import loader as static_data
+
+    con = await asyncpg.connect(database_url)
+    session = aiohttp.ClientSession()
+    summarized = 0
+    last_id = ""
+    try:
+        await ensure_schema(con)
+        await static_data.start(session)
+        while True:
+            rows = await con.fetch(
+                """
+                SELECT id, data FROM valorantmatches m
+                WHERE id > $1
+                  AND NOT EXISTS (SELECT 1 FROM matchplayers p WHERE p.match_id = m.id)
+                ORDER BY id LIMIT $2
+                """,
+                last_id,
+                batch_size,
+            )
+            if not rows:
+                break
+            last_id = rows[-1]["id"]
+
+            async with con.transaction():
+                for row in rows:
+                    await save_summaries(con, decode_match(row["data"]))
+            summarized += len(rows)
+            print(f"Summarized {summarized} matches (up to {last_id})")
+    finally:
+        await static_data.stop()
+        await session.close()
+        await con.close()
+    return summarized
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Match summary maintenance")
+    parser.add_argument("command", choices=["backfill"])
+    parser.add_argument("--batch-size", type=int, default=100)
+    args = parser.parse_args()
+
+    if args.command == "backfill":
+        total = asyncio.run(backfill(os.getenv("DATABASE_URL"), args.batch_size))
+        print(f"Done, {total} matches summarized")
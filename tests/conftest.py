@@ -0,0 +1,17 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from benchmarks.synthetic import generate_catalog
+from matchparser import ValorantAPI
+
+
+@pytest.fixture
+def catalog():
+    """The synthetic catalog, loaded into `ValorantAPI.catalog`."""
+    catalog = generate_catalog()
+    ValorantAPI.catalog.load(catalog)
+    return catalog
@@ -0,0 +1,33 @@
+import analytics
+from benchmarks.synthetic import generate_matches
+from matchparser import Match
+from matchstore import encode_match, to_compact
+
+
+def test_first_kills_follow_kill_times(catalog):
+    matches = [Match(match_json) for match_json in generate_matches(catalog, 5)]
+    data = analytics.flatten_rows([encode_match(match) for match in matches])
+
+    expected = {}
+    for match in matches:
+        for round in match.rounds:
+            kills = [
+                (kill.round_time, stat.id, kill.victim_id)
+                for stat in round.player_stats
+                for kill in stat.killed_players
+            ]
+            if kills:
+                _, killer, victim = min(kills)
+                expected.setdefault(killer, [0, 0])[0] += 1
+                expected.setdefault(victim, [0, 0])[1] += 1
+
+    for stats in analytics.first_kills(data):
+        assert [stats["first_kills"], stats["first_deaths"]] == expected.get(
+            stats["puuid"], [0, 0]
+        )
+
+
+def test_first_kills_skip_rows_without_kill_times(catalog):
+    compact = to_compact(Match(generate_matches(catalog, 1)[0]))
+    del compact["kills"]["time"]
+    assert analytics.first_kills(analytics.flatten([compact])) == []
@@ -0,0 +1,101 @@
+import asyncio
+import os
+
+import asyncpg
+import pytest
+
+from career import CAREER_TOTALS, aggregate_sql
+from db import ensure_schema
+from matchwriter import MatchWriter
+from parsepool import parse_match
+from summaries import save_summaries
+from benchmarks.synthetic import generate_matches
+
+DATABASE_URL = os.getenv("DATABASE_URL")
+SCHEMA = "test_career"
+
+pytestmark = pytest.mark.skipif(not DATABASE_URL, reason="DATABASE_URL not set")
+
+
+async def write_and_compare(parsed):
+    pool = await asyncpg.create_pool(
+        DATABASE_URL, server_settings={"search_path": SCHEMA}, min_size=2
+    )
+    try:
+        async with pool.acquire() as con:
+            await con.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+            await con.execute(f"CREATE SCHEMA {SCHEMA}")
+            await con.execute(
+                "CREATE TABLE valorantmatches (id TEXT PRIMARY KEY, data BYTEA)"
+            )
+            await con.execute("CREATE TABLE riotaccounts (puuid TEXT PRIMARY KEY)")
+            await ensure_schema(con)
+
+        # Summaries written directly, then sent again.
+        for _ in range(2):
+            async with pool.acquire() as con:
+                for _, _, summary_rows, _, _ in parsed[:3]:
+                    await save_summaries(con, None, summary_rows)
+
+        # Two writers with overlapping matches, re-sending within and
+        # across batches, and matches already summarized above.
+        writers = [MatchWriter(pool, batch_size=3), MatchWriter(pool, batch_size=2)]
+        sends = [
+            parsed[1:] + parsed[4:6],
+            parsed[3:] + parsed[:2],
+        ]
+        for writer in writers:
+            writer.start()
+        results = await asyncio.gather(
+            *(
+                writer.add(*entry)
+                for writer, entries in zip(writers, sends)
+                for entry in entries
+            )
+        )
+        for writer in writers:
+            await writer.flush()
+            await writer.stop()
+        assert all(await asyncio.gather(*results))
+
+        columns = ", ".join(CAREER_TOTALS)
+        async with pool.acquire() as con:
+            career = await con.fetch(
+                f"""
+                SELECT puuid, dimension, key, {columns} FROM playercareer
+                ORDER BY puuid, dimension, key
+                """
+            )
+            expected = await con.fetch(aggregate_sql("matchplayers"))
+            summarized = await con.fetchval(
+                "SELECT count(DISTINCT match_id) FROM matchplayers"
+            )
+        return (
+            [tuple(record) for record in career],
+            [tuple(record) for record in expected],
+            summarized,
+        )
+    finally:
+        async with pool.acquire() as con:
+            await con.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        await pool.close()
+
+
+def test_career_matches_summaries_despite_resends(catalog):
+    parsed = []
+    for match_json in generate_matches(catalog, 8):
+        data, summary_rows, riot_ids, heatmap_bins = parse_match(match_json)
+        parsed.append(
+            (
+                match_json["matchInfo"]["matchId"],
+                data,
+                summary_rows,
+                riot_ids,
+                heatmap_bins,
+            )
+        )
+
+    career, expected, summarized = asyncio.run(write_and_compare(parsed))
+    assert summarized == len(parsed)
+    assert career
+    assert career == expected
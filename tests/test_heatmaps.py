@@ -0,0 +1,37 @@
+from benchmarks.synthetic import generate_matches
+from heatmaps import bin_match
+from matchparser import Match
+from matchstore import decode_match, encode_match
+
+
+def kind_counts(rows, kind):
+    return {
+        (puuid, cell): count
+        for puuid, _, row_kind, cell, count in rows
+        if row_kind == kind
+    }
+
+
+def test_kills_are_binned_where_the_killer_stood(catalog):
+    match = Match(generate_matches(catalog, 1)[0])
+    rows = bin_match(match)
+    kills = kind_counts(rows, "kills")
+    deaths = kind_counts(rows, "deaths")
+
+    assert sum(kills.values()) == sum(deaths.values()) > 0
+    assert set(cell for _, cell in kills) != set(cell for _, cell in deaths)
+
+    # The killer's position survives storage.
+    for lazy in (False, True):
+        assert bin_match(decode_match(encode_match(match), lazy=lazy)) == rows
+
+
+def test_kills_without_killer_position_are_left_out(catalog):
+    match_json = generate_matches(catalog, 1)[0]
+    for round in match_json["roundResults"]:
+        for stat in round["playerStats"]:
+            for kill in stat["kills"]:
+                del kill["playerLocations"]
+    rows = bin_match(Match(match_json))
+    assert kind_counts(rows, "kills") == {}
+    assert kind_counts(rows, "deaths")
@@ -0,0 +1,73 @@
+import asyncio
+
+from ingest import IngestScheduler, PollSchedule
+
+HOUR = 60 * 60
+
+
+class Clock:
+    def __init__(self, now=1_700_000_000):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_found_comes_from_on_complete():
+    async def poll_account(account):
+        if account["puuid"] == "quiet":
+            return None
+
+        async def on_complete(results):
+            # Progress only if a download actually succeeded.
+            return any(result is True for result in results.values())
+
+        return [account["puuid"] + "-match"], on_complete
+
+    async def save_match(match_id):
+        return not match_id.startswith("failing")
+
+    scheduler = IngestScheduler(poll_account, save_match)
+    found = asyncio.run(
+        scheduler.run_cycle(
+            [{"puuid": "quiet"}, {"puuid": "failing"}, {"puuid": "playing"}]
+        )
+    )
+    assert found == {"quiet": False, "failing": False, "playing": True}
+
+
+def test_recently_active_accounts_stay_at_min_interval():
+    clock = Clock()
+    schedule = PollSchedule(min_interval=30, max_interval=600, clock=clock)
+    schedule.sync(
+        [
+            {"puuid": "active", "last_match_start": (clock.now - HOUR) * 1000},
+            {
+                "puuid": "dormant",
+                "last_match_start": (clock.now - 30 * 24 * HOUR) * 1000,
+            },
+        ]
+    )
+    for _ in range(6):
+        schedule.record("active", False)
+        schedule.record("dormant", False)
+        clock.now += 30
+    assert schedule.intervals["active"] == 30
+    assert schedule.intervals["dormant"] == 600
+
+
+def test_idle_accounts_back_off_after_the_active_window():
+    clock = Clock()
+    schedule = PollSchedule(
+        min_interval=30, max_interval=600, active_window=HOUR, clock=clock
+    )
+    schedule.sync([{"puuid": "player", "last_match_start": clock.now * 1000}])
+    schedule.pop_due()
+    schedule.record("player", True)
+
+    clock.now += HOUR
+    schedule.record("player", False)
+    assert schedule.intervals["player"] == 60
+    clock.now += 60
+    schedule.record("player", False)
+    assert schedule.intervals["player"] == 120
@@ -0,0 +1,99 @@
+import asyncio
+
+import pytest
+
+from benchmarks.synthetic import generate_matches
+from matchcache import MatchCache, estimate_size
+from matchparser import Match
+from matchstore import encode_match
+
+
+@pytest.fixture
+def match_row(catalog):
+    match = Match(generate_matches(catalog, 1)[0])
+    return match.id, encode_match(match)
+
+
+def test_add_during_inflight_get_is_counted_once(match_row):
+    match_id, data = match_row
+
+    async def scenario():
+        cache = MatchCache()
+        release = asyncio.Event()
+
+        async def fetch(_):
+            await release.wait()
+            return data
+
+        load = asyncio.create_task(cache.get(match_id, fetch))
+        await asyncio.sleep(0)
+        added = cache.add(match_id, data)
+        release.set()
+        return cache, added, await load
+
+    cache, added, loaded = asyncio.run(scenario())
+    assert loaded is added
+    assert cache.add(match_id, data) is added
+    assert len(cache) == 1
+    assert cache.size == estimate_size(data)
+    assert cache.stats()["hits"] == 1
+
+
+def test_least_recently_used_match_is_evicted_by_size(match_row):
+    _, data = match_row
+    cache = MatchCache(max_bytes=2 * estimate_size(data))
+
+    first = cache.add("first", data)
+    cache.add("second", data)
+    # Reading "first" again makes "second" the least recently used.
+    assert cache.add("first", data) is first
+    cache.add("third", data)
+
+    assert "second" not in cache
+    assert "first" in cache and "third" in cache
+    assert cache.size == 2 * estimate_size(data)
+    assert cache.stats()["evictions"] == 1
+
+
+def test_match_larger_than_the_cache_is_not_kept(match_row):
+    match_id, data = match_row
+    cache = MatchCache(max_bytes=estimate_size(data) - 1)
+
+    assert cache.add(match_id, data).id == match_id
+    assert len(cache) == 0
+    assert cache.size == 0
+
+
+def test_concurrent_gets_share_one_fetch(match_row):
+    match_id, data = match_row
+    fetched = []
+
+    async def scenario():
+        cache = MatchCache()
+
+        async def fetch(requested):
+            fetched.append(requested)
+            await asyncio.sleep(0.01)
+            return data
+
+        matches = await asyncio.gather(*(cache.get(match_id, fetch) for _ in range(5)))
+        return cache, matches
+
+    cache, matches = asyncio.run(scenario())
+    assert fetched == [match_id]
+    assert all(match is matches[0] for match in matches)
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["coalesced"] == 4
+
+
+def test_missing_match_is_not_cached():
+    async def fetch(_):
+        return None
+
+    async def scenario():
+        cache = MatchCache()
+        return cache, await cache.get("missing", fetch)
+
+    cache, match = asyncio.run(scenario())
+    assert match is None
+    assert "missing" not in cache
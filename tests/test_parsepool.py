@@ -0,0 +1,35 @@
+import asyncio
+import copy
+
+from benchmarks.synthetic import generate_matches
+from matchparser import ValorantAPI
+from parsepool import ParseExecutor
+
+
+def test_process_workers_pick_up_a_reloaded_catalog(catalog):
+    match_json = generate_matches(catalog, 1)[0]
+    map_url = match_json["matchInfo"]["mapId"]
+    without_map = copy.deepcopy(catalog)
+    without_map["maps"]["data"] = [
+        game_map
+        for game_map in without_map["maps"]["data"]
+        if game_map["mapUrl"] != map_url
+    ]
+
+    async def scenario():
+        ValorantAPI.catalog.load(without_map)
+        executor = ParseExecutor(kind="process", workers=1)
+        await executor.start(ValorantAPI.catalog.datasets)
+        try:
+            _, _, _, before = await executor.parse(match_json)
+            # A TTL refresh brings the new map in.
+            ValorantAPI.catalog.load(catalog)
+            _, _, _, after = await executor.parse(match_json)
+            return executor.kind, before, after
+        finally:
+            executor.shutdown()
+
+    kind, before, after = asyncio.run(scenario())
+    assert kind == "process"
+    assert before == []
+    assert after
@@ -0,0 +1,60 @@
+import asyncio
+import time
+
+import aiohttp
+
+from benchmarks import bench_riot_client
+from benchmarks.riot_stub import RiotStub
+from benchmarks.synthetic import generate_catalog, generate_matches
+from riotclient import BACKGROUND, INTERACTIVE, RateLimiter, RiotClient
+
+
+def test_client_adapts_to_stub_limit():
+    result = asyncio.run(bench_riot_client.run(requests=30, limit=10))
+    bench_riot_client.check(result)
+
+
+def test_interactive_request_does_not_wait_out_retry_after():
+    async def scenario():
+        matches = generate_matches(generate_catalog(), 2)
+        stub = RiotStub(matches, app_limit=(1, 1), retry_after=8)
+        base_url = await stub.start()
+        try:
+            async with aiohttp.ClientSession() as session:
+                client = RiotClient(session, app_limits="20:1", interactive_max_wait=1)
+                url = f"{base_url}/val/match/v1/matches/{{}}"
+                background = [
+                    asyncio.create_task(
+                        client.get(
+                            url.format(match["matchInfo"]["matchId"]),
+                            priority=BACKGROUND,
+                        )
+                    )
+                    for match in matches
+                ]
+                while not stub.rate_limited:
+                    await asyncio.sleep(0.01)
+
+                start = time.perf_counter()
+                result = await client.get(
+                    url.format(matches[0]["matchInfo"]["matchId"]), priority=INTERACTIVE
+                )
+                elapsed = time.perf_counter() - start
+                for task in background:
+                    task.cancel()
+                await asyncio.gather(*background, return_exceptions=True)
+                return result, elapsed
+        finally:
+            await stub.stop()
+
+    (status, data), elapsed = asyncio.run(scenario())
+    assert (status, data) == (429, None)
+    assert elapsed < 0.5
+
+
+def test_background_requests_use_a_single_token_bucket():
+    limiter = RateLimiter([(1, 10)])
+    assert limiter.wait_time(BACKGROUND) == 0
+    limiter.consume(time.monotonic())
+    assert 9 < limiter.wait_time(BACKGROUND) <= 10
+    assert 9 < limiter.wait_time(INTERACTIVE) <= 10
@@ -0,0 +1,58 @@
+import asyncio
+import os
+
+import asyncpg
+import pytest
+
+from db import ensure_schema
+
+DATABASE_URL = os.getenv("DATABASE_URL")
+SCHEMA = "test_schema"
+
+pytestmark = pytest.mark.skipif(not DATABASE_URL, reason="DATABASE_URL not set")
+
+
+async def boot(processes):
+    async def ensure():
+        con = await asyncpg.connect(
+            DATABASE_URL, server_settings={"search_path": SCHEMA}
+        )
+        try:
+            await ensure_schema(con)
+        finally:
+            await con.close()
+
+    return await asyncio.gather(
+        *(ensure() for _ in range(processes)), return_exceptions=True
+    )
+
+
+async def boot_twice(processes):
+    con = await asyncpg.connect(DATABASE_URL)
+    try:
+        await con.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        await con.execute(f"CREATE SCHEMA {SCHEMA}")
+        await con.execute(
+            f"CREATE TABLE {SCHEMA}.valorantmatches (id TEXT PRIMARY KEY, data BYTEA)"
+        )
+        await con.execute(
+            f"CREATE TABLE {SCHEMA}.riotaccounts (puuid TEXT PRIMARY KEY)"
+        )
+        # A fresh database, then one every process has set up before.
+        results = await boot(processes) + await boot(processes)
+        triggers = await con.fetchval(
+            f"""
+            SELECT count(*) FROM pg_trigger
+            WHERE tgrelid = '{SCHEMA}.matchplayers'::regclass AND NOT tgisinternal
+            """
+        )
+        return results, triggers
+    finally:
+        await con.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        await con.close()
+
+
+def test_concurrent_boots_share_the_schema():
+    results, triggers = asyncio.run(boot_twice(6))
+    assert [result for result in results if result is not None] == []
+    assert triggers == 1
@@ -0,0 +1,64 @@
+"""Standalone ingestion worker.
+
+Runs the matchlist polling and match downloads without serving pages. Any
+number of workers (and web processes left with ingestion on) can share a
+database: accounts are split between them through the shard leases in
+`leases`, and a worker that stops is replaced within `LEASE_TTL` seconds.
+Run the web app with `INGEST_ENABLED=0` to leave ingestion to workers.
+With `METRICS_PORT` set, the worker serves its own `/metrics` there.
+
+    python worker.py
+"""
+
+import asyncio
+import os
+import signal
+
+from aiohttp import web
+
+import main
+import metrics
+
+METRICS_PORT = os.getenv("METRICS_PORT")
+
+
+def stop():
+    main.shutdown_event.set()
+    main.poll_schedule.woken.set()
+
+
+async def metricsPage(request):
+    if main.METRICS_TOKEN and (
+        request.headers.get("Authorization") != f"Bearer {main.METRICS_TOKEN}"
+    ):
+        return web.Response(status=401)
+    return web.Response(
+        body=metrics.render().encode(),
+        headers={"Content-Type": "text/plain; version=0.0.4"},
+    )
+
+
+async def serveMetrics(port):
+    app = web.Application()
+    app.router.add_get("/metrics", metricsPage)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "0.0.0.0", int(port)).start()
+    return runner
+
+
+async def run():
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stop)
+    runner = await serveMetrics(METRICS_PORT) if METRICS_PORT else None
+    print(f"Ingestion worker {main.shard_leases.worker_id} starting")
+    try:
+        await main.background_task(ingest=True)
+    finally:
+        if runner is not None:
+            await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(run())